@@ -0,0 +1,184 @@
+import asyncio
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from app.admin.rollups import apply_rollups, count_rows
+from app.config import settings
+from app.metrics import LatencyTracker
+from app.models.message import SessionLocal, ConversationLog
+
+_STOP = object()
+# How often a producer waiting for room in a full queue checks again
+PUT_POLL_INTERVAL = 0.01
+
+
+class LogWriter:
+    """Write-behind queue that persists conversation logs in batches
+
+    Rows are flushed with a single bulk insert once ``batch_size`` rows are
+    waiting or ``flush_interval`` seconds have passed, whichever comes first.
+    When the queue is full, producers are held back: ``put`` waits for room
+    without blocking the event loop, and code that cannot wait checks
+    ``has_room`` first and refuses its work (incoming messages are then
+    redelivered by the platform). Hourly/daily stats rollups are updated in
+    the same transaction as each batch.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.LOG_BATCH_SIZE,
+        flush_interval: float = settings.LOG_FLUSH_INTERVAL,
+        max_queue: int = settings.LOG_QUEUE_SIZE
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.flush_latency = LatencyTracker()
+        self.put_wait = LatencyTracker()
+        self.enqueued = 0
+        self.written = 0
+        self.waited = 0
+        self.refused = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Drain everything queued so far and stop the writer thread"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def has_room(self) -> bool:
+        """Whether a row can be queued right now; counts a refusal if not"""
+        if self._queue.full():
+            self.refused += 1
+            return False
+        return True
+
+    async def put(self, row: Dict[str, Any]):
+        """Queue a row for insertion, waiting while the queue is full"""
+        self.start()
+        started = None
+        while True:
+            try:
+                self._queue.put_nowait(row)
+                break
+            except queue.Full:
+                if started is None:
+                    started = time.perf_counter()
+                    self.waited += 1
+                await asyncio.sleep(PUT_POLL_INTERVAL)
+        if started is not None:
+            self.put_wait.record((time.perf_counter() - started) * 1000)
+        self.enqueued += 1
+
+    def enqueue(self, row: Dict[str, Any]) -> bool:
+        """Queue a row without waiting, returning False if it had to be dropped
+
+        Check ``has_room`` first; nothing else takes room on the event loop
+        in between.
+        """
+        self.start()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            print("Error logging message: log queue is full, dropping row")
+            return False
+        self.enqueued += 1
+        return True
+
+    def _run(self):
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        stopping = False
+
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+            except queue.Empty:
+                pass
+
+            if stopping:
+                # Pick up anything queued behind the stop marker
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        batch.append(item)
+
+            if batch and (stopping or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._flush(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, rows: List[Dict[str, Any]]):
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            db.bulk_insert_mappings(ConversationLog, rows)
+            apply_rollups(db, count_rows(rows))
+            db.commit()
+            self.written += len(rows)
+        except IntegrityError:
+            # One bad row (e.g. a duplicate message_id) must not lose the batch
+            db.rollback()
+            self._flush_individually(db, rows)
+        except Exception as e:
+            db.rollback()
+            self.failed += len(rows)
+            print(f"Error logging messages: {e}")
+        finally:
+            db.close()
+            self.flushes += 1
+            self.flush_latency.record((time.perf_counter() - started) * 1000)
+
+    def _flush_individually(self, db, rows: List[Dict[str, Any]]):
+        for row in rows:
+            try:
+                db.bulk_insert_mappings(ConversationLog, [row])
+                apply_rollups(db, count_rows([row]))
+                db.commit()
+                self.written += 1
+            except Exception as e:
+                db.rollback()
+                self.failed += 1
+                print(f"Error logging message {row.get('message_id')}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "waited": self.waited,
+            "put_wait": self.put_wait.summary(),
+            "refused": self.refused,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "flush_latency": self.flush_latency.summary()
+        }
+
+log_writer = LogWriter()
@@ -1,16 +1,58 @@
 from fastapi import APIRouter, HTTPException, Query, BackgroundTasks
 from typing import List, Optional
 from datetime import datetime, timedelta
+import base64
 import csv
 import json
+import zlib
 from io import StringIO
 
-from app.models.message import SessionLocal, ConversationLog, LeadCapture, MessageType
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_, select, delete, func
+
+from app.config import settings
+from app.models.message import AsyncSessionLocal, ConversationLog, LeadCapture, MessageType, sqlite_maintenance
+from app.admin.log_writer import log_writer
+from app.admin.rollups import message_counts_statement, lead_counts_statement, summarize, rebuild_rollups
+from app.ai.response_cache import response_cache, MemoryCacheBackend
+from app.ai.openai_client import ai_client
+from app.ai.conversation_memory import conversation_memory
+from app.bots.telegram_client import telegram_client
+from app.bots.whatsapp_client import whatsapp_client
+from app.bots.dispatcher import chat_dispatcher
+from app.ai.gemini_client import gemini_client
+from app.bots.dedup import message_dedup, update_dedup
+from app.state import shared_state
 
 admin_router = APIRouter()
 
+EXPORT_BATCH_SIZE = 1000
+
+# Totals for /logs, keyed by filter combination
+count_cache = MemoryCacheBackend(max_entries=256)
+
 # Logging functions
-def log_message(
+def message_row(
+    message_id: str,
+    user_id: str,
+    platform: str,
+    message_type: MessageType,
+    content: str,
+    metadata: Optional[dict] = None
+) -> dict:
+    """A conversation log row for the batched log writer"""
+    
+    return {
+        "message_id": message_id,
+        "user_id": user_id,
+        "platform": platform,
+        "message_type": message_type,
+        "content": content,
+        "message_metadata": metadata or {},
+        "timestamp": datetime.utcnow()
+    }
+
+async def log_message(
     message_id: str,
     user_id: str,
     platform: str,
@@ -18,268 +60,371 @@ def log_message(
     content: str,
     metadata: Optional[dict] = None
 ):
-    """Log a message to database"""
+    """Queue a message for the batched log writer, waiting while its queue is full"""
     
-    db = SessionLocal()
-    try:
-        log = ConversationLog(
-            message_id=message_id,
-            user_id=user_id,
-            platform=platform,
-            message_type=message_type,
-            content=content,
-            metadata=metadata or {}
-        )
-        db.add(log)
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        print(f"Error logging message: {e}")
-    finally:
-        db.close()
+    await log_writer.put(message_row(message_id, user_id, platform, message_type, content, metadata))
 
-def capture_lead(user_id: str, user_name: str, platform: str, interest: str):
+async def capture_lead(user_id: str, user_name: str, platform: str, interest: str):
     """Capture a lead"""
     
-    db = SessionLocal()
-    try:
-        # Check if lead already exists
-        existing = db.query(LeadCapture).filter(
-            LeadCapture.user_id == user_id,
-            LeadCapture.contacted == False
-        ).first()
-        
-        if existing:
-            return  # Lead already captured
-        
-        lead = LeadCapture(
-            user_id=user_id,
-            user_name=user_name,
-            platform=platform,
-            interest=interest,
-            contact_info={}  # Will be filled when user provides contact
-        )
-        db.add(lead)
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        print(f"Error capturing lead: {e}")
-    finally:
-        db.close()
+    async with AsyncSessionLocal() as db:
+        try:
+            # Check if lead already exists
+            existing = await db.scalar(select(LeadCapture.id).where(
+                LeadCapture.user_id == user_id,
+                LeadCapture.contacted == False
+            ).limit(1))
+            
+            if existing:
+                return  # Lead already captured
+            
+            lead = LeadCapture(
+                user_id=user_id,
+                user_name=user_name,
+                platform=platform,
+                interest=interest,
+                contact_info={}  # Will be filled when user provides contact
+            )
+            db.add(lead)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            print(f"Error capturing lead: {e}")
 
 # Admin endpoints
 @admin_router.get("/logs")
 async def get_logs(
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
     user_id: Optional[str] = None,
     platform: Optional[str] = None,
-    message_type: Optional[str] = None
+    message_type: Optional[str] = None,
+    include_total: bool = True
 ):
-    """Get conversation logs"""
+    """Get conversation logs, newest first
+    
+    Pass the returned ``next_cursor`` as ``cursor`` to fetch the next page;
+    keyset pagination on (timestamp, id) costs the same at any depth.
+    ``offset`` is still honoured when no cursor is given. ``total`` is cached
+    for LOGS_COUNT_TTL seconds per filter combination.
+    """
     
-    db = SessionLocal()
+    filters = []
+    if user_id:
+        filters.append(ConversationLog.user_id == user_id)
+    if platform:
+        filters.append(ConversationLog.platform == platform)
+    if message_type:
+        filters.append(ConversationLog.message_type == message_type)
+    
+    page = select(ConversationLog).where(*filters).order_by(
+        ConversationLog.timestamp.desc(), ConversationLog.id.desc()
+    )
+    if cursor:
+        try:
+            cursor_timestamp, cursor_id = _decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        page = page.where(or_(
+            ConversationLog.timestamp < cursor_timestamp,
+            and_(ConversationLog.timestamp == cursor_timestamp, ConversationLog.id < cursor_id)
+        ))
+    elif offset:
+        page = page.offset(offset)
+    
+    async with AsyncSessionLocal() as db:
+        total = await _cached_count(db, filters, (user_id, platform, message_type)) if include_total else None
+        logs = (await db.scalars(page.limit(limit))).all()
+    
+    next_cursor = _encode_cursor(logs[-1]) if len(logs) == limit else None
+    
+    return {
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "next_cursor": next_cursor,
+        "logs": [log.to_dict() for log in logs]
+    }
+
+def _encode_cursor(log: ConversationLog) -> str:
+    raw = f"{log.timestamp.isoformat()}|{log.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str):
     try:
-        query = db.query(ConversationLog)
-        
-        if user_id:
-            query = query.filter(ConversationLog.user_id == user_id)
-        if platform:
-            query = query.filter(ConversationLog.platform == platform)
-        if message_type:
-            query = query.filter(ConversationLog.message_type == message_type)
-        
-        total = query.count()
-        logs = query.order_by(ConversationLog.timestamp.desc()).offset(offset).limit(limit).all()
-        
-        return {
-            "total": total,
-            "offset": offset,
-            "limit": limit,
-            "logs": [log.to_dict() for log in logs]
-        }
-    
-    finally:
-        db.close()
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        timestamp, log_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(log_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+async def _cached_count(db, filters, key) -> int:
+    """Count matching rows, reusing the result for LOGS_COUNT_TTL seconds"""
+    
+    cache_key = repr(key)
+    cached = count_cache.get(cache_key)
+    if cached is not None:
+        return cached["total"]
+    
+    total = await db.scalar(select(func.count(ConversationLog.id)).where(*filters))
+    count_cache.set(cache_key, {"total": total}, settings.LOGS_COUNT_TTL)
+    return total
 
 @admin_router.get("/logs/export")
 async def export_logs(
-    format: str = Query("json", regex="^(json|csv)$"),
-    days: int = Query(7, ge=1, le=365)
+    format: str = Query("json", pattern="^(json|csv|ndjson)$"),
+    days: int = Query(7, ge=1, le=365),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user_id: Optional[str] = None,
+    platform: Optional[str] = None,
+    gzip: bool = False
 ):
-    """Export logs in JSON or CSV format"""
+    """Export logs as a streamed JSON, CSV or NDJSON download
     
-    db = SessionLocal()
-    try:
-        since_date = datetime.utcnow() - timedelta(days=days)
-        
-        logs = db.query(ConversationLog).filter(
-            ConversationLog.timestamp >= since_date
-        ).order_by(ConversationLog.timestamp.desc()).all()
-        
-        if format == "json":
-            return {
-                "export_date": datetime.utcnow().isoformat(),
-                "days": days,
-                "total_logs": len(logs),
-                "logs": [log.to_dict() for log in logs]
-            }
-        
-        elif format == "csv":
-            output = StringIO()
-            writer = csv.writer(output)
-            
-            # Write header
-            writer.writerow([
-                "ID", "Message ID", "User ID", "Platform", "Type", 
-                "Content", "Timestamp", "AI Provider", "AI Model"
-            ])
-            
-            # Write rows
-            for log in logs:
-                metadata = log.metadata or {}
-                writer.writerow([
-                    log.id,
-                    log.message_id,
-                    log.user_id,
-                    log.platform,
-                    log.message_type,
-                    log.content.replace('\n', ' ').replace('\r', ' ')[:500],
-                    log.timestamp.isoformat(),
-                    metadata.get('ai_provider', ''),
-                    metadata.get('ai_model', '')
-                ])
-            
-            return {
-                "filename": f"chat_logs_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv",
-                "content": output.getvalue(),
-                "content_type": "text/csv"
-            }
-    
-    finally:
-        db.close()
+    Rows are read through a server-side cursor in batches and written out as
+    they arrive, so memory use stays flat however large the export is.
+    """
+    
+    since_date = since or datetime.utcnow() - timedelta(days=days)
+    filters = [ConversationLog.timestamp >= since_date]
+    if until:
+        filters.append(ConversationLog.timestamp < until)
+    if user_id:
+        filters.append(ConversationLog.user_id == user_id)
+    if platform:
+        filters.append(ConversationLog.platform == platform)
+    
+    if format == "csv":
+        body = _csv_stream(filters)
+        media_type = "text/csv"
+    elif format == "ndjson":
+        body = _ndjson_stream(filters)
+        media_type = "application/x-ndjson"
+    else:
+        body = _json_stream(filters, days)
+        media_type = "application/json"
+    
+    filename = f"chat_logs_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{format}"
+    headers = {}
+    if gzip:
+        body = _gzip_stream(body)
+        # A .gz file, not a transfer encoding: clients would otherwise
+        # decompress it and save plain text under the .gz name
+        filename += ".gz"
+        media_type = "application/gzip"
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    
+    return StreamingResponse(_buffered(body), media_type=media_type, headers=headers)
+
+async def _iter_logs(filters):
+    """Yield matching logs newest first without loading them all at once"""
+    
+    query = select(ConversationLog).where(*filters).order_by(
+        ConversationLog.timestamp.desc()
+    ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    
+    async with AsyncSessionLocal() as db:
+        result = await db.stream_scalars(query)
+        async for log in result:
+            yield log
+            # Rows already streamed out do not need to stay in the identity map
+            db.expunge(log)
+
+async def _csv_stream(filters):
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow([
+        "ID", "Message ID", "User ID", "Platform", "Type", 
+        "Content", "Timestamp", "AI Provider", "AI Model"
+    ])
+    
+    async for log in _iter_logs(filters):
+        metadata = log.message_metadata or {}
+        writer.writerow([
+            log.id,
+            log.message_id,
+            log.user_id,
+            log.platform,
+            log.message_type,
+            (log.content or "").replace('\n', ' ').replace('\r', ' ')[:500],
+            log.timestamp.isoformat(),
+            metadata.get('ai_provider', ''),
+            metadata.get('ai_model', '')
+        ])
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate()
+    
+    yield output.getvalue()
+
+async def _ndjson_stream(filters):
+    async for log in _iter_logs(filters):
+        yield json.dumps(log.to_dict()) + "\n"
+
+async def _json_stream(filters, days: int):
+    yield '{"export_date": %s, "days": %d, "logs": [' % (json.dumps(datetime.utcnow().isoformat()), days)
+    
+    total = 0
+    async for log in _iter_logs(filters):
+        yield ("," if total else "") + json.dumps(log.to_dict())
+        total += 1
+    
+    yield '], "total_logs": %d}' % total
+
+async def _gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+async def _buffered(chunks, size: int = 64 * 1024):
+    """Coalesce many small pieces into larger writes"""
+    
+    buffer = []
+    buffered = 0
+    async for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield buffer[0][:0].join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield buffer[0][:0].join(buffer)
 
 @admin_router.get("/leads")
 async def get_leads(contacted: Optional[bool] = None):
     """Get captured leads"""
     
-    db = SessionLocal()
-    try:
-        query = db.query(LeadCapture)
-        
-        if contacted is not None:
-            query = query.filter(LeadCapture.contacted == contacted)
-        
-        leads = query.order_by(LeadCapture.captured_at.desc()).all()
-        
-        return {
-            "total": len(leads),
-            "contacted": sum(1 for lead in leads if lead.contacted),
-            "leads": [lead.to_dict() for lead in leads]
-        }
-    
-    finally:
-        db.close()
+    query = select(LeadCapture)
+    
+    if contacted is not None:
+        query = query.where(LeadCapture.contacted == contacted)
+    
+    async with AsyncSessionLocal() as db:
+        leads = (await db.scalars(query.order_by(LeadCapture.captured_at.desc()))).all()
+    
+    return {
+        "total": len(leads),
+        "contacted": sum(1 for lead in leads if lead.contacted),
+        "leads": [lead.to_dict() for lead in leads]
+    }
 
 @admin_router.delete("/user/{user_id}")
 async def delete_user_data(user_id: str):
     """GDPR-compliant user data deletion"""
     
-    db = SessionLocal()
-    try:
-        # Delete conversation logs
-        log_count = db.query(ConversationLog).filter(
-            ConversationLog.user_id == user_id
-        ).delete()
-        
-        # Delete leads
-        lead_count = db.query(LeadCapture).filter(
-            LeadCapture.user_id == user_id
-        ).delete()
-        
-        db.commit()
+    async with AsyncSessionLocal() as db:
+        try:
+            # Delete conversation logs
+            log_result = await db.execute(
+                delete(ConversationLog).where(ConversationLog.user_id == user_id)
+            )
+            
+            # Delete leads
+            lead_result = await db.execute(
+                delete(LeadCapture).where(LeadCapture.user_id == user_id)
+            )
+            
+            await db.commit()
         
-        return {
-            "status": "success",
-            "message": f"Deleted {log_count} messages and {lead_count} leads for user {user_id}",
-            "user_id": user_id,
-            "deleted_at": datetime.utcnow().isoformat(),
-            "compliance": "GDPR Article 17 - Right to erasure"
-        }
-    
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        db.close()
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    await conversation_memory.clear(user_id)
+    
+    return {
+        "status": "success",
+        "message": f"Deleted {log_result.rowcount} messages and {lead_result.rowcount} leads for user {user_id}",
+        "user_id": user_id,
+        "deleted_at": datetime.utcnow().isoformat(),
+        "compliance": "GDPR Article 17 - Right to erasure"
+    }
 
 @admin_router.get("/stats")
-async def get_stats(days: int = 7):
-    """Get bot statistics"""
+async def get_stats(
+    days: int = 7,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    exact: bool = False
+):
+    """Get bot statistics
     
-    db = SessionLocal()
-    try:
-        since_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Message statistics
-        total_messages = db.query(ConversationLog).filter(
-            ConversationLog.timestamp >= since_date
-        ).count()
-        
-        incoming = db.query(ConversationLog).filter(
-            ConversationLog.timestamp >= since_date,
-            ConversationLog.message_type == MessageType.INCOMING
-        ).count()
-        
-        outgoing = db.query(ConversationLog).filter(
-            ConversationLog.timestamp >= since_date,
-            ConversationLog.message_type == MessageType.OUTGOING
-        ).count()
-        
-        # Platform statistics
-        platforms = db.query(
-            ConversationLog.platform,
-            db.func.count(ConversationLog.id)
-        ).filter(
-            ConversationLog.timestamp >= since_date
-        ).group_by(ConversationLog.platform).all()
-        
-        # AI provider statistics
-        ai_stats = db.query(
-            db.func.json_extract(ConversationLog.metadata, '$.ai_provider').label('provider'),
-            db.func.count(ConversationLog.id)
-        ).filter(
-            ConversationLog.timestamp >= since_date,
-            ConversationLog.message_type == MessageType.OUTGOING
-        ).group_by('provider').all()
-        
-        # Lead statistics
-        total_leads = db.query(LeadCapture).filter(
-            LeadCapture.captured_at >= since_date
-        ).count()
-        
-        new_leads = db.query(LeadCapture).filter(
-            LeadCapture.captured_at >= since_date,
-            LeadCapture.contacted == False
-        ).count()
-        
-        return {
-            "period": f"last_{days}_days",
-            "messages": {
-                "total": total_messages,
-                "incoming": incoming,
-                "outgoing": outgoing,
-                "response_rate": (outgoing / incoming * 100) if incoming > 0 else 0
-            },
-            "platforms": dict(platforms),
-            "ai_providers": dict(ai_stats),
-            "leads": {
-                "total": total_leads,
-                "new": new_leads,
-                "contacted": total_leads - new_leads
-            }
-        }
-    
-    finally:
-        db.close()
\ No newline at end of file
+    Message counts come from hourly/daily rollups (accurate to the hour).
+    A custom ``since``/``until`` window or ``exact=true`` uses a single
+    grouped scan of the raw logs instead.
+    """
+    
+    scan = exact or since is not None or until is not None
+    since_date = since or datetime.utcnow() - timedelta(days=days)
+    
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(message_counts_statement(since_date, until, exact=scan))).all()
+        total_leads, new_leads = (await db.execute(lead_counts_statement(since_date))).one()
+    
+    total_leads = total_leads or 0
+    new_leads = int(new_leads or 0)
+    
+    return {
+        "period": f"last_{days}_days" if since is None else f"{since_date.isoformat()}/{(until or datetime.utcnow()).isoformat()}",
+        "source": "scan" if scan else "rollup",
+        **summarize(rows),
+        "leads": {
+            "total": total_leads,
+            "new": new_leads,
+            "contacted": total_leads - new_leads
+        },
+        "ai_cache": await response_cache.stats()
+    }
+
+@admin_router.post("/stats/rebuild")
+async def rebuild_stats():
+    """Recompute stats rollups from the raw conversation logs"""
+    
+    async with AsyncSessionLocal() as db:
+        try:
+            scanned = await db.run_sync(rebuild_rollups)
+            return {"status": "success", "logs_scanned": scanned}
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+
+@admin_router.get("/metrics")
+async def get_metrics():
+    """Get runtime performance metrics"""
+    
+    # Imported here: the bot modules import the pipeline, which imports this one
+    from app.bots.telegram_poller import telegram_poller
+    from app.bots.whatsapp_bot import webhook_stats
+    from app.bots import pipeline
+    
+    return {
+        "telegram_client": telegram_client.stats(),
+        "telegram_dedup": update_dedup.stats(),
+        "telegram_poller": telegram_poller.stats(),
+        "whatsapp_client": whatsapp_client.stats(),
+        "whatsapp_dedup": message_dedup.stats(),
+        "whatsapp_webhook": dict(webhook_stats),
+        "dispatcher": chat_dispatcher.stats(),
+        "replies": pipeline.stats(),
+        "log_writer": log_writer.stats(),
+        "ai_cache": await response_cache.stats(),
+        "ai_client": ai_client.stats(),
+        "gemini_client": gemini_client.stats(),
+        "conversation_memory": conversation_memory.stats(),
+        "sqlite": sqlite_maintenance.stats(),
+        "state": shared_state.stats()
+    }
+
+
+@admin_router.delete("/cache")
+async def clear_response_cache():
+    """Clear cached AI responses"""
+    
+    await response_cache.clear()
+    return {"status": "success", "message": "AI response cache cleared"}
@@ -0,0 +1,219 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.models.message import ConversationLog, LeadCapture, MessageStatsRollup, MessageType
+
+REBUILD_BATCH_SIZE = 5000
+
+
+def floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(value: datetime) -> datetime:
+    floored = floor_hour(value)
+    return floored if floored == value else floored + timedelta(hours=1)
+
+
+def ceil_day(value: datetime) -> datetime:
+    floored = floor_day(value)
+    return floored if floored == value else floored + timedelta(days=1)
+
+
+def _provider(metadata: Optional[Dict[str, Any]]) -> str:
+    return str((metadata or {}).get("ai_provider") or "")
+
+
+def count_rows(rows: Iterable[Dict[str, Any]]) -> Counter:
+    """Aggregate log rows (as queued by the log writer) into rollup keys"""
+    counts: Counter = Counter()
+    for row in rows:
+        timestamp = row.get("timestamp") or datetime.utcnow()
+        message_type = row.get("message_type")
+        dims = (
+            row.get("platform") or "",
+            getattr(message_type, "value", message_type) or "",
+            _provider(row.get("message_metadata"))
+        )
+        counts[("hour", floor_hour(timestamp)) + dims] += 1
+        counts[("day", floor_day(timestamp)) + dims] += 1
+    return counts
+
+
+def apply_rollups(db, counts: Counter):
+    """Add counts to the rollup table in the caller's transaction"""
+
+    if not counts:
+        return
+
+    values = [
+        {
+            "granularity": granularity,
+            "bucket": bucket,
+            "platform": platform,
+            "message_type": message_type,
+            "ai_provider": ai_provider,
+            "count": count
+        }
+        for (granularity, bucket, platform, message_type, ai_provider), count in counts.items()
+    ]
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        statement = insert(MessageStatsRollup).values(values)
+        statement = statement.on_conflict_do_update(
+            index_elements=["granularity", "bucket", "platform", "message_type", "ai_provider"],
+            set_={"count": MessageStatsRollup.count + statement.excluded.count}
+        )
+        db.execute(statement)
+        return
+
+    for value in values:
+        updated = db.query(MessageStatsRollup).filter(
+            MessageStatsRollup.granularity == value["granularity"],
+            MessageStatsRollup.bucket == value["bucket"],
+            MessageStatsRollup.platform == value["platform"],
+            MessageStatsRollup.message_type == value["message_type"],
+            MessageStatsRollup.ai_provider == value["ai_provider"]
+        ).update({"count": MessageStatsRollup.count + value["count"]})
+        if not updated:
+            db.add(MessageStatsRollup(**value))
+
+
+def rebuild_rollups(db) -> int:
+    """Recompute every rollup from conversation_logs; returns rows scanned
+
+    Used to backfill logs written before rollups existed. Rows the log writer
+    flushes while this runs may be counted twice, so run it when idle.
+    """
+
+    db.query(MessageStatsRollup).delete()
+
+    counts: Counter = Counter()
+    batch = []
+    scanned = 0
+    query = db.query(
+        ConversationLog.timestamp,
+        ConversationLog.platform,
+        ConversationLog.message_type,
+        ConversationLog.message_metadata
+    ).execution_options(stream_results=True).yield_per(REBUILD_BATCH_SIZE)
+
+    for timestamp, platform, message_type, metadata in query:
+        batch.append({
+            "timestamp": timestamp,
+            "platform": platform,
+            "message_type": message_type,
+            "message_metadata": metadata
+        })
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            counts.update(count_rows(batch))
+            scanned += len(batch)
+            batch = []
+    counts.update(count_rows(batch))
+    scanned += len(batch)
+
+    apply_rollups(db, counts)
+    db.commit()
+    return scanned
+
+
+def _rollup_window(since: datetime, until: datetime):
+    """Rollup rows covering [since, until), using daily buckets where whole days fit
+
+    The start is rounded up to the next hour, so the window is exact to the hour.
+    """
+    hour = MessageStatsRollup.granularity == "hour"
+    day = MessageStatsRollup.granularity == "day"
+    bucket = MessageStatsRollup.bucket
+
+    first_hour = ceil_hour(since)
+    first_day = ceil_day(first_hour)
+    last_day = floor_day(until)
+
+    if first_day >= last_day:
+        return and_(hour, bucket >= first_hour, bucket < until)
+
+    return or_(
+        and_(hour, bucket >= first_hour, bucket < first_day),
+        and_(day, bucket >= first_day, bucket < last_day),
+        and_(hour, bucket >= last_day, bucket < until)
+    )
+
+
+def message_counts_statement(since: datetime, until: Optional[datetime] = None, exact: bool = False):
+    """SELECT of (platform, message_type, ai_provider, count) for a time window
+
+    Reads pre-aggregated rollups by default; ``exact`` scans the raw logs
+    once with a single GROUP BY instead.
+    """
+    until = until or datetime.utcnow()
+
+    if exact:
+        provider = ConversationLog.message_metadata["ai_provider"].as_string()
+        return select(
+            ConversationLog.platform,
+            ConversationLog.message_type,
+            provider,
+            func.count(ConversationLog.id)
+        ).where(
+            ConversationLog.timestamp >= since,
+            ConversationLog.timestamp < until
+        ).group_by(ConversationLog.platform, ConversationLog.message_type, provider)
+
+    return select(
+        MessageStatsRollup.platform,
+        MessageStatsRollup.message_type,
+        MessageStatsRollup.ai_provider,
+        func.sum(MessageStatsRollup.count)
+    ).where(_rollup_window(since, until)).group_by(
+        MessageStatsRollup.platform,
+        MessageStatsRollup.message_type,
+        MessageStatsRollup.ai_provider
+    )
+
+
+def lead_counts_statement(since: datetime):
+    """SELECT of (total, not yet contacted) leads captured since a date"""
+    return select(
+        func.count(LeadCapture.id),
+        func.sum(case((LeadCapture.contacted == False, 1), else_=0))
+    ).where(LeadCapture.captured_at >= since)
+
+
+def summarize(rows) -> Dict[str, Any]:
+    """Fold grouped counts into the /admin/stats message sections"""
+    incoming = outgoing = total = 0
+    platforms: Counter = Counter()
+    providers: Counter = Counter()
+
+    for platform, message_type, ai_provider, count in rows:
+        count = int(count or 0)
+        total += count
+        platforms[platform or "unknown"] += count
+        if message_type == MessageType.INCOMING:
+            incoming += count
+        elif message_type == MessageType.OUTGOING:
+            outgoing += count
+            providers[ai_provider or "unknown"] += count
+
+    return {
+        "messages": {
+            "total": total,
+            "incoming": incoming,
+            "outgoing": outgoing,
+            "response_rate": (outgoing / incoming * 100) if incoming > 0 else 0
+        },
+        "platforms": dict(platforms),
+        "ai_providers": dict(providers)
+    }
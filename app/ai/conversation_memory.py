@@ -0,0 +1,191 @@
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.config import settings
+from sqlalchemy import select
+
+from app.models.message import AsyncSessionLocal, ConversationLog, MessageType
+from app.ai.token_accounting import count_tokens
+from app.state import StateBackend, shared_state
+
+SUMMARY_SNIPPET_CHARS = 120
+
+
+class _History:
+    def __init__(self, max_turns: int):
+        self.turns: Deque[Tuple[str, str]] = deque(maxlen=max_turns)
+        self.summary = ""
+        self.tokens = 0
+        # Shared-state version this history was loaded at (several workers)
+        self.version: Optional[str] = None
+
+
+class ConversationMemory:
+    """Recent conversation turns per user, kept hot in memory
+
+    Each user has a bounded ring buffer of (role, text) turns. Once the turns
+    exceed ``token_budget`` the oldest are folded into a short rolling
+    summary, so the prompt context stays roughly constant in size however
+    long the conversation runs. Users are evicted least-recently-used beyond
+    ``max_users`` and reloaded from ConversationLog on their next message.
+    With several worker processes, each recorded turn bumps a per-user
+    version in the shared state, and a worker whose copy is behind reloads
+    it from the log.
+    """
+
+    def __init__(
+        self,
+        max_users: int = settings.MEMORY_MAX_USERS,
+        max_turns: int = settings.MEMORY_MAX_TURNS,
+        token_budget: int = settings.MEMORY_TOKEN_BUDGET,
+        summary_budget: int = settings.MEMORY_SUMMARY_TOKENS,
+        state: StateBackend = shared_state
+    ):
+        self.max_users = max_users
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.state = state
+        self._users: "OrderedDict[str, _History]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    async def get_context(self, user_id: str, exclude_message_id: Optional[str] = None) -> Optional[str]:
+        """Prompt context for a user, loading their history on a cache miss
+
+        ``exclude_message_id`` keeps the message being answered (which may
+        already be logged) out of its own context.
+        """
+        history = self._get(user_id)
+        version = await self.state.run(self.state.get, f"memory:{user_id}") if self.state.shared else None
+        if history is not None and history.version != version:
+            # Another worker answered this user since we loaded them
+            history = None
+        if history is None:
+            turns = await self._load_turns(user_id, exclude_message_id)
+            history = self._get(user_id)
+            if history is None or history.version != version:
+                history = self._store(user_id, turns)
+                history.version = version
+        return self._format(history)
+
+    async def record(self, user_id: str, role: str, text: str):
+        """Append a turn ("user" or "assistant") to a user's history"""
+        with self._lock:
+            history = self._users.get(user_id)
+            # Not loaded yet: the next get_context will read it from the log
+            if history is not None:
+                self._append(history, role, text)
+                self._users.move_to_end(user_id)
+        if self.state.shared:
+            version = await self.state.run(self.state.incr, f"memory:{user_id}")
+            # Still current unless another worker also recorded a turn meanwhile
+            if history is not None and history.version == (str(version - 1) if version > 1 else None):
+                history.version = str(version)
+
+    async def clear(self, user_id: str):
+        """Forget a user's history in this worker and in every other one"""
+        with self._lock:
+            self._users.pop(user_id, None)
+        if self.state.shared:
+            # Other workers' copies fall behind and are reloaded from the (emptied) log
+            await self.state.run(self.state.incr, f"memory:{user_id}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "users": len(self._users),
+            "max_users": self.max_users,
+            "hits": self.hits,
+            "loads": self.loads,
+            "evictions": self.evictions
+        }
+
+    def _get(self, user_id: str) -> Optional[_History]:
+        with self._lock:
+            history = self._users.get(user_id)
+            if history is not None:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+            return history
+
+    def _store(self, user_id: str, turns: List[Tuple[str, str]]) -> _History:
+        history = _History(self.max_turns)
+        for role, text in turns:
+            self._append(history, role, text)
+
+        with self._lock:
+            self._users[user_id] = history
+            self._users.move_to_end(user_id)
+            self.loads += 1
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self.evictions += 1
+        return history
+
+    def _append(self, history: _History, role: str, text: str):
+        if len(history.turns) == history.turns.maxlen:
+            self._summarize(history, history.turns.popleft())
+        history.turns.append((role, text))
+        history.tokens += count_tokens(text)
+
+        while history.tokens > self.token_budget and len(history.turns) > 1:
+            self._summarize(history, history.turns.popleft())
+
+    def _summarize(self, history: _History, turn: Tuple[str, str]):
+        """Fold a turn into the rolling summary, keeping only the newest part"""
+        role, text = turn
+        history.tokens -= count_tokens(text)
+
+        snippet = " ".join(text.split())
+        if len(snippet) > SUMMARY_SNIPPET_CHARS:
+            snippet = snippet[:SUMMARY_SNIPPET_CHARS].rstrip() + "..."
+        label = "User" if role == "user" else "Assistant"
+        history.summary = f"{history.summary}\n- {label}: {snippet}".strip()
+
+        if count_tokens(history.summary) > self.summary_budget:
+            lines = history.summary.split("\n")
+            while len(lines) > 1 and count_tokens("\n".join(lines)) > self.summary_budget:
+                lines.pop(0)
+            history.summary = "\n".join(lines)
+
+    def _format(self, history: _History) -> Optional[str]:
+        if not history.turns and not history.summary:
+            return None
+
+        parts = []
+        if history.summary:
+            parts.append(f"Earlier in this conversation:\n{history.summary}")
+        if history.turns:
+            recent = "\n".join(
+                f"{'User' if role == 'user' else 'Assistant'}: {text}"
+                for role, text in history.turns
+            )
+            parts.append(f"Recent messages:\n{recent}")
+        return "\n\n".join(parts)
+
+    async def _load_turns(self, user_id: str, exclude_message_id: Optional[str] = None) -> List[Tuple[str, str]]:
+        query = select(ConversationLog.message_type, ConversationLog.content).where(
+            ConversationLog.user_id == user_id,
+            ConversationLog.message_type.in_([MessageType.INCOMING, MessageType.OUTGOING])
+        )
+        if exclude_message_id:
+            query = query.where(ConversationLog.message_id != exclude_message_id)
+
+        try:
+            async with AsyncSessionLocal() as db:
+                logs = (await db.execute(
+                    query.order_by(ConversationLog.timestamp.desc()).limit(self.max_turns)
+                )).all()
+        except Exception as e:
+            print(f"Error loading conversation history: {e}")
+            return []
+
+        return [
+            ("user" if message_type == MessageType.INCOMING else "assistant", content or "")
+            for message_type, content in reversed(logs)
+        ]
+
+conversation_memory = ConversationMemory()
@@ -0,0 +1,167 @@
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from app.config import settings
+from app.metrics import LatencyTracker
+
+# Most texts a single batchEmbedContents request may carry
+MAX_EMBED_BATCH = 100
+
+
+class GeminiAPIError(Exception):
+    """Error response from the Gemini API
+
+    Carries ``status_code`` and ``response`` like the OpenAI SDK errors, so
+    the scheduler retries 429/5xx and honours Retry-After the same way.
+    """
+
+    def __init__(self, status_code: int, message: str, response: Optional[httpx.Response] = None):
+        super().__init__(f"Gemini API error {status_code}: {message}")
+        self.status_code = status_code
+        self.response = response
+
+
+def _error(response: httpx.Response, body: Optional[bytes] = None) -> GeminiAPIError:
+    try:
+        message = json.loads(body if body is not None else response.content)["error"]["message"]
+    except (ValueError, KeyError, TypeError):
+        message = response.reason_phrase
+    return GeminiAPIError(response.status_code, message, response)
+
+
+def response_text(response: Dict[str, Any]) -> str:
+    """Text of the first candidate, or "" for a chunk without any"""
+    candidates = response.get("candidates") or []
+    if not candidates:
+        return ""
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    return "".join(part.get("text", "") for part in parts)
+
+
+class GeminiClient:
+    """Async Gemini REST client sharing one keep-alive connection pool
+
+    Talks to ``generateContent``, ``streamGenerateContent`` (server-sent
+    events) and ``batchEmbedContents`` directly, with explicit timeouts,
+    instead of going through the SDK.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout: Optional[float] = None
+    ):
+        self.api_key = api_key if api_key is not None else settings.GEMINI_API_KEY
+        self.base_url = (base_url or settings.GEMINI_API_URL).rstrip("/")
+        self.timeout = timeout if timeout is not None else settings.GEMINI_TIMEOUT
+        self.limits = httpx.Limits(
+            max_connections=settings.GEMINI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.GEMINI_MAX_KEEPALIVE
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self.latency = LatencyTracker()
+        self.in_flight = 0
+        self.errors = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.base_url}/{settings.GEMINI_API_VERSION}/",
+                headers={"x-goog-api-key": self.api_key},
+                limits=self.limits,
+                timeout=httpx.Timeout(self.timeout, connect=settings.GEMINI_CONNECT_TIMEOUT)
+            )
+        return self._client
+
+    async def call(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST a request and return the decoded JSON body; error responses raise"""
+        started = time.perf_counter()
+        self.in_flight += 1
+        try:
+            response = await self.client.post(path, json=payload)
+            if response.status_code >= 400:
+                raise _error(response)
+            return response.json()
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.latency.record((time.perf_counter() - started) * 1000)
+
+    async def generate_content(self, model: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.call(f"models/{model}:generateContent", request)
+
+    async def stream_generate_content(self, model: str, request: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield response chunks as the server sends them
+
+        The request is sent (and an error status raised) on the first
+        iteration; ``latency`` records the time to the first chunk.
+        """
+        started = time.perf_counter()
+        self.in_flight += 1
+        first = True
+        try:
+            async with self.client.stream(
+                "POST", f"models/{model}:streamGenerateContent", params={"alt": "sse"}, json=request
+            ) as response:
+                if response.status_code >= 400:
+                    raise _error(response, await response.aread())
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    if first:
+                        first = False
+                        self.latency.record((time.perf_counter() - started) * 1000)
+                    yield json.loads(line[len("data:"):])
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def batch_embed_contents(
+        self,
+        model: str,
+        texts: List[str],
+        task_type: Optional[str] = None
+    ) -> List[List[float]]:
+        """Embedding vectors for ``texts``, in order, MAX_EMBED_BATCH per request"""
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), MAX_EMBED_BATCH):
+            requests = []
+            for text in texts[start:start + MAX_EMBED_BATCH]:
+                request: Dict[str, Any] = {"model": f"models/{model}", "content": {"parts": [{"text": text}]}}
+                if task_type:
+                    request["taskType"] = task_type
+                requests.append(request)
+            result = await self.call(f"models/{model}:batchEmbedContents", {"requests": requests})
+            vectors.extend(embedding["values"] for embedding in result["embeddings"])
+        return vectors
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool configuration, in-flight requests and latency summary"""
+        return {
+            "base_url": self.base_url,
+            "pool": {
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+                "open": self._client is not None and not self._client.is_closed
+            },
+            "in_flight": self.in_flight,
+            "errors": self.errors,
+            "latency": self.latency.summary()
+        }
+
+gemini_client = GeminiClient()
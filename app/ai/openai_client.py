@@ -1,120 +1,244 @@
-import openai
-import google.generativeai as genai
-from typing import Dict, Any, Optional
+import httpx
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, AsyncIterator
 from app.config import settings
+from app.ai.response_cache import response_cache, build_cache_key
+from app.ai.rate_limiter import AIScheduler
+from app.ai.providers import PROVIDERS
+from app.ai.router import AIRouter
+from app.ai.token_accounting import usage_metadata
+from app.metrics import LatencyTracker
 import json
 
+@lru_cache(maxsize=64)
+def build_system_prompt(language: str, has_context: bool = False) -> str:
+    """Build system prompt with business context
+    
+    Only the language and whether conversation context follows vary, so
+    each variant is formatted once. Context itself is sent as a separate
+    message after this prompt, keeping the prompt a stable cacheable prefix.
+    """
+    
+    base_prompt = f"""You are {settings.BOT_NAME}, an AI assistant for {settings.BUSINESS_NAME}.
+    You provide customer support via messaging.
+    
+    BUSINESS CONTEXT:
+    - Business: {settings.BUSINESS_NAME}
+    - Support Email: {settings.SUPPORT_EMAIL}
+    - Business Hours: {settings.BUSINESS_HOURS_START} to {settings.BUSINESS_HOURS_END} ({settings.BUSINESS_TIMEZONE})
+    
+    CAPABILITIES:
+    1. Answer FAQs about products/services
+    2. Check order status (ask for order number)
+    3. Help with bookings/appointments
+    4. Collect leads (email/phone if customer interested)
+    5. Handle after-hours queries
+    
+    RESPONSE GUIDELINES:
+    - Be friendly, professional, concise
+    - Ask clarifying questions if needed
+    - For order status: Ask for order number
+    - For bookings: Ask for preferred date/time
+    - For leads: Ask for email/phone politely
+    - If unsure: Offer to connect with human support
+    - After hours: Mention business hours politely
+    
+    Current Language: Respond in {language}
+    """
+    
+    if has_context:
+        base_prompt += "\n\nThe CONVERSATION CONTEXT message summarizes this conversation so far; use it for continuity."
+    
+    return base_prompt
+
+class ResponseStream:
+    """Async iterator over response text chunks
+    
+    ``result`` holds the same fields as ``generate_response`` once the stream
+    is exhausted, plus ``ttft_ms`` (time to first token). It is the dict
+    passed in, so the chunk source can update provider/model as it goes.
+    A stream cut off by a provider error keeps the text sent so far, is
+    marked ``partial`` and ``error``, and is not cached.
+    """
+    
+    def __init__(self, client: "AIClient", chunks: AsyncIterator[str], result: Dict[str, Any], cache_key: Optional[str] = None):
+        self._client = client
+        self._chunks = chunks
+        self._cache_key = cache_key
+        self.result = result
+        self.result.update({"text": "", "tokens_used": 0, "ttft_ms": None})
+    
+    def __aiter__(self):
+        return self._iterate()
+    
+    async def _iterate(self):
+        started = time.perf_counter()
+        parts = []
+        try:
+            async for chunk in self._chunks:
+                if not chunk:
+                    continue
+                if self.result["ttft_ms"] is None:
+                    self.result["ttft_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                    self._client.ttft.record(self.result["ttft_ms"])
+                parts.append(chunk)
+                yield chunk
+        except Exception as e:
+            if parts:
+                # Keep what the user has already seen rather than replacing it,
+                # but never cache a cut-off answer
+                print(f"Error streaming AI response: {e}")
+                self.result.update({"error": True, "partial": True})
+            else:
+                fallback = self._client._fallback_response(e)
+                self.result.update(fallback)
+                yield fallback["text"]
+                return
+        
+        self.result["text"] = "".join(parts)
+        if not self.result.get("cached"):
+            self._client.record_usage(self.result)
+        if self._cache_key is not None and parts and not (self.result.get("cached") or self.result.get("partial")):
+            await response_cache.set(self._cache_key, {k: v for k, v in self.result.items() if k != "ttft_ms"})
+
 class AIClient:
     def __init__(self):
         self.provider = settings.AI_PROVIDER.lower()
-        
-        if self.provider == "openai":
-            openai.api_key = settings.OPENAI_API_KEY
-        elif self.provider == "gemini":
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-        else:
+        if self.provider not in PROVIDERS:
             raise ValueError(f"Unsupported AI provider: {self.provider}")
+        
+        self.ttft = LatencyTracker()
+        self.token_totals: Counter = Counter()
+        # Every worker process schedules on its own, so each gets an equal share
+        workers = max(1, settings.WORKERS)
+        self.scheduler = AIScheduler(
+            {
+                "openai": (max(1, settings.OPENAI_RPM // workers), max(1, settings.OPENAI_TPM // workers)),
+                "gemini": (max(1, settings.GEMINI_RPM // workers), max(1, settings.GEMINI_TPM // workers))
+            },
+            retry_exceptions=(httpx.TransportError,)
+        )
+        
+        # Every provider with an API key takes part in routing; the configured
+        # one is preferred (and always included, key or not)
+        providers = [
+            provider_class(self.scheduler)
+            for provider_class in PROVIDERS.values()
+        ]
+        self.providers = {
+            provider.name: provider
+            for provider in providers
+            if provider.configured or provider.name == self.provider
+        }
+        self.router = AIRouter(list(self.providers.values()), preferred=self.provider)
     
     async def generate_response(
         self, 
         user_message: str, 
         context: Optional[str] = None,
-        language: str = "English"
+        language: str = "English",
+        use_cache: bool = True
     ) -> Dict[str, Any]:
-        """Generate AI response with context awareness"""
-        
-        system_prompt = self._build_system_prompt(context, language)
+        """Generate AI response with context awareness
         
-        try:
-            if self.provider == "openai":
-                return await self._openai_response(user_message, system_prompt)
-            else:
-                return await self._gemini_response(user_message, system_prompt)
-        except Exception as e:
-            return self._fallback_response(str(e))
-    
-    def _build_system_prompt(self, context: Optional[str], language: str) -> str:
-        """Build system prompt with business context"""
-        
-        base_prompt = f"""You are {settings.BOT_NAME}, an AI assistant for {settings.BUSINESS_NAME}.
-        You provide customer support via messaging.
-        
-        BUSINESS CONTEXT:
-        - Business: {settings.BUSINESS_NAME}
-        - Support Email: {settings.SUPPORT_EMAIL}
-        - Business Hours: {settings.BUSINESS_HOURS_START} to {settings.BUSINESS_HOURS_END} ({settings.BUSINESS_TIMEZONE})
-        
-        CAPABILITIES:
-        1. Answer FAQs about products/services
-        2. Check order status (ask for order number)
-        3. Help with bookings/appointments
-        4. Collect leads (email/phone if customer interested)
-        5. Handle after-hours queries
-        
-        RESPONSE GUIDELINES:
-        - Be friendly, professional, concise
-        - Ask clarifying questions if needed
-        - For order status: Ask for order number
-        - For bookings: Ask for preferred date/time
-        - For leads: Ask for email/phone politely
-        - If unsure: Offer to connect with human support
-        - After hours: Mention business hours politely
-        
-        Current Language: Respond in {language}
+        Pass ``use_cache=False`` for personalized conversations whose answer
+        must not be shared with (or served from) other users.
         """
         
-        if context:
-            base_prompt += f"\n\nCONVERSATION CONTEXT:\n{context}"
+        system_prompt = build_system_prompt(language, bool(context))
         
-        return base_prompt
-    
-    async def _openai_response(self, user_message: str, system_prompt: str) -> Dict[str, Any]:
-        """Generate response using OpenAI"""
+        cache_key = None
+        if use_cache and response_cache.enabled:
+            cache_key = build_cache_key(user_message, language, system_prompt, context)
+            cached = await response_cache.get(cache_key)
+            if cached is not None:
+                return {**cached, "cached": True}
+        elif not use_cache:
+            response_cache.record_bypass()
         
-        response = await openai.ChatCompletion.acreate(
-            model=settings.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            temperature=settings.AI_TEMPERATURE,
-            max_tokens=500
-        )
+        try:
+            response = await self.router.generate(user_message, system_prompt, context)
+        except Exception as e:
+            return self._fallback_response(e)
+        self.record_usage(response)
         
-        return {
-            "text": response.choices[0].message.content,
-            "provider": "openai",
-            "model": settings.OPENAI_MODEL,
-            "tokens_used": response.usage.total_tokens
-        }
+        if cache_key is not None:
+            await response_cache.set(cache_key, response)
+        
+        return response
     
-    async def _gemini_response(self, user_message: str, system_prompt: str) -> Dict[str, Any]:
-        """Generate response using Google Gemini"""
+    def stream_response(
+        self,
+        user_message: str,
+        context: Optional[str] = None,
+        language: str = "English",
+        use_cache: bool = True
+    ) -> ResponseStream:
+        """Stream the AI response as text chunks while they are generated"""
         
-        model = genai.GenerativeModel(settings.GEMINI_MODEL)
-        prompt = f"{system_prompt}\n\nUser Message: {user_message}"
+        system_prompt = build_system_prompt(language, bool(context))
         
-        response = await model.generate_content_async(prompt)
+        cache_key = None
+        if use_cache and response_cache.enabled:
+            cache_key = build_cache_key(user_message, language, system_prompt, context)
+        elif not use_cache:
+            response_cache.record_bypass()
         
-        return {
-            "text": response.text,
-            "provider": "gemini",
-            "model": settings.GEMINI_MODEL,
-            "tokens_used": len(prompt) + len(response.text)
-        }
+        # The router records whichever provider actually answers in ``result``
+        primary = self.router.ordered()[0]
+        result = {"provider": primary.name, "model": primary.model}
+        chunks = self._cached_or_stream(user_message, system_prompt, context, result, cache_key)
+        return ResponseStream(self, chunks, result, cache_key)
     
-    def _fallback_response(self, error: str) -> Dict[str, Any]:
-        """Fallback response when AI fails"""
+    async def _cached_or_stream(
+        self,
+        user_message: str,
+        system_prompt: str,
+        context: Optional[str],
+        result: Dict[str, Any],
+        cache_key: Optional[str]
+    ) -> AsyncIterator[str]:
+        """Replay a cached answer in one chunk, or stream a new one"""
+        if cache_key is not None:
+            cached = await response_cache.get(cache_key)
+            if cached is not None:
+                result.update({"provider": cached["provider"], "model": cached["model"], "cached": True})
+                yield cached["text"]
+                return
+        async for chunk in self.router.stream(user_message, system_prompt, context, result):
+            yield chunk
+    
+    def _fallback_response(self, error: Exception) -> Dict[str, Any]:
+        """Fallback response when AI fails
+        
+        Provider errors can include request details, so they are logged here
+        and never shown to the user.
+        """
         
+        print(f"Error generating AI response: {type(error).__name__}: {error}")
         return {
             "text": f"I apologize, but I'm having trouble processing your request. "
-                   f"Please try again or contact {settings.SUPPORT_EMAIL} for assistance. "
-                   f"[Error: {error}]",
+                   f"Please try again or contact {settings.SUPPORT_EMAIL} for assistance.",
             "provider": "fallback",
             "model": "none",
             "tokens_used": 0
         }
     
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the first available provider that supports embeddings"""
+        for provider in self.router.ordered():
+            if provider.supports_embeddings and provider.configured:
+                return await provider.embed(texts)
+        raise RuntimeError("No configured AI provider supports embeddings")
+    
+    def record_usage(self, response: Dict[str, Any]):
+        """Add a response's token counts to the running per-provider totals"""
+        provider = response.get("provider", "unknown")
+        for field, count in usage_metadata(response).items():
+            self.token_totals[(provider, field)] += count
+    
     def detect_language(self, text: str) -> str:
         """Simple language detection (can be enhanced later)"""
         
@@ -129,5 +253,21 @@ class AIClient:
             return "German"
         else:
             return "English"
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "time_to_first_token": self.ttft.summary(),
+            "router": self.router.stats(),
+            "tokens": {
+                provider: {
+                    field: count
+                    for (name, field), count in self.token_totals.items()
+                    if name == provider
+                }
+                for provider in sorted({name for name, _ in self.token_totals})
+            },
+            "scheduler": self.scheduler.stats()
+        }
 
 ai_client = AIClient()
\ No newline at end of file
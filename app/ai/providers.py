@@ -0,0 +1,365 @@
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional
+
+from app.config import settings
+from app.ai.gemini_client import MAX_EMBED_BATCH, GeminiClient, gemini_client, response_text
+from app.ai.rate_limiter import AIScheduler
+from app.ai.response_cache import prompt_version
+from app.ai.token_accounting import count_prompt_tokens, count_tokens, estimate_usage, gemini_usage, openai_usage
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
+    import openai
+
+MAX_OUTPUT_TOKENS = 500
+
+
+def context_message(context: str) -> str:
+    return f"CONVERSATION CONTEXT:\n{context}"
+
+
+def gemini_contents(user_message: str, context: Optional[str]) -> List[str]:
+    if context:
+        return [context_message(context), f"User Message: {user_message}"]
+    return [user_message]
+
+
+class AIProvider:
+    """One model behind a common generate/stream interface
+
+    Every call goes through the shared scheduler, so rate limits and
+    retries apply no matter which provider the router picks. The system
+    prompt is sent unchanged first and per-user context after it, so the
+    prompt prefix stays byte-identical across users and providers can serve
+    it from their prompt cache.
+    """
+
+    name = ""
+    supports_embeddings = False
+
+    def __init__(self, scheduler: AIScheduler, model: str, api_key: str):
+        self.scheduler = scheduler
+        self.model = model
+        self.api_key = api_key
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    async def generate(self, user_message: str, system_prompt: str, context: Optional[str] = None) -> Dict[str, Any]:
+        """Return the text, provider and model plus the token usage fields
+
+        Usage (prompt_tokens, completion_tokens, cached_tokens, tokens_used)
+        comes from the provider when it reports it, otherwise it is counted
+        locally.
+        """
+        raise NotImplementedError
+
+    def stream(
+        self,
+        user_message: str,
+        system_prompt: str,
+        context: Optional[str] = None,
+        result: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """Yield response text chunks as they are generated
+
+        Token usage is written into ``result`` once the stream ends.
+        """
+        raise NotImplementedError
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embedding vectors for ``texts``, in order"""
+        raise NotImplementedError
+
+    def prompt_parts(self, user_message: str, system_prompt: str, context: Optional[str]) -> List[str]:
+        parts = [system_prompt]
+        if context:
+            parts.append(context_message(context))
+        parts.append(user_message)
+        return parts
+
+    def estimate_tokens(self, user_message: str, system_prompt: str, context: Optional[str] = None) -> int:
+        """Budget reserved before a call: prompt tokens plus the output cap"""
+        return count_prompt_tokens(self.prompt_parts(user_message, system_prompt, context), self.model) + MAX_OUTPUT_TOKENS
+
+    def finish_stream(
+        self,
+        reserved: int,
+        usage: Optional[Dict[str, Any]],
+        prompt_parts: List[str],
+        text: str,
+        result: Optional[Dict[str, Any]]
+    ):
+        """Settle a stream's token reservation and report its usage
+
+        Runs when the stream ends, fails or is abandoned; without usage from
+        the provider, the text streamed so far is counted locally.
+        """
+        usage = usage or estimate_usage(prompt_parts, text, self.model)
+        self.scheduler.settle(self.name, self.model, reserved, usage["tokens_used"])
+        if result is not None:
+            result.update(usage)
+
+
+class OpenAIProvider(AIProvider):
+    name = "openai"
+
+    def __init__(self, scheduler: AIScheduler):
+        super().__init__(scheduler, settings.OPENAI_MODEL, settings.OPENAI_API_KEY)
+        self._client: Optional["openai.AsyncOpenAI"] = None
+
+    @property
+    def client(self) -> "openai.AsyncOpenAI":
+        """Create the OpenAI client on first use (it refuses an empty API key)
+
+        The SDK is imported here rather than at module level, as it takes most
+        of a second to load. Its own retries are off; the scheduler retries
+        with rate limiting.
+        """
+        if self._client is None:
+            import openai
+            self.scheduler.add_retry_exceptions(openai.APIConnectionError)
+            self._client = openai.AsyncOpenAI(api_key=self.api_key, max_retries=0)
+        return self._client
+
+    def _create(self, user_message: str, system_prompt: str, context: Optional[str], **kwargs):
+        *system, user = self.prompt_parts(user_message, system_prompt, context)
+        messages: List[Dict[str, str]] = [{"role": "system", "content": part} for part in system]
+        messages.append({"role": "user", "content": user})
+
+        return self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=settings.AI_TEMPERATURE,
+            max_tokens=MAX_OUTPUT_TOKENS,
+            # Routes requests sharing the system prompt to the same prompt cache
+            prompt_cache_key=prompt_version(system_prompt),
+            **kwargs
+        )
+
+    async def generate(self, user_message: str, system_prompt: str, context: Optional[str] = None) -> Dict[str, Any]:
+        response = await self.scheduler.run(
+            self.name,
+            self.model,
+            self.estimate_tokens(user_message, system_prompt, context),
+            lambda: self._create(user_message, system_prompt, context),
+            usage=lambda response: response.usage.total_tokens if response.usage else None
+        )
+
+        text = response.choices[0].message.content
+        usage = openai_usage(response.usage) or estimate_usage(
+            self.prompt_parts(user_message, system_prompt, context), text, self.model
+        )
+        return {"text": text, "provider": self.name, "model": self.model, **usage}
+
+    async def stream(
+        self,
+        user_message: str,
+        system_prompt: str,
+        context: Optional[str] = None,
+        result: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        # Only opening the stream is retried; a stream that fails midway is not
+        reserved = self.estimate_tokens(user_message, system_prompt, context)
+        stream = await self.scheduler.run(
+            self.name,
+            self.model,
+            reserved,
+            lambda: self._create(
+                user_message, system_prompt, context,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+        )
+
+        parts = []
+        usage = None
+        try:
+            async for chunk in stream:
+                if chunk.usage:
+                    # Sent in a final chunk without choices
+                    usage = openai_usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        finally:
+            self.finish_stream(
+                reserved, usage, self.prompt_parts(user_message, system_prompt, context), "".join(parts), result
+            )
+
+
+class GeminiProvider(AIProvider):
+    name = "gemini"
+
+    def __init__(self, scheduler: AIScheduler):
+        super().__init__(scheduler, settings.GEMINI_MODEL, settings.GEMINI_API_KEY)
+        # One model object per system prompt (a few per language), built once
+        self._models: Dict[str, "genai.GenerativeModel"] = {}
+        self._genai = None
+
+    def _model(self, system_prompt: str) -> "genai.GenerativeModel":
+        if self._genai is None:
+            # Imported on first use; the SDK is slow to load
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            self._genai = genai
+        model = self._models.get(system_prompt)
+        if model is None:
+            model = self._models[system_prompt] = self._genai.GenerativeModel(
+                self.model,
+                system_instruction=system_prompt
+            )
+        return model
+
+    async def generate(self, user_message: str, system_prompt: str, context: Optional[str] = None) -> Dict[str, Any]:
+        model = self._model(system_prompt)
+        contents = gemini_contents(user_message, context)
+
+        response = await self.scheduler.run(
+            self.name,
+            self.model,
+            self.estimate_tokens(user_message, system_prompt, context),
+            lambda: model.generate_content_async(contents),
+            usage=lambda response: (gemini_usage(response.usage_metadata) or {}).get("tokens_used")
+        )
+
+        usage = gemini_usage(getattr(response, "usage_metadata", None)) or estimate_usage(
+            [system_prompt, *contents], response.text, self.model
+        )
+        return {"text": response.text, "provider": self.name, "model": self.model, **usage}
+
+    async def stream(
+        self,
+        user_message: str,
+        system_prompt: str,
+        context: Optional[str] = None,
+        result: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        model = self._model(system_prompt)
+        contents = gemini_contents(user_message, context)
+
+        reserved = self.estimate_tokens(user_message, system_prompt, context)
+        response = await self.scheduler.run(
+            self.name,
+            self.model,
+            reserved,
+            lambda: model.generate_content_async(contents, stream=True)
+        )
+
+        parts = []
+        usage = None
+        try:
+            async for chunk in response:
+                # Every chunk carries the running totals; the last one is final
+                usage = gemini_usage(getattr(chunk, "usage_metadata", None)) or usage
+                parts.append(chunk.text)
+                yield chunk.text
+        finally:
+            self.finish_stream(reserved, usage, [system_prompt, *contents], "".join(parts), result)
+
+
+class GeminiHTTPProvider(AIProvider):
+    """Gemini over its REST API on a pooled connection (GEMINI_BACKEND=http)
+
+    The SDK's async calls need gRPC and it builds a model object per system
+    prompt; this talks to the same endpoints with one shared HTTP client and
+    explicit timeouts, and supports batched embeddings.
+    """
+
+    name = "gemini"
+    supports_embeddings = True
+
+    def __init__(self, scheduler: AIScheduler, client: GeminiClient = gemini_client):
+        super().__init__(scheduler, settings.GEMINI_MODEL, settings.GEMINI_API_KEY)
+        self.client = client
+
+    def _request(self, system_prompt: str, contents: List[str]) -> Dict[str, Any]:
+        return {
+            "systemInstruction": {"parts": [{"text": system_prompt}]},
+            "contents": [{"role": "user", "parts": [{"text": part} for part in contents]}],
+            "generationConfig": {
+                "temperature": settings.AI_TEMPERATURE,
+                "maxOutputTokens": MAX_OUTPUT_TOKENS
+            }
+        }
+
+    async def generate(self, user_message: str, system_prompt: str, context: Optional[str] = None) -> Dict[str, Any]:
+        contents = gemini_contents(user_message, context)
+        request = self._request(system_prompt, contents)
+
+        response = await self.scheduler.run(
+            self.name,
+            self.model,
+            self.estimate_tokens(user_message, system_prompt, context),
+            lambda: self.client.generate_content(self.model, request),
+            usage=lambda response: (gemini_usage(response.get("usageMetadata")) or {}).get("tokens_used")
+        )
+
+        text = response_text(response)
+        if not text:
+            candidates = response.get("candidates") or [{}]
+            reason = candidates[0].get("finishReason") or (response.get("promptFeedback") or {}).get("blockReason")
+            raise ValueError(f"Gemini returned no text (reason: {reason})")
+        usage = gemini_usage(response.get("usageMetadata")) or estimate_usage(
+            [system_prompt, *contents], text, self.model
+        )
+        return {"text": text, "provider": self.name, "model": self.model, **usage}
+
+    async def stream(
+        self,
+        user_message: str,
+        system_prompt: str,
+        context: Optional[str] = None,
+        result: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        contents = gemini_contents(user_message, context)
+        request = self._request(system_prompt, contents)
+
+        async def open_stream():
+            # Retried until the first chunk arrives; a fresh request each attempt
+            chunks = self.client.stream_generate_content(self.model, request)
+            try:
+                return await chunks.__anext__(), chunks
+            except StopAsyncIteration:
+                return None, chunks
+
+        reserved = self.estimate_tokens(user_message, system_prompt, context)
+        first, chunks = await self.scheduler.run(self.name, self.model, reserved, open_stream)
+
+        parts = []
+        usage = None
+        try:
+            if first is not None:
+                async for chunk in _prepend(first, chunks):
+                    # Every chunk carries the running totals; the last one is final
+                    usage = gemini_usage(chunk.get("usageMetadata")) or usage
+                    text = response_text(chunk)
+                    if text:
+                        parts.append(text)
+                        yield text
+        finally:
+            self.finish_stream(reserved, usage, [system_prompt, *contents], "".join(parts), result)
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), MAX_EMBED_BATCH):
+            batch = texts[start:start + MAX_EMBED_BATCH]
+            vectors.extend(await self.scheduler.run(
+                self.name,
+                settings.GEMINI_EMBEDDING_MODEL,
+                sum(count_tokens(text) for text in batch),
+                lambda: self.client.batch_embed_contents(settings.GEMINI_EMBEDDING_MODEL, batch)
+            ))
+        return vectors
+
+
+async def _prepend(first: Any, rest: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    yield first
+    async for item in rest:
+        yield item
+
+
+PROVIDERS = {
+    OpenAIProvider.name: OpenAIProvider,
+    GeminiProvider.name: GeminiProvider if settings.GEMINI_BACKEND == "sdk" else GeminiHTTPProvider
+}
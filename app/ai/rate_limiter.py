@@ -0,0 +1,241 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type, TypeVar
+
+from app.config import settings
+from app.metrics import LatencyTracker
+
+T = TypeVar("T")
+
+
+class RateLimitTimeout(Exception):
+    """The request would have waited longer than the scheduler allows"""
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding up to ``capacity`` units per minute"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # A request larger than the whole bucket only has to wait for a full one
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= amount
+
+    def give(self, amount: float, now: float):
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class ProviderLimiter:
+    """Requests-per-minute and tokens-per-minute budget for one provider/model
+
+    Callers queue on a FIFO lock; the head of the queue sleeps until both
+    buckets can cover it, so bursts are smoothed instead of turned into 429s.
+    Token use is reserved from an estimate and settled once the provider
+    reports actual usage. A 429 pauses the whole queue for its retry delay.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._lock = asyncio.Lock()
+        self._paused_until = 0.0
+        self.waiting = 0
+        self.throttled = 0
+        self.rate_limited = 0
+
+    async def acquire(self, tokens: int, max_wait: Optional[float] = None) -> float:
+        """Wait for capacity and reserve it; returns the seconds spent waiting"""
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    wait = max(
+                        self._paused_until - now,
+                        self.requests.wait_time(1, now),
+                        self.tokens.wait_time(tokens, now)
+                    )
+                    if wait <= 0:
+                        self.requests.take(1, now)
+                        self.tokens.take(tokens, now)
+                        break
+                    if max_wait is not None and now - started + wait > max_wait:
+                        raise RateLimitTimeout(f"rate limit queue wait would exceed {max_wait}s")
+                    self.throttled += 1
+                    await asyncio.sleep(wait)
+        finally:
+            self.waiting -= 1
+        return time.monotonic() - started
+
+    def settle(self, reserved: int, used: Optional[int]):
+        """Correct the token reservation once actual usage is known"""
+        if used is None:
+            return
+        now = time.monotonic()
+        if used < reserved:
+            self.tokens.give(reserved - used, now)
+        elif used > reserved:
+            self.tokens.take(used - reserved, now)
+
+    def pause(self, seconds: float):
+        self.rate_limited += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        self.requests._refill(now)
+        self.tokens._refill(now)
+        return {
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "requests_available": round(self.requests.level, 1),
+            "tokens_available": round(self.tokens.level),
+            "waiting": self.waiting,
+            "throttled": self.throttled,
+            "rate_limited": self.rate_limited
+        }
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status of a provider SDK error (OpenAI ``status_code``, Google ``code``)"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        code = getattr(error, "code", None)
+        status = code if isinstance(code, int) else None
+    return status
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class AIScheduler:
+    """Rate-limited, retrying execution of provider calls
+
+    Every call first waits its turn on the limiter for its (provider, model).
+    429s, 5xx responses and the given transport errors are retried up to
+    ``max_retries`` times with full-jitter exponential backoff (or the
+    provider's Retry-After). Time spent queued is recorded as the
+    scheduling delay.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, Tuple[int, int]],
+        max_retries: int = settings.AI_MAX_RETRIES,
+        base_delay: float = settings.AI_RETRY_BASE_DELAY,
+        max_delay: float = settings.AI_RETRY_MAX_DELAY,
+        max_wait: float = settings.AI_QUEUE_TIMEOUT,
+        retry_exceptions: Tuple[Type[BaseException], ...] = ()
+    ):
+        self.limits = limits
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+        self.retry_exceptions = (asyncio.TimeoutError, ConnectionError) + tuple(retry_exceptions)
+        self._limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+        self.scheduling_delay = LatencyTracker()
+        self.retries = 0
+        self.failures = 0
+
+    def limiter(self, provider: str, model: str) -> ProviderLimiter:
+        key = (provider, model)
+        if key not in self._limiters:
+            rpm, tpm = self.limits[provider]
+            self._limiters[key] = ProviderLimiter(rpm, tpm)
+        return self._limiters[key]
+
+    def add_retry_exceptions(self, *exceptions: Type[BaseException]):
+        """Also retry these transport errors (for SDKs that are imported lazily)"""
+        self.retry_exceptions += tuple(e for e in exceptions if e not in self.retry_exceptions)
+
+    def is_retryable(self, error: Exception) -> bool:
+        status = error_status(error)
+        if status is not None:
+            return status == 429 or status >= 500
+        return isinstance(error, self.retry_exceptions)
+
+    async def run(
+        self,
+        provider: str,
+        model: str,
+        tokens: int,
+        call: Callable[[], Awaitable[T]],
+        usage: Optional[Callable[[T], Optional[int]]] = None
+    ) -> T:
+        """Run ``call()`` within the provider's budget, retrying transient failures
+
+        ``tokens`` is the estimated prompt plus completion size; ``usage``
+        extracts the actual total from the result to settle the budget.
+        Streams only know their usage once consumed and call ``settle``.
+        """
+        limiter = self.limiter(provider, model)
+        attempt = 0
+        while True:
+            delay = await limiter.acquire(tokens, self.max_wait)
+            self.scheduling_delay.record(delay * 1000)
+            try:
+                result = await call()
+            except Exception as e:
+                # A failed call consumed its request slot but (almost) no tokens
+                limiter.settle(tokens, 0)
+                if attempt >= self.max_retries or not self.is_retryable(e):
+                    self.failures += 1
+                    raise
+                backoff = retry_after(e)
+                if backoff is None:
+                    backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if error_status(e) == 429:
+                    limiter.pause(backoff)
+                else:
+                    await asyncio.sleep(backoff)
+                attempt += 1
+                self.retries += 1
+                continue
+
+            if usage is not None:
+                limiter.settle(tokens, usage(result))
+            return result
+
+    def settle(self, provider: str, model: str, reserved: int, used: Optional[int]):
+        """Settle a reservation made by ``run`` after the call returned"""
+        self.limiter(provider, model).settle(reserved, used)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "scheduling_delay": self.scheduling_delay.summary(),
+            "retries": self.retries,
+            "failures": self.failures,
+            "limits": {
+                f"{provider}/{model}": limiter.stats()
+                for (provider, model), limiter in self._limiters.items()
+            }
+        }
@@ -0,0 +1,288 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace"""
+    text = _PUNCTUATION.sub(" ", text.lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+@lru_cache(maxsize=256)
+def prompt_version(system_prompt: str) -> str:
+    """Short stable hash identifying a system prompt"""
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def build_cache_key(user_message: str, language: str, system_prompt: str, context: Optional[str] = None) -> str:
+    version = prompt_version(system_prompt)
+    if context:
+        version += hashlib.sha256(context.encode("utf-8")).hexdigest()[:16]
+    raw = f"{version}|{language.lower()}|{normalize_message(user_message)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CacheBackend:
+    """Storage interface for cached AI responses"""
+
+    # Backends that do I/O are called from a worker thread, off the event loop
+    blocking = False
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """SQLite-backed cache that survives restarts, evicting least recently used rows
+
+    The row count is tracked as rows are added and removed instead of being
+    counted on every write, and only recounted once it passes the cap (other
+    processes may share the file). Eviction then trims to EVICT_TO of the cap
+    so it runs once per many writes. ``last_access`` is written at most once
+    per ACCESS_RESOLUTION seconds per row, so hits are mostly read-only.
+    """
+
+    blocking = True
+    EVICT_TO = 0.9
+    ACCESS_RESOLUTION = 60
+
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ai_response_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_ai_response_cache_last_access "
+                "ON ai_response_cache (last_access)"
+            )
+            self._rows = self._count()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, last_access FROM ai_response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._rows -= self._conn.execute(
+                    "DELETE FROM ai_response_cache WHERE key = ?", (key,)
+                ).rowcount
+                return None
+            if now - row[2] >= self.ACCESS_RESOLUTION:
+                self._conn.execute(
+                    "UPDATE ai_response_cache SET last_access = ? WHERE key = ?", (now, key)
+                )
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float):
+        now = time.time()
+        with self._lock:
+            row = (json.dumps(value), now + ttl, now, key)
+            updated = self._conn.execute(
+                "UPDATE ai_response_cache SET value = ?, expires_at = ?, last_access = ? WHERE key = ?", row
+            ).rowcount
+            if not updated:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO ai_response_cache (value, expires_at, last_access, key) "
+                    "VALUES (?, ?, ?, ?)",
+                    row
+                )
+                self._rows += 1
+            if self._rows > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        self._rows = self._count()
+        overflow = self._rows - int(self.max_entries * self.EVICT_TO)
+        if overflow > 0:
+            self._rows -= self._conn.execute(
+                "DELETE FROM ai_response_cache WHERE key IN ("
+                "SELECT key FROM ai_response_cache ORDER BY last_access LIMIT ?)",
+                (overflow,)
+            ).rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM ai_response_cache")
+            self._rows = 0
+
+    def size(self) -> int:
+        return self._rows
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM ai_response_cache").fetchone()[0]
+
+
+class SharedStateCacheBackend(CacheBackend):
+    """Cache in the shared state backend, seen by every worker process
+
+    Entries expire by TTL only; size is bounded by the state store itself.
+    """
+
+    def __init__(self, prefix: str = "cache:"):
+        from app.state import shared_state
+        self.state = shared_state
+        self.prefix = prefix
+        # SQLite and Redis state do I/O
+        self.blocking = shared_state.shared
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.state.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float):
+        self.state.set(self.prefix + key, json.dumps(value), ttl)
+
+    def clear(self):
+        self.state.delete_prefix(self.prefix)
+
+    def size(self) -> int:
+        return self.state.count_prefix(self.prefix)
+
+
+class ResponseCache:
+    """Caches AI responses keyed on normalized text, language and prompt version"""
+
+    def __init__(self, backend: Optional[CacheBackend], ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def _call(self, method, *args):
+        if self.backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        try:
+            value = await self._call(self.backend.get, key)
+        except Exception as e:
+            print(f"Error reading response cache: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        if not self.enabled:
+            return
+        try:
+            await self._call(self.backend.set, key, value, self.ttl)
+        except Exception as e:
+            print(f"Error writing response cache: {e}")
+
+    def record_bypass(self):
+        self.bypassed += 1
+
+    async def clear(self):
+        if self.enabled:
+            await self._call(self.backend.clear)
+
+    async def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": settings.AI_CACHE_BACKEND.lower() if self.enabled else "none",
+            "entries": await self._call(self.backend.size) if self.enabled else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0
+        }
+
+
+def create_response_cache() -> ResponseCache:
+    backend_name = settings.AI_CACHE_BACKEND.lower()
+
+    if backend_name == "memory":
+        backend = MemoryCacheBackend(settings.AI_CACHE_MAX_ENTRIES)
+    elif backend_name == "sqlite":
+        backend = SQLiteCacheBackend(settings.AI_CACHE_PATH, settings.AI_CACHE_MAX_ENTRIES)
+    elif backend_name == "shared":
+        backend = SharedStateCacheBackend()
+    elif backend_name == "none":
+        backend = None
+    else:
+        raise ValueError(f"Unsupported AI cache backend: {backend_name}")
+
+    return ResponseCache(backend, settings.AI_CACHE_TTL)
+
+response_cache = create_response_cache()
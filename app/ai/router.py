@@ -0,0 +1,245 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from app.config import settings
+from app.ai.providers import AIProvider
+from app.metrics import LatencyTracker
+
+# Latency samples needed before a provider's percentile is trusted for hedging
+MIN_HEDGE_SAMPLES = 20
+# Unused hedge allowance cannot pile up beyond this many requests
+MAX_HEDGE_CREDIT = 10.0
+
+
+class ProviderHealth:
+    """Rolling latency and error rate for one provider, plus a circuit breaker
+
+    After ``failure_threshold`` consecutive failures the provider is skipped
+    for ``cooldown`` seconds, then tried again; one more failure reopens it.
+    """
+
+    def __init__(self, window: int, failure_threshold: int, cooldown: float):
+        self.latency = LatencyTracker(window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def record(self, ok: bool, latency_ms: Optional[float] = None):
+        self.requests += 1
+        self.outcomes.append(ok)
+        if latency_ms is not None:
+            self.latency.record(latency_ms)
+        if ok:
+            self.consecutive_failures = 0
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            self.open_until = time.monotonic() + self.cooldown
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.open_until
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "available": self.available,
+            "requests": self.requests,
+            "failures": self.failures,
+            "error_rate": round(self.error_rate, 3),
+            "latency": self.latency.summary()
+        }
+
+
+class AIRouter:
+    """Routes requests across providers with hedging and failover
+
+    The preferred provider is tried first unless its circuit breaker is
+    open; otherwise the one with the lowest recent error rate is. If the
+    first call has not finished by the provider's ``hedge_percentile``
+    latency, the same request also goes to the next provider and the first
+    answer wins (the other is cancelled).
+    Hedges are capped at ``hedge_budget`` of requests, so spend grows by at
+    most that fraction. A failed call fails over to the next provider.
+    Streams fail over only until their first chunk.
+    """
+
+    def __init__(
+        self,
+        providers: List[AIProvider],
+        preferred: str,
+        hedging: bool = settings.AI_HEDGING,
+        hedge_percentile: float = settings.AI_HEDGE_PERCENTILE,
+        hedge_min_delay: float = settings.AI_HEDGE_MIN_DELAY,
+        hedge_budget: float = settings.AI_HEDGE_BUDGET,
+        failure_threshold: int = settings.AI_FAILOVER_THRESHOLD,
+        cooldown: float = settings.AI_FAILOVER_COOLDOWN,
+        window: int = 200
+    ):
+        self.providers = providers
+        self.preferred = preferred
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_budget = hedge_budget
+        self.health = {
+            provider.name: ProviderHealth(window, failure_threshold, cooldown)
+            for provider in providers
+        }
+        self._hedge_credit = 1.0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def ordered(self) -> List[AIProvider]:
+        """Providers in the order to try them: healthy first, preferred first"""
+        def rank(provider: AIProvider):
+            health = self.health[provider.name]
+            return (not health.available, provider.name != self.preferred, health.error_rate)
+        return sorted(self.providers, key=rank)
+
+    def _hedge_delay(self, provider: AIProvider) -> Optional[float]:
+        """Seconds to wait before hedging, or None if this request may not hedge"""
+        if not self.hedging or self._hedge_credit < 1:
+            return None
+        latency = self.health[provider.name].latency
+        if latency.count < MIN_HEDGE_SAMPLES:
+            return None
+        return max(self.hedge_min_delay, latency.percentile(self.hedge_percentile) / 1000)
+
+    async def _call(
+        self,
+        provider: AIProvider,
+        user_message: str,
+        system_prompt: str,
+        context: Optional[str]
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            response = await provider.generate(user_message, system_prompt, context)
+        except asyncio.CancelledError:
+            # Lost a hedge race: still a lower bound on how slow it was
+            self.health[provider.name].latency.record((time.perf_counter() - started) * 1000)
+            raise
+        except Exception:
+            self.health[provider.name].record(False)
+            raise
+        self.health[provider.name].record(True, (time.perf_counter() - started) * 1000)
+        return response
+
+    async def generate(self, user_message: str, system_prompt: str, context: Optional[str] = None) -> Dict[str, Any]:
+        candidates = self.ordered()
+        self._hedge_credit = min(MAX_HEDGE_CREDIT, self._hedge_credit + self.hedge_budget)
+        error: Optional[Exception] = None
+
+        while candidates:
+            primary = candidates.pop(0)
+            task = asyncio.create_task(self._call(primary, user_message, system_prompt, context))
+            hedge_delay = self._hedge_delay(primary) if candidates else None
+
+            try:
+                done, _ = await asyncio.wait({task}, timeout=hedge_delay)
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            if not done:
+                # Primary is slower than usual: race it against the next provider
+                self._hedge_credit -= 1
+                self.hedges += 1
+                secondary = candidates.pop(0)
+                hedge = asyncio.create_task(self._call(secondary, user_message, system_prompt, context))
+                try:
+                    response = await self._first_success(task, hedge)
+                except Exception as e:
+                    error = e
+                    continue
+                if response["provider"] == secondary.name:
+                    self.hedge_wins += 1
+                return response
+
+            try:
+                return task.result()
+            except Exception as e:
+                error = e
+                if candidates:
+                    self.failovers += 1
+
+        raise error or RuntimeError("No AI provider available")
+
+    async def _first_success(self, *tasks: asyncio.Task) -> Dict[str, Any]:
+        """Result of whichever task succeeds first; cancels the rest"""
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream(
+        self,
+        user_message: str,
+        system_prompt: str,
+        context: Optional[str],
+        result: Dict[str, Any]
+    ) -> AsyncIterator[str]:
+        """Stream from the first provider that produces output
+
+        ``result`` gets the provider and model actually used, and the token
+        usage once the stream ends.
+        """
+        error: Optional[Exception] = None
+        for index, provider in enumerate(self.ordered()):
+            if index:
+                self.failovers += 1
+            health = self.health[provider.name]
+            started = time.perf_counter()
+            chunks = provider.stream(user_message, system_prompt, context, result)
+            try:
+                first = await chunks.__anext__()
+            except StopAsyncIteration:
+                health.record(True, (time.perf_counter() - started) * 1000)
+                result.update({"provider": provider.name, "model": provider.model})
+                return
+            except Exception as e:
+                health.record(False)
+                error = e
+                continue
+
+            # Time to first chunk is what users wait on, so that is what is tracked
+            health.record(True, (time.perf_counter() - started) * 1000)
+            result.update({"provider": provider.name, "model": provider.model})
+            yield first
+            async for chunk in chunks:
+                yield chunk
+            return
+
+        raise error or RuntimeError("No AI provider available")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "preferred": self.preferred,
+            "order": [provider.name for provider in self.ordered()],
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "providers": {name: health.stats() for name, health in self.health.items()}
+        }
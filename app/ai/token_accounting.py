@@ -0,0 +1,161 @@
+import math
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Set
+
+try:
+    import tiktoken
+except ImportError:  # optional; counts fall back to a character heuristic
+    tiktoken = None
+
+DEFAULT_ENCODING = "cl100k_base"
+# Chat formatting adds a few tokens around every message and the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "cached_tokens", "tokens_used")
+# A failed encoder load (e.g. offline) is retried in the background this often
+ENCODER_RETRY_SECONDS = 60.0
+
+# Loaded encoders by encoding name, and the loads running or failed
+_encoders: Dict[str, Any] = {}
+_loading: Set[str] = set()
+_failed_at: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=16)
+def _encoding_name(model: Optional[str]) -> str:
+    """Encoding of a model
+
+    Models tiktoken does not know (e.g. Gemini) use DEFAULT_ENCODING, which
+    is close enough for budgeting.
+    """
+    try:
+        return tiktoken.encoding_name_for_model(model or "")
+    except KeyError:
+        return DEFAULT_ENCODING
+
+
+def _load(name: str) -> bool:
+    try:
+        # Downloads the encoding on first use
+        _encoders[name] = tiktoken.get_encoding(name)
+        return True
+    except Exception as e:
+        with _lock:
+            if name not in _failed_at:
+                print(f"Token encoder unavailable, estimating token counts: {e}")
+            _failed_at[name] = time.monotonic()
+        return False
+    finally:
+        with _lock:
+            _loading.discard(name)
+
+
+def load_encoders(models: Iterable[Optional[str]]):
+    """Load the encoders for ``models`` up front; blocks, so run it in a thread"""
+    if tiktoken is None:
+        return
+    for name in {_encoding_name(model) for model in models}:
+        if name not in _encoders:
+            _load(name)
+
+
+def _encoder(model: Optional[str]):
+    """Loaded tiktoken encoder for a model, or None
+
+    Never loads on the caller's thread, which may be the event loop: a
+    missing encoder is loaded in the background (a failed load at most
+    once per ENCODER_RETRY_SECONDS) while counts fall back to the estimate.
+    """
+    if tiktoken is None:
+        return None
+    name = _encoding_name(model)
+    encoder = _encoders.get(name)
+    if encoder is None:
+        with _lock:
+            start = (
+                name not in _loading
+                and time.monotonic() - _failed_at.get(name, -math.inf) >= ENCODER_RETRY_SECONDS
+            )
+            if start:
+                _loading.add(name)
+        if start:
+            threading.Thread(target=_load, args=(name,), name=f"tiktoken-{name}", daemon=True).start()
+    return encoder
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Tokens in ``text`` for ``model``; about four characters per token without tiktoken"""
+    if not text:
+        return 0
+    return _count(text, _encoder(model))
+
+
+@lru_cache(maxsize=1024)
+def _count(text: str, encoder: Any) -> int:
+    """Cached per encoder, since system prompts and FAQ answers repeat"""
+    if encoder is None:
+        return max(1, math.ceil(len(text) / 4))
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def count_prompt_tokens(parts: Iterable[str], model: Optional[str] = None) -> int:
+    """Tokens for a prompt sent as the given messages"""
+    total = TOKENS_PER_REPLY
+    for part in parts:
+        if part:
+            total += count_tokens(part, model) + TOKENS_PER_MESSAGE
+    return total
+
+
+def _usage(prompt: int, completion: int, cached: int, source: str) -> Dict[str, Any]:
+    return {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "cached_tokens": cached,
+        "tokens_used": prompt + completion,
+        "usage_source": source
+    }
+
+
+def estimate_usage(prompt_parts: Iterable[str], completion: str, model: Optional[str] = None) -> Dict[str, Any]:
+    """Usage counted locally, for providers or streams that report none"""
+    return _usage(count_prompt_tokens(prompt_parts, model), count_tokens(completion, model), 0, "estimate")
+
+
+def openai_usage(usage: Any) -> Optional[Dict[str, Any]]:
+    """Normalize an OpenAI ``CompletionUsage``"""
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+    return _usage(usage.prompt_tokens or 0, usage.completion_tokens or 0, cached, "provider")
+
+
+def gemini_usage(usage: Any) -> Optional[Dict[str, Any]]:
+    """Normalize Gemini ``usage_metadata`` (SDK object or REST JSON dict)"""
+    if not usage:
+        return None
+
+    def field(snake: str, camel: str) -> int:
+        if isinstance(usage, dict):
+            return usage.get(camel, usage.get(snake)) or 0
+        return getattr(usage, snake, 0) or 0
+
+    prompt = field("prompt_token_count", "promptTokenCount")
+    completion = field("candidates_token_count", "candidatesTokenCount")
+    if not prompt and not completion:
+        return None
+    return _usage(prompt, completion, field("cached_content_token_count", "cachedContentTokenCount"), "provider")
+
+
+def usage_metadata(response: Dict[str, Any]) -> Dict[str, Any]:
+    """The token counts of an AI response, for ConversationLog.metadata
+
+    Replies served from the response cache spent no tokens, so they report none.
+    """
+    if response.get("cached"):
+        return {}
+    return {field: response[field] for field in USAGE_FIELDS if response.get(field) is not None}
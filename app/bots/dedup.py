@@ -0,0 +1,305 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.models.message import AsyncSessionLocal, ConversationLog
+from app.state import StateBackend, shared_state
+
+
+async def _is_logged(message_id: str) -> bool:
+    """Whether a message was already logged under ``message_id``"""
+    try:
+        async with AsyncSessionLocal() as db:
+            return (await db.execute(
+                select(ConversationLog.id).where(ConversationLog.message_id == message_id)
+            )).first() is not None
+    except Exception as e:
+        print(f"Error checking message {message_id} for duplicates: {e}")
+        return False
+
+
+def update_message_id(bot: Hashable, update_id) -> str:
+    """The message_id a Telegram update is logged under"""
+    return f"tg-{bot}-{update_id}"
+
+
+async def _last_logged(bot: Hashable) -> int:
+    """Highest update id of ``bot`` logged in the last day, or -1
+
+    Telegram keeps undelivered updates for 24 hours, so older ones are
+    never redelivered.
+    """
+    prefix = update_message_id(bot, "")
+    async with AsyncSessionLocal() as db:
+        # Numeric order: longer ids are higher, then compare as text
+        message_id = (await db.execute(
+            select(ConversationLog.message_id)
+            .where(
+                ConversationLog.timestamp >= datetime.utcnow() - timedelta(days=1),
+                ConversationLog.message_id.like(f"{prefix}%")
+            )
+            .order_by(func.length(ConversationLog.message_id).desc(), ConversationLog.message_id.desc())
+            .limit(1)
+        )).scalar()
+    return int(message_id[len(prefix):]) if message_id else -1
+
+
+class _SharedClaims:
+    """Claims on message ids in the shared state, so that with several worker
+    processes only one of them accepts a redelivered update
+
+    Claims are taken while checking for duplicates and must be released if
+    the message is then refused (so its redelivery is not dropped). With the
+    in-process state backend this is a no-op.
+    """
+
+    def __init__(self, state: StateBackend, ttl: float):
+        self.state = state
+        self.ttl = ttl
+
+    async def claim(self, message_id: str) -> bool:
+        """True if this worker claimed the id, False if another already had"""
+        if not self.state.shared:
+            return True
+        return await self.state.run(self.state.add, f"dedup:{message_id}", "1", self.ttl)
+
+    async def release(self, message_id: str):
+        if self.state.shared:
+            await self.state.run(self.state.delete, f"dedup:{message_id}")
+
+
+class _Window:
+    __slots__ = ("base", "bits")
+
+    def __init__(self, base: int):
+        self.base = base
+        self.bits = 0
+
+
+class UpdateDeduplicator:
+    """Recently seen update ids per bot, as a sliding-window bitmap
+
+    Telegram update ids increase by one per update, so the last ``window``
+    ids of each bot fit in one integer bitmap: bit ``i`` is set when update
+    ``base + i`` has been accepted. Newer ids slide the window forward, and
+    lower ids arriving out of order (concurrent webhook deliveries) extend
+    it back down as long as it still spans at most ``window`` ids.
+    Membership is O(1) and memory is ``window / 8`` bytes per bot. Ids below
+    the window (very late retries) are unknown here and are looked up in the
+    database instead, where each accepted update is logged under a unique
+    message_id; they are kept in a small LRU set meanwhile, since the log
+    writer may not have flushed yet. A bot's window starts empty in every
+    process, so the highest update id logged before is looked up once, and
+    ids up to it that the window has not seen are checked in the database
+    too (redeliveries after a restart).
+
+    ``is_duplicate`` claims an update before awaiting anything, so a
+    concurrent redelivery is caught; ``release`` gives the claim up again.
+    """
+
+    def __init__(
+        self,
+        window: int = settings.TELEGRAM_DEDUP_WINDOW,
+        state: StateBackend = shared_state,
+        ttl: float = settings.STATE_DEDUP_TTL,
+        stragglers: int = 1024
+    ):
+        self.window = window
+        self.claims = _SharedClaims(state, ttl)
+        self._bots: Dict[Hashable, _Window] = {}
+        self._stragglers: "OrderedDict[Tuple[Hashable, int], None]" = OrderedDict()
+        self._max_stragglers = stragglers
+        # Highest update id per bot logged before this process saw the bot
+        self._logged_until: Dict[Hashable, int] = {}
+        self._loading: Dict[Hashable, "asyncio.Future[int]"] = {}
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.duplicates = 0
+        self.db_lookups = 0
+
+    def _seen(self, bot: Hashable, update_id: int) -> Optional[bool]:
+        state = self._bots.get(bot)
+        if state is None or update_id < state.base:
+            return None
+        offset = update_id - state.base
+        if offset >= self.window:
+            return False
+        return bool(state.bits >> offset & 1)
+
+    def seen(self, bot: Hashable, update_id: int) -> Optional[bool]:
+        """True/False if the window knows the update, None if it is older"""
+        with self._lock:
+            return self._seen(bot, update_id)
+
+    def _mark(self, bot: Hashable, update_id: int) -> bool:
+        """Set the update's bit; False if it is too far below the window"""
+        state = self._bots.get(bot)
+        if state is None:
+            state = self._bots[bot] = _Window(update_id)
+        offset = update_id - state.base
+        if offset < 0:
+            top = state.base + state.bits.bit_length() - 1
+            if state.bits and top - update_id >= self.window:
+                return False
+            state.bits <<= -offset
+            state.base = update_id
+            offset = 0
+        if offset >= self.window:
+            shift = offset - self.window + 1
+            state.bits >>= shift
+            state.base += shift
+            offset -= shift
+        state.bits |= 1 << offset
+        return True
+
+    def mark(self, bot: Hashable, update_id: int):
+        with self._lock:
+            self._mark(bot, update_id)
+
+    async def _last_logged(self, bot: Hashable) -> Optional[int]:
+        """Highest update id of ``bot`` logged before, looked up once per bot
+
+        None if the lookup failed; it is retried on the next update.
+        """
+        if bot in self._logged_until:
+            return self._logged_until[bot]
+        loading = self._loading.get(bot)
+        if loading is None:
+            loading = self._loading[bot] = asyncio.ensure_future(_last_logged(bot))
+        try:
+            # Shared by concurrent first updates, and kept if one is cancelled
+            last = await asyncio.shield(loading)
+        except Exception as e:
+            print(f"Error loading the last logged update of bot {bot}: {e}")
+            return None
+        finally:
+            if self._loading.get(bot) is loading and loading.done():
+                del self._loading[bot]
+        self._logged_until[bot] = last
+        return last
+
+    async def is_duplicate(self, bot: Hashable, update_id: int, message_id: str) -> bool:
+        """Whether an update was already accepted, asking the database only when needed
+
+        A new update is claimed (marked) before the database is consulted.
+        """
+        logged_until = await self._last_logged(bot)
+        with self._lock:
+            self.checked += 1
+            new_bot = bot not in self._bots
+            seen = self._seen(bot, update_id)
+            if seen is False:
+                self._mark(bot, update_id)
+            elif seen is None and not self._mark(bot, update_id):
+                # Too old for the window: claim it among the stragglers
+                key = (bot, update_id)
+                if key in self._stragglers:
+                    seen = True
+                else:
+                    self._stragglers[key] = None
+                    if len(self._stragglers) > self._max_stragglers:
+                        self._stragglers.popitem(last=False)
+        if seen is True:
+            lookup = False
+        elif logged_until is None or update_id <= logged_until:
+            # Possibly accepted before a restart
+            lookup = True
+        else:
+            # Newer than anything logged before: only ids below the window are unknown
+            lookup = seen is None and not new_bot
+        if lookup:
+            self.db_lookups += 1
+            seen = await _is_logged(message_id)
+        if not seen:
+            seen = not await self.claims.claim(message_id)
+        if seen:
+            self.duplicates += 1
+        return seen
+
+    async def release(self, bot: Hashable, update_id: int, message_id: str):
+        """Give up the claim on an update that was checked but not accepted"""
+        with self._lock:
+            self._stragglers.pop((bot, update_id), None)
+            state = self._bots.get(bot)
+            if state is not None and 0 <= update_id - state.base < self.window:
+                state.bits &= ~(1 << (update_id - state.base))
+        await self.claims.release(message_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window": self.window,
+            "bots": len(self._bots),
+            "stragglers": len(self._stragglers),
+            "checked": self.checked,
+            "duplicates": self.duplicates,
+            "db_lookups": self.db_lookups
+        }
+
+
+class MessageIdDeduplicator:
+    """Recently accepted message ids, for platforms whose ids are opaque strings
+
+    WhatsApp message ids are not sequential, so instead of a bitmap the last
+    ``maxsize`` accepted ids are kept in an LRU set. An id missing from it
+    may still be an older redelivery and is looked up in the database; the
+    set catches retries that arrive before the log writer has flushed.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = settings.WHATSAPP_DEDUP_SIZE,
+        state: StateBackend = shared_state,
+        ttl: float = settings.STATE_DEDUP_TTL
+    ):
+        self.maxsize = maxsize
+        self.claims = _SharedClaims(state, ttl)
+        self._ids: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.duplicates = 0
+        self.db_lookups = 0
+
+    def seen(self, message_id: str) -> bool:
+        with self._lock:
+            return message_id in self._ids
+
+    def mark(self, message_id: str):
+        with self._lock:
+            self._ids[message_id] = None
+            self._ids.move_to_end(message_id)
+            if len(self._ids) > self.maxsize:
+                self._ids.popitem(last=False)
+
+    async def is_duplicate(self, message_id: str) -> bool:
+        with self._lock:
+            self.checked += 1
+            seen = message_id in self._ids
+        if not seen:
+            self.db_lookups += 1
+            seen = await _is_logged(message_id)
+        if not seen:
+            seen = not await self.claims.claim(message_id)
+        if seen:
+            self.duplicates += 1
+        return seen
+
+    async def release(self, message_id: str):
+        """Give up the claim on a message that was checked but not accepted"""
+        await self.claims.release(message_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "maxsize": self.maxsize,
+            "size": len(self._ids),
+            "checked": self.checked,
+            "duplicates": self.duplicates,
+            "db_lookups": self.db_lookups
+        }
+
+update_dedup = UpdateDeduplicator()
+message_dedup = MessageIdDeduplicator()
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from app.config import settings
+from app.metrics import LatencyTracker
+
+_Job = Tuple[float, Callable[..., Awaitable[Any]], tuple, dict]
+
+
+class ChatDispatcher:
+    """Bounded worker pool that runs each chat's jobs in arrival order
+
+    Jobs are queued per key (the chat id). A chat with pending work sits in
+    the ready queue at most once, and only one worker handles it at a time,
+    so a chat's messages are answered serially while different chats run in
+    parallel on up to ``workers`` tasks. After each job a busy chat goes to
+    the back of the ready queue, keeping chats fair. Once ``max_pending``
+    jobs are waiting overall, or ``max_per_chat`` for one chat, new jobs are
+    refused so the caller can shed load.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.TELEGRAM_WORKERS,
+        max_pending: int = settings.TELEGRAM_MAX_PENDING,
+        max_per_chat: int = settings.TELEGRAM_MAX_PENDING_PER_CHAT
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_per_chat = max_per_chat
+        self._chats: Dict[Hashable, Deque[_Job]] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._idle: Optional[asyncio.Event] = None
+        self.pending = 0
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.shed = 0
+        self.queue_wait = LatencyTracker()
+        self.run_time = LatencyTracker()
+
+    def start(self):
+        """Start the workers on the running event loop (idempotent)"""
+        if self._tasks and not all(task.done() for task in self._tasks):
+            return
+        self._ready = asyncio.Queue()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        # Chats queued before a restart still need a worker
+        for key in self._chats:
+            self._ready.put_nowait(key)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"chat-dispatcher-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self, timeout: Optional[float] = None):
+        """Let queued jobs finish for up to ``timeout`` seconds, then cancel the workers"""
+        if not self._tasks:
+            return
+        if self.pending or self.running:
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                print(f"Dispatcher stopped with {self.pending} pending and {self.running} running jobs")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> bool:
+        """Queue ``func(*args, **kwargs)`` behind the key's earlier jobs
+
+        Returns False (and runs nothing) when the queue limits are reached.
+        """
+        self.start()
+        chat = self._chats.get(key)
+        if self.pending >= self.max_pending or (chat is not None and len(chat) >= self.max_per_chat):
+            self.shed += 1
+            return False
+
+        job = (time.perf_counter(), func, args, kwargs)
+        if chat is None:
+            self._chats[key] = deque([job])
+            self._ready.put_nowait(key)
+        else:
+            # Already queued or in progress; the worker requeues the chat when done
+            chat.append(job)
+        self.pending += 1
+        self.submitted += 1
+        self._idle.clear()
+        return True
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            chat = self._chats[key]
+            enqueued_at, func, args, kwargs = chat.popleft()
+            self.pending -= 1
+            self.running += 1
+            started = time.perf_counter()
+            self.queue_wait.record((started - enqueued_at) * 1000)
+            try:
+                await func(*args, **kwargs)
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                print(f"Error processing queued job for {key}: {e}")
+            finally:
+                self.running -= 1
+                self.run_time.record((time.perf_counter() - started) * 1000)
+                if chat:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._chats[key]
+                if not self.pending and not self.running:
+                    self._idle.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "active_chats": len(self._chats),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "shed": self.shed,
+            "queue_wait": self.queue_wait.summary(),
+            "run_time": self.run_time.summary()
+        }
+
+chat_dispatcher = ChatDispatcher()
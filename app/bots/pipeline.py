@@ -0,0 +1,230 @@
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, Hashable, Optional
+
+from app.config import settings
+from app.ai.openai_client import ai_client
+from app.ai.conversation_memory import conversation_memory
+from app.ai.token_accounting import usage_metadata
+from app.bots.dispatcher import chat_dispatcher
+from app.services.registry import services
+from app.services.intent_router import business_hours, intent_router
+from app.admin.log_writer import log_writer
+from app.admin.logs import log_message, message_row, capture_lead
+from app.models.message import MessageType
+
+LEAD_KEYWORDS = ["interested", "contact me", "email", "phone", "callback"]
+
+# Replies to non-command messages by source: intent, faq or ai
+reply_sources: Counter = Counter()
+
+
+class Channel:
+    """How the message pipeline talks back on one messaging platform
+
+    ``platform`` is stored with every log row and lead. Channels that can
+    edit a sent message set ``supports_streaming`` and implement
+    ``send_stream``; the others get the whole reply at once.
+    """
+
+    platform = ""
+    supports_streaming = False
+
+    async def send(self, chat_id: Hashable, text: str) -> Optional[Dict[str, Any]]:
+        """Send a reply; returns the API result, or None if sending failed"""
+        raise NotImplementedError
+
+    async def send_stream(self, chat_id: Hashable, stream: AsyncIterator[str], suffix: str = "") -> str:
+        """Send a reply as it is generated; returns the full text sent"""
+        raise NotImplementedError
+
+
+def accept_message(
+    channel: Channel,
+    chat_id: Hashable,
+    user_id: Hashable,
+    user_name: str,
+    text: str,
+    message_id: str,
+    metadata: Optional[Dict[str, Any]] = None
+) -> bool:
+    """Queue an incoming message for processing and log it
+
+    Messages are answered in order per chat on the shared dispatcher.
+    Returns False when the dispatcher or the log queue is full; nothing is
+    logged then, so the platform's redelivery is not mistaken for a
+    duplicate.
+    """
+
+    if not log_writer.has_room():
+        return False
+    accepted = chat_dispatcher.submit(
+        (channel.platform, chat_id),
+        process_message,
+        channel,
+        chat_id=chat_id,
+        user_id=user_id,
+        user_name=user_name,
+        text=text,
+        message_id=message_id
+    )
+    if not accepted:
+        return False
+
+    # Log incoming message (queued for the batched log writer; room was checked above)
+    log_writer.enqueue(message_row(
+        message_id=message_id,
+        user_id=str(user_id),
+        platform=channel.platform,
+        message_type=MessageType.INCOMING,
+        content=text,
+        metadata={"user_name": user_name, "chat_id": chat_id, **(metadata or {})}
+    ))
+    return True
+
+async def process_message(
+    channel: Channel,
+    chat_id: Hashable,
+    user_id: Hashable,
+    user_name: str,
+    text: str,
+    message_id: str
+):
+    """Answer one message: command, routed intent, FAQ match or AI reply, then log it"""
+
+    language = None
+    ai_response = {"provider": "command", "model": "none"}
+
+    try:
+        # Check if it's a command
+        if text.startswith("/"):
+            response_text = await handle_command(text, user_id)
+            await channel.send(chat_id, response_text)
+        else:
+            # Detect language
+            language = ai_client.detect_language(text)
+
+            # Lead conversations carry personal details, so never share their answers
+            wants_contact = settings.ENABLE_LEAD_CAPTURE and any(
+                keyword in text.lower() for keyword in LEAD_KEYWORDS
+            )
+            lead_prompt = "\n\n📝 Could you share your email or phone number so we can follow up?" if wants_contact else ""
+
+            # Order, booking and hours questions are answered by the services
+            # (in English, so only English messages are routed)
+            routed = await intent_router.route(text) if settings.INTENT_ROUTER and language == "English" else None
+
+            # Answer confidently matched FAQs directly and skip the AI call
+            faq_match = services.faq.match_faq(text) if settings.FAQ_SHORT_CIRCUIT and not routed else None
+
+            # Recent turns (and a summary of older ones) for this user
+            context = None
+            if settings.MEMORY_ENABLED and not (routed or faq_match):
+                context = await conversation_memory.get_context(str(user_id), exclude_message_id=message_id)
+
+            if routed:
+                ai_response = {"provider": "intent", "model": routed["intent"]}
+                response_text = routed["text"] + lead_prompt
+                await channel.send(chat_id, response_text)
+            elif faq_match:
+                ai_response = {"provider": "faq", "model": "tfidf", "faq_score": faq_match["score"]}
+                response_text = faq_match["answer"] + lead_prompt
+                await channel.send(chat_id, response_text)
+            elif settings.AI_STREAMING and channel.supports_streaming:
+                # Show the answer as it is generated, editing one message in place
+                stream = ai_client.stream_response(
+                    text, context=context, language=language, use_cache=not wants_contact
+                )
+                response_text = await channel.send_stream(chat_id, stream, suffix=lead_prompt)
+                ai_response = stream.result
+            else:
+                ai_response = await ai_client.generate_response(
+                    text, context=context, language=language, use_cache=not wants_contact
+                )
+                response_text = ai_response["text"] + lead_prompt
+                await channel.send(chat_id, response_text)
+            reply_sources[ai_response["provider"] if ai_response["provider"] in ("intent", "faq") else "ai"] += 1
+
+            await conversation_memory.record(str(user_id), "user", text)
+            await conversation_memory.record(str(user_id), "assistant", response_text)
+
+            # Check for lead capture opportunities
+            if wants_contact:
+                await capture_lead(str(user_id), user_name, channel.platform, text)
+
+        # Log outgoing message
+        metadata = {
+            "ai_provider": ai_response["provider"],
+            "ai_model": ai_response["model"],
+            "language": language
+        }
+        if ai_response.get("ttft_ms") is not None:
+            metadata["ttft_ms"] = ai_response["ttft_ms"]
+        if ai_response.get("faq_score") is not None:
+            metadata["faq_score"] = ai_response["faq_score"]
+        metadata.update(usage_metadata(ai_response))
+
+        await log_message(
+            message_id=f"resp_{message_id}",
+            user_id=str(user_id),
+            platform=channel.platform,
+            message_type=MessageType.OUTGOING,
+            content=response_text,
+            metadata=metadata
+        )
+
+    except Exception as e:
+        print(f"Error processing {channel.platform} message {message_id}: {e}")
+        await channel.send(chat_id, "Sorry, something went wrong. Please try again in a moment.")
+
+def stats() -> Dict[str, Any]:
+    """Where replies came from, and the share that needed no AI call"""
+    answered = sum(reply_sources.values())
+    avoided = reply_sources["intent"] + reply_sources["faq"]
+    return {
+        "replies": dict(reply_sources),
+        "ai_calls": reply_sources["ai"],
+        "ai_calls_avoided": avoided,
+        "ai_avoided_rate": round(avoided / answered, 3) if answered else None,
+        "intent_router": intent_router.stats()
+    }
+
+async def handle_command(command: str, user_id: Hashable) -> str:
+    """Handle bot commands"""
+
+    command = command.lower()
+
+    if command == "/start":
+        welcome = settings.WELCOME_MESSAGE.format(
+            bot_name=settings.BOT_NAME,
+            business_name=settings.BUSINESS_NAME
+        )
+        return welcome
+
+    elif command == "/help":
+        return """Available commands:
+/start - Start conversation
+/help - Show this help
+/order - Check order status
+/booking - Make a booking
+/faq - Frequently asked questions
+/hours - Business hours
+/privacy - Privacy policy"""
+
+    elif command == "/order":
+        return "Please share your order number, and I'll check the status for you."
+
+    elif command == "/booking":
+        return "I can help you make a booking. What date and time are you looking for?"
+
+    elif command == "/faq":
+        faqs = services.faq.get_faqs()
+        return "\n\n".join([f"Q: {q}\nA: {a}" for q, a in faqs.items()])
+
+    elif command == "/hours":
+        return business_hours()
+
+    elif command == "/privacy":
+        return f"Privacy Policy: https://yourdomain.com/privacy"
+
+    else:
+        return "I didn't recognize that command. Type /help for available commands."
@@ -1,18 +1,15 @@
-from fastapi import APIRouter, Request, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-import requests
 import json
-import uuid
+import time
 from datetime import datetime
 from typing import Optional
 
 from app.config import settings
-from app.ai.openai_client import ai_client
-from app.services.faq_service import FAQService
-from app.services.order_service import OrderService
-from app.services.booking_service import BookingService
-from app.admin.logs import log_message, capture_lead
-from app.models.message import MessageType
+from app.bots.telegram_client import telegram_client
+from app.bots.dedup import update_dedup, update_message_id
+from app.bots.pipeline import Channel, accept_message
 
 # Models
 class TelegramUpdate(BaseModel):
@@ -29,11 +26,6 @@ class TelegramUser(BaseModel):
 # Router
 telegram_router = APIRouter()
 
-# Services
-faq_service = FAQService()
-order_service = OrderService()
-booking_service = BookingService()
-
 # Webhook verification
 @telegram_router.get("/telegram")
 async def verify_webhook(request: Request):
@@ -41,167 +33,128 @@ async def verify_webhook(request: Request):
     return {"status": "Telegram webhook endpoint ready"}
 
 @telegram_router.post("/telegram")
-async def handle_telegram_webhook(
-    request: Request, 
-    background_tasks: BackgroundTasks
-):
+async def handle_telegram_webhook(request: Request):
     """Handle incoming Telegram messages"""
     
     try:
         update = await request.json()
+        status = await ingest_telegram_update(update)
         
-        if "message" in update:
-            message = update["message"]
-            
-            # Extract message details
-            chat_id = message["chat"]["id"]
-            user_id = message["from"]["id"]
-            user_name = message["from"].get("first_name", "User")
-            text = message.get("text", "")
-            
-            # Generate unique message ID
-            message_id = str(uuid.uuid4())
-            
-            # Log incoming message
-            background_tasks.add_task(
-                log_message,
-                message_id=message_id,
-                user_id=str(user_id),
-                platform="telegram",
-                message_type=MessageType.INCOMING,
-                content=text,
-                metadata={
-                    "user_name": user_name,
-                    "chat_id": chat_id,
-                    "update_id": update["update_id"]
-                }
-            )
-            
-            # Process message in background
-            background_tasks.add_task(
-                process_telegram_message,
-                chat_id=chat_id,
-                user_id=user_id,
-                user_name=user_name,
-                text=text,
-                message_id=message_id
+        if status == "busy":
+            # Overloaded: a non-2xx makes Telegram redeliver the update later
+            return JSONResponse(
+                status_code=503,
+                content={"status": "busy"},
+                headers={"Retry-After": "5"}
             )
         
-        return {"status": "ok"}
+        return {"status": status}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-async def process_telegram_message(
-    chat_id: int,
-    user_id: int,
-    user_name: str,
-    text: str,
-    message_id: str
-):
-    """Process Telegram message and send response"""
+async def ingest_telegram_update(update: dict) -> str:
+    """Accept one update from the webhook or the poller
     
-    try:
-        # Check if it's a command
-        if text.startswith("/"):
-            response_text = await handle_command(text, user_id)
-        else:
-            # Detect language
-            language = ai_client.detect_language(text)
-            
-            # Get AI response
-            ai_response = await ai_client.generate_response(text, language=language)
-            response_text = ai_response["text"]
-            
-            # Check for lead capture opportunities
-            if settings.ENABLE_LEAD_CAPTURE and any(
-                keyword in text.lower() for keyword in 
-                ["interested", "contact me", "email", "phone", "callback"]
-            ):
-                response_text += "\n\n📝 Could you share your email or phone number so we can follow up?"
-                capture_lead(str(user_id), user_name, "telegram", text)
-        
-        # Send response
-        await send_telegram_message(chat_id, response_text)
-        
-        # Log outgoing message
-        log_message(
-            message_id=f"resp_{message_id}",
-            user_id=str(user_id),
-            platform="telegram",
-            message_type=MessageType.OUTGOING,
-            content=response_text,
-            metadata={
-                "ai_provider": ai_response["provider"],
-                "ai_model": ai_response["model"],
-                "language": language
-            }
-        )
+    Returns "ok", "duplicate" (already accepted earlier) or "busy" (the
+    dispatcher is full and the update must be delivered again later).
+    """
     
-    except Exception as e:
-        error_message = f"Sorry, I encountered an error: {str(e)}"
-        await send_telegram_message(chat_id, error_message)
-
-async def handle_command(command: str, user_id: int) -> str:
-    """Handle bot commands"""
+    update_id = update["update_id"]
     
-    command = command.lower()
+    # Telegram redelivers slow or failed updates under the same update_id,
+    # which doubles as a stable message ID
+    bot_id = telegram_client.bot_id
+    message_id = update_message_id(bot_id, update_id)
+    if await update_dedup.is_duplicate(bot_id, update_id, message_id):
+        return "duplicate"
     
-    if command == "/start":
-        welcome = settings.WELCOME_MESSAGE.format(
-            bot_name=settings.BOT_NAME,
-            business_name=settings.BUSINESS_NAME
+    if "message" in update:
+        message = update["message"]
+        
+        # Queue behind this chat's earlier messages; bounded worker pool
+        accepted = accept_message(
+            telegram_channel,
+            chat_id=message["chat"]["id"],
+            user_id=message["from"]["id"],
+            user_name=message["from"].get("first_name", "User"),
+            text=message.get("text", ""),
+            message_id=message_id,
+            metadata={"update_id": update_id}
         )
-        return welcome
-    
-    elif command == "/help":
-        return """Available commands:
-/start - Start conversation
-/help - Show this help
-/order - Check order status
-/booking - Make a booking
-/faq - Frequently asked questions
-/hours - Business hours
-/privacy - Privacy policy"""
-    
-    elif command == "/order":
-        return "Please share your order number, and I'll check the status for you."
+        if not accepted:
+            await update_dedup.release(bot_id, update_id, message_id)
+            return "busy"
     
-    elif command == "/booking":
-        return "I can help you make a booking. What date and time are you looking for?"
-    
-    elif command == "/faq":
-        faqs = faq_service.get_faqs()
-        return "\n\n".join([f"Q: {q}\nA: {a}" for q, a in faqs.items()])
-    
-    elif command == "/hours":
-        return f"Business Hours: {settings.BUSINESS_HOURS_START} to {settings.BUSINESS_HOURS_END} ({settings.BUSINESS_TIMEZONE})"
-    
-    elif command == "/privacy":
-        return f"Privacy Policy: https://yourdomain.com/privacy"
-    
-    else:
-        return "I didn't recognize that command. Type /help for available commands."
+    return "ok"
+
+async def send_streaming_reply(chat_id: int, stream, suffix: str = "") -> str:
+    """Send the first chunk of a streamed reply, then edit it as text arrives
+    
+    Edits are spaced at least TELEGRAM_STREAM_EDIT_INTERVAL seconds apart and
+    only sent once TELEGRAM_STREAM_MIN_CHARS new characters have accumulated,
+    keeping well inside Telegram's per-chat edit limits.
+    """
+    
+    text = ""
+    sent_text = ""
+    sent_message_id = None
+    last_edit = 0.0
+    
+    async for chunk in stream:
+        text += chunk
+        if len(text) - len(sent_text) < settings.TELEGRAM_STREAM_MIN_CHARS:
+            continue
+        
+        if sent_message_id is None:
+            # Partial text may contain unbalanced HTML, so intermediate updates are plain text
+            result = await telegram_client.send_message(chat_id, text, parse_mode=None)
+            if result.get("ok"):
+                sent_message_id = result["result"]["message_id"]
+                sent_text = text
+                last_edit = time.monotonic()
+        elif time.monotonic() - last_edit >= settings.TELEGRAM_STREAM_EDIT_INTERVAL:
+            result = await telegram_client.edit_message_text(chat_id, sent_message_id, text, parse_mode=None)
+            if result.get("ok"):
+                sent_text = text
+            last_edit = time.monotonic()
+    
+    text += suffix
+    
+    if sent_message_id is None:
+        await send_telegram_message(chat_id, text)
+    elif text != sent_text:
+        result = await telegram_client.edit_message_text(chat_id, sent_message_id, text)
+        if not result.get("ok"):
+            print(f"Error editing Telegram message: {result.get('description')}")
+    
+    return text
 
 async def send_telegram_message(chat_id: int, text: str):
     """Send message to Telegram"""
     
-    url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
-    
-    payload = {
-        "chat_id": chat_id,
-        "text": text,
-        "parse_mode": "HTML"
-    }
-    
     try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-        return response.json()
+        result = await telegram_client.send_message(chat_id, text)
+        if not result.get("ok"):
+            print(f"Error sending Telegram message: {result.get('description')}")
+            return None
+        return result
     except Exception as e:
         print(f"Error sending Telegram message: {e}")
         return None
 
+class TelegramChannel(Channel):
+    platform = "telegram"
+    supports_streaming = True
+    
+    async def send(self, chat_id: int, text: str):
+        return await send_telegram_message(chat_id, text)
+    
+    async def send_stream(self, chat_id: int, stream, suffix: str = "") -> str:
+        return await send_streaming_reply(chat_id, stream, suffix=suffix)
+
+telegram_channel = TelegramChannel()
+
 # Webhook setup endpoint
 @telegram_router.post("/telegram/setup")
 async def setup_telegram_webhook():
@@ -213,21 +166,19 @@ async def setup_telegram_webhook():
     if not settings.TELEGRAM_WEBHOOK_URL:
         return {"error": "TELEGRAM_WEBHOOK_URL not configured"}
     
-    url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/setWebhook"
+    if settings.TELEGRAM_MODE == "polling":
+        return {"error": "TELEGRAM_MODE is polling; a webhook would stop getUpdates"}
     
-    payload = {
-        "url": f"{settings.TELEGRAM_WEBHOOK_URL}/webhook/telegram"
-    }
+    webhook_url = f"{settings.TELEGRAM_WEBHOOK_URL}/webhook/telegram"
     
     try:
-        response = requests.post(url, json=payload)
-        result = response.json()
+        result = await telegram_client.set_webhook(webhook_url)
         
         if result.get("ok"):
             return {
                 "status": "success",
                 "message": "Telegram webhook set up successfully",
-                "webhook_url": payload["url"]
+                "webhook_url": webhook_url
             }
         else:
             return {
@@ -0,0 +1,146 @@
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.config import settings
+from app.metrics import LatencyTracker
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class TelegramClient:
+    """Async Bot API client sharing one keep-alive connection pool"""
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout: Optional[float] = None
+    ):
+        self.token = token if token is not None else settings.TELEGRAM_BOT_TOKEN
+        self.base_url = (base_url or settings.TELEGRAM_API_URL).rstrip("/")
+        self.timeout = timeout if timeout is not None else settings.TELEGRAM_TIMEOUT
+        self.http2 = settings.TELEGRAM_HTTP2 and _http2_available()
+        self.limits = httpx.Limits(
+            max_connections=settings.TELEGRAM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.TELEGRAM_MAX_KEEPALIVE
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self.latency = LatencyTracker()
+        self.in_flight = 0
+        self.errors = 0
+
+    @property
+    def bot_id(self) -> str:
+        """Numeric bot id, the part of the token before the colon"""
+        return self.token.split(":", 1)[0]
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.base_url}/bot{self.token}/",
+                http2=self.http2,
+                limits=self.limits,
+                timeout=httpx.Timeout(self.timeout, connect=settings.TELEGRAM_CONNECT_TIMEOUT)
+            )
+        return self._client
+
+    async def call(
+        self,
+        method: str,
+        payload: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Call a Bot API method and return the decoded JSON body
+
+        API-level failures come back as ``{"ok": false, "description": ...}``
+        just like the Bot API reports them; transport and 5xx errors raise.
+        """
+
+        request_timeout = timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+        started = time.perf_counter()
+        self.in_flight += 1
+        try:
+            response = await self.client.post(method, json=payload or {}, timeout=request_timeout)
+            if response.status_code >= 500:
+                response.raise_for_status()
+            result = response.json()
+            if not result.get("ok"):
+                self.errors += 1
+            return result
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.latency.record((time.perf_counter() - started) * 1000)
+
+    async def send_message(self, chat_id: int, text: str, parse_mode: Optional[str] = "HTML") -> Dict[str, Any]:
+        payload = {"chat_id": chat_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        return await self.call("sendMessage", payload)
+
+    async def edit_message_text(
+        self,
+        chat_id: int,
+        message_id: int,
+        text: str,
+        parse_mode: Optional[str] = "HTML"
+    ) -> Dict[str, Any]:
+        payload = {"chat_id": chat_id, "message_id": message_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        return await self.call("editMessageText", payload)
+
+    async def set_webhook(self, url: str) -> Dict[str, Any]:
+        return await self.call("setWebhook", {"url": url})
+
+    async def delete_webhook(self) -> Dict[str, Any]:
+        return await self.call("deleteWebhook", {"drop_pending_updates": False})
+
+    async def get_updates(
+        self,
+        offset: Optional[int] = None,
+        timeout: int = 30,
+        limit: int = 100,
+        allowed_updates: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Long-poll for updates; the HTTP timeout is extended past the poll timeout"""
+        payload: Dict[str, Any] = {"timeout": timeout, "limit": limit}
+        if offset is not None:
+            payload["offset"] = offset
+        if allowed_updates is not None:
+            payload["allowed_updates"] = allowed_updates
+        return await self.call("getUpdates", payload, timeout=timeout + self.timeout)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool configuration, in-flight requests and latency summary"""
+        return {
+            "base_url": self.base_url,
+            "http2": self.http2,
+            "pool": {
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+                "open": self._client is not None and not self._client.is_closed
+            },
+            "in_flight": self.in_flight,
+            "errors": self.errors,
+            "latency": self.latency.summary()
+        }
+
+telegram_client = TelegramClient()
@@ -0,0 +1,193 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.bots.telegram_client import TelegramClient, telegram_client
+from app.bots.telegram_bot import ingest_telegram_update
+from app.metrics import LatencyTracker
+from app.state import WORKER_ID, StateBackend, shared_state
+
+ALLOWED_UPDATES = ["message", "callback_query"]
+MAX_BACKOFF = 30.0
+LEASE_KEY = "telegram:poller"
+
+
+def _chat_of(update: Dict[str, Any]) -> Any:
+    """Chat an update belongs to, or None"""
+    message = update.get("message") or (update.get("callback_query") or {}).get("message") or {}
+    return message.get("chat", {}).get("id")
+
+
+class TelegramPoller:
+    """Receive updates with getUpdates long polling instead of the webhook
+
+    Each batch is ingested through the same path as the webhook (dedup,
+    per-chat dispatcher, logging), one chat at a time in update order and
+    different chats concurrently. The offset only moves
+    past updates that were accepted: if the dispatcher sheds some, polling
+    resumes from the first shed update after a short pause, and the
+    deduplicator skips the ones already accepted.
+
+    Telegram serves getUpdates to one consumer at a time, so with several
+    worker processes only the holder of a lease in the shared state polls.
+    It renews the lease before every poll; the others stand by and one of
+    them takes over once the lease expires.
+    """
+
+    def __init__(
+        self,
+        client: TelegramClient = telegram_client,
+        poll_timeout: int = settings.TELEGRAM_POLL_TIMEOUT,
+        limit: int = settings.TELEGRAM_POLL_LIMIT,
+        state: StateBackend = shared_state,
+        lease_ttl: float = settings.TELEGRAM_POLL_LEASE
+    ):
+        self.client = client
+        self.poll_timeout = poll_timeout
+        self.limit = limit
+        self.state = state
+        self.lease_ttl = lease_ttl
+        self.leader = False
+        self.offset: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self.polls = 0
+        self.updates = 0
+        self.busy = 0
+        self.errors = 0
+        self.batch_latency = LatencyTracker()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="telegram-poller")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self.leader:
+            await self.state.run(self.state.release_lease, LEASE_KEY, WORKER_ID)
+            self.leader = False
+
+    async def _run(self):
+        backoff = 1.0
+
+        while True:
+            leading = self.leader
+            self.leader = await self.state.run(self.state.lease, LEASE_KEY, WORKER_ID, self.lease_ttl)
+            if not self.leader:
+                # Another worker is polling
+                await asyncio.sleep(self.lease_ttl / 3)
+                continue
+            if not leading:
+                # getUpdates is refused while a webhook is set
+                self.offset = None
+                await self._delete_webhook()
+
+            try:
+                result = await self.client.get_updates(
+                    offset=self.offset,
+                    timeout=self.poll_timeout,
+                    limit=self.limit,
+                    allowed_updates=ALLOWED_UPDATES
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"Error polling Telegram updates: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+
+            self.polls += 1
+            if not result.get("ok"):
+                self.errors += 1
+                print(f"Error polling Telegram updates: {result.get('description')}")
+                if result.get("error_code") == 409:
+                    await self._delete_webhook()
+                retry_after = (result.get("parameters") or {}).get("retry_after")
+                await asyncio.sleep(retry_after or backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+
+            backoff = 1.0
+            updates = result.get("result") or []
+            if updates:
+                await self.process_batch(updates)
+
+    async def process_batch(self, updates: List[Dict[str, Any]]):
+        """Ingest a batch and advance the offset past what was accepted
+
+        A chat's updates are ingested one after another in update_id order,
+        so they reach the dispatcher in that order even when one waits on a
+        dedup lookup; different chats are ingested concurrently. Once one of
+        a chat's updates is refused, its later ones wait for the redelivery.
+        """
+        started = time.perf_counter()
+        chats: Dict[Any, List[Dict[str, Any]]] = {}
+        for update in sorted(updates, key=lambda update: update["update_id"]):
+            chats.setdefault(_chat_of(update), []).append(update)
+        results: Dict[int, Any] = {}
+
+        async def ingest_chat(chat_updates: List[Dict[str, Any]]):
+            for index, update in enumerate(chat_updates):
+                try:
+                    results[update["update_id"]] = await ingest_telegram_update(update)
+                except Exception as e:
+                    results[update["update_id"]] = e
+                    continue
+                if results[update["update_id"]] == "busy":
+                    for later in chat_updates[index + 1:]:
+                        results[later["update_id"]] = "busy"
+                    return
+
+        await asyncio.gather(*(ingest_chat(chat_updates) for chat_updates in chats.values()))
+        statuses = [results[update["update_id"]] for update in updates]
+        self.batch_latency.record((time.perf_counter() - started) * 1000)
+
+        retry = [
+            update["update_id"]
+            for update, status in zip(updates, statuses)
+            if status == "busy"
+        ]
+        for update, status in zip(updates, statuses):
+            if isinstance(status, Exception):
+                # Malformed updates would be redelivered forever, so skip them
+                self.errors += 1
+                print(f"Error processing Telegram update {update.get('update_id')}: {status}")
+
+        self.updates += len(updates) - len(retry)
+        if retry:
+            self.busy += len(retry)
+            self.offset = min(retry)
+            await asyncio.sleep(1.0)
+        else:
+            self.offset = max(update["update_id"] for update in updates) + 1
+
+    async def _delete_webhook(self):
+        try:
+            result = await self.client.delete_webhook()
+            if not result.get("ok"):
+                print(f"Error deleting Telegram webhook: {result.get('description')}")
+        except Exception as e:
+            print(f"Error deleting Telegram webhook: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "leader": self.leader,
+            "offset": self.offset,
+            "polls": self.polls,
+            "updates": self.updates,
+            "busy": self.busy,
+            "errors": self.errors,
+            "batch_latency": self.batch_latency.summary()
+        }
+
+telegram_poller = TelegramPoller()
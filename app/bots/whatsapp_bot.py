@@ -0,0 +1,217 @@
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import hmac
+import json
+
+from app.config import settings
+from app.bots.whatsapp_client import whatsapp_client
+from app.bots.dedup import message_dedup
+from app.bots.pipeline import Channel, accept_message
+
+# Router
+whatsapp_router = APIRouter()
+
+# Webhook deliveries, messages and delivery statuses seen, by outcome
+webhook_stats: Counter = Counter()
+
+class WhatsAppChannel(Channel):
+    """Replies from the business phone number that received the message"""
+
+    platform = "whatsapp"
+
+    def __init__(self, phone_number_id: Optional[str] = None):
+        self.phone_number_id = phone_number_id
+
+    async def send(self, chat_id: str, text: str):
+        return await send_whatsapp_message(chat_id, text, self.phone_number_id)
+
+_channels: Dict[Optional[str], WhatsAppChannel] = {}
+
+def whatsapp_channel(phone_number_id: Optional[str] = None) -> WhatsAppChannel:
+    channel = _channels.get(phone_number_id)
+    if channel is None:
+        channel = _channels[phone_number_id] = WhatsAppChannel(phone_number_id)
+    return channel
+
+# Webhook verification
+@whatsapp_router.get("/whatsapp")
+async def verify_webhook(request: Request):
+    """Answer Meta's subscription check by echoing hub.challenge"""
+
+    params = request.query_params
+    if (
+        settings.WHATSAPP_VERIFY_TOKEN
+        and params.get("hub.mode") == "subscribe"
+        and hmac.compare_digest(params.get("hub.verify_token", ""), settings.WHATSAPP_VERIFY_TOKEN)
+    ):
+        return PlainTextResponse(params.get("hub.challenge", ""))
+    raise HTTPException(status_code=403, detail="Verification failed")
+
+@whatsapp_router.post("/whatsapp")
+async def handle_whatsapp_webhook(request: Request):
+    """Handle incoming WhatsApp messages and delivery statuses"""
+
+    if not settings.WHATSAPP_APP_SECRET:
+        webhook_stats["no_app_secret"] += 1
+        raise HTTPException(status_code=403, detail="WHATSAPP_APP_SECRET is not configured")
+
+    body = await request.body()
+    if not verify_signature(body, request.headers.get("X-Hub-Signature-256")):
+        webhook_stats["bad_signature"] += 1
+        raise HTTPException(status_code=403, detail="Invalid signature")
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+
+    try:
+        status = await ingest_whatsapp_payload(payload)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if status == "busy":
+        # Meta retries deliveries that do not get a 200; accepted messages are deduplicated
+        return JSONResponse(
+            status_code=503,
+            content={"status": "busy"},
+            headers={"Retry-After": "5"}
+        )
+
+    return {"status": status}
+
+def verify_signature(body: bytes, signature: Optional[str]) -> bool:
+    """Check X-Hub-Signature-256, the HMAC-SHA256 of the raw body under the app secret
+
+    Without WHATSAPP_APP_SECRET configured no payload can be verified, so
+    every one is refused.
+    """
+
+    if not settings.WHATSAPP_APP_SECRET:
+        return False
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(settings.WHATSAPP_APP_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len("sha256="):])
+
+def message_text(message: Dict[str, Any]) -> Optional[str]:
+    """Text of a text, quick-reply button or interactive reply message"""
+
+    kind = message.get("type")
+    if kind == "text":
+        return message.get("text", {}).get("body", "")
+    if kind == "button":
+        return message.get("button", {}).get("text", "")
+    if kind == "interactive":
+        interactive = message.get("interactive", {})
+        reply = interactive.get("button_reply") or interactive.get("list_reply") or {}
+        return reply.get("title", "")
+    return None
+
+def parse_webhook(payload: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Flatten a webhook into its messages and delivery statuses
+
+    One delivery can batch several entries (business accounts), each with
+    several changes, each carrying any number of messages and statuses.
+    Messages keep their delivery order and get the sender's profile name
+    and the receiving phone number attached.
+    """
+
+    messages = []
+    statuses = []
+    for entry in payload.get("entry", []):
+        for change in entry.get("changes", []):
+            if change.get("field") != "messages":
+                continue
+            value = change.get("value", {})
+            phone_number_id = value.get("metadata", {}).get("phone_number_id")
+            names = {
+                contact.get("wa_id"): contact.get("profile", {}).get("name")
+                for contact in value.get("contacts", [])
+            }
+            for message in value.get("messages", []):
+                messages.append({
+                    "id": message["id"],
+                    "from": message["from"],
+                    "name": names.get(message["from"]) or "User",
+                    "phone_number_id": phone_number_id,
+                    "timestamp": message.get("timestamp"),
+                    "type": message.get("type"),
+                    "text": message_text(message)
+                })
+            statuses.extend(value.get("statuses", []))
+    return messages, statuses
+
+async def ingest_whatsapp_payload(payload: Dict[str, Any]) -> str:
+    """Accept every new message of a webhook delivery
+
+    Returns "ok", or "busy" when the dispatcher is full. Messages after the
+    first refused one are left for the redelivery too, so a chat's messages
+    are still answered in order.
+    """
+
+    webhook_stats["deliveries"] += 1
+    messages, statuses = parse_webhook(payload)
+
+    for status in statuses:
+        webhook_stats[f"status_{status.get('status')}"] += 1
+        if status.get("status") == "failed":
+            print(f"WhatsApp message {status.get('id')} failed: {status.get('errors')}")
+
+    # Meta redelivers unacknowledged webhooks under the same message ids
+    duplicates = await asyncio.gather(*(
+        message_dedup.is_duplicate(f"wa-{message['id']}") for message in messages
+    ))
+
+    for index, (message, duplicate) in enumerate(zip(messages, duplicates)):
+        message_id = f"wa-{message['id']}"
+        # A concurrent redelivery may have been accepted while the database was checked
+        if duplicate or message_dedup.seen(message_id):
+            webhook_stats["duplicates"] += 1
+            continue
+
+        if message["text"] is None:
+            # Media, locations, reactions etc. are not answered
+            webhook_stats["unsupported"] += 1
+            message_dedup.mark(message_id)
+            continue
+
+        accepted = accept_message(
+            whatsapp_channel(message["phone_number_id"]),
+            chat_id=message["from"],
+            user_id=message["from"],
+            user_name=message["name"],
+            text=message["text"],
+            message_id=message_id,
+            metadata={"phone_number_id": message["phone_number_id"], "wa_timestamp": message["timestamp"]}
+        )
+        if not accepted:
+            webhook_stats["busy"] += 1
+            # Left for the redelivery, along with everything after it
+            await asyncio.gather(*(
+                message_dedup.release(f"wa-{later['id']}")
+                for later, later_duplicate in zip(messages[index:], duplicates[index:])
+                if not later_duplicate
+            ))
+            return "busy"
+        webhook_stats["messages"] += 1
+        message_dedup.mark(message_id)
+
+    return "ok"
+
+async def send_whatsapp_message(to: str, text: str, phone_number_id: Optional[str] = None):
+    """Send message to WhatsApp"""
+
+    try:
+        result = await whatsapp_client.send_message(to, text, phone_number_id)
+        if "error" in result:
+            print(f"Error sending WhatsApp message: {result['error'].get('message')}")
+            return None
+        return result
+    except Exception as e:
+        print(f"Error sending WhatsApp message: {e}")
+        return None
@@ -0,0 +1,102 @@
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.config import settings
+from app.metrics import LatencyTracker
+
+# Longest text body the Cloud API accepts
+MAX_TEXT_LENGTH = 4096
+
+
+class WhatsAppClient:
+    """Async Cloud API client sharing one keep-alive connection pool"""
+
+    def __init__(
+        self,
+        access_token: Optional[str] = None,
+        phone_number_id: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout: Optional[float] = None
+    ):
+        self.access_token = access_token if access_token is not None else settings.WHATSAPP_ACCESS_TOKEN
+        self.phone_number_id = phone_number_id if phone_number_id is not None else settings.WHATSAPP_PHONE_NUMBER_ID
+        self.base_url = (base_url or settings.WHATSAPP_API_URL).rstrip("/")
+        self.timeout = timeout if timeout is not None else settings.WHATSAPP_TIMEOUT
+        self.limits = httpx.Limits(
+            max_connections=settings.WHATSAPP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.WHATSAPP_MAX_KEEPALIVE
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self.latency = LatencyTracker()
+        self.in_flight = 0
+        self.errors = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.base_url}/{settings.WHATSAPP_API_VERSION}/",
+                headers={"Authorization": f"Bearer {self.access_token}"},
+                limits=self.limits,
+                timeout=self.timeout
+            )
+        return self._client
+
+    async def call(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST to a Graph API path and return the decoded JSON body
+
+        API errors come back as the Graph ``{"error": {...}}`` body; transport
+        and 5xx errors raise.
+        """
+
+        started = time.perf_counter()
+        self.in_flight += 1
+        try:
+            response = await self.client.post(path, json=payload)
+            if response.status_code >= 500:
+                response.raise_for_status()
+            result = response.json()
+            if "error" in result:
+                self.errors += 1
+            return result
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.latency.record((time.perf_counter() - started) * 1000)
+
+    async def send_message(self, to: str, text: str, phone_number_id: Optional[str] = None) -> Dict[str, Any]:
+        """Send a text message from ``phone_number_id`` (the configured number by default)"""
+        payload = {
+            "messaging_product": "whatsapp",
+            "recipient_type": "individual",
+            "to": to,
+            "type": "text",
+            "text": {"preview_url": False, "body": text[:MAX_TEXT_LENGTH]}
+        }
+        return await self.call(f"{phone_number_id or self.phone_number_id}/messages", payload)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool configuration, in-flight requests and latency summary"""
+        return {
+            "base_url": self.base_url,
+            "pool": {
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+                "open": self._client is not None and not self._client.is_closed
+            },
+            "in_flight": self.in_flight,
+            "errors": self.errors,
+            "latency": self.latency.summary()
+        }
+
+whatsapp_client = WhatsAppClient()
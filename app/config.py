@@ -18,6 +18,32 @@ class Settings(BaseSettings):
     # Telegram
     TELEGRAM_BOT_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
     TELEGRAM_WEBHOOK_URL: str = os.getenv("TELEGRAM_WEBHOOK_URL", "")
+    TELEGRAM_MODE: str = os.getenv("TELEGRAM_MODE", "webhook").lower()  # webhook or polling
+    TELEGRAM_POLL_TIMEOUT: int = int(os.getenv("TELEGRAM_POLL_TIMEOUT", 30))
+    TELEGRAM_POLL_LIMIT: int = int(os.getenv("TELEGRAM_POLL_LIMIT", 100))
+    TELEGRAM_API_URL: str = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+    TELEGRAM_TIMEOUT: float = float(os.getenv("TELEGRAM_TIMEOUT", 10))
+    TELEGRAM_CONNECT_TIMEOUT: float = float(os.getenv("TELEGRAM_CONNECT_TIMEOUT", 5))
+    TELEGRAM_MAX_CONNECTIONS: int = int(os.getenv("TELEGRAM_MAX_CONNECTIONS", 100))
+    TELEGRAM_MAX_KEEPALIVE: int = int(os.getenv("TELEGRAM_MAX_KEEPALIVE", 20))
+    TELEGRAM_HTTP2: bool = os.getenv("TELEGRAM_HTTP2", "True").lower() == "true"
+    TELEGRAM_WORKERS: int = int(os.getenv("TELEGRAM_WORKERS", 8))
+    TELEGRAM_MAX_PENDING: int = int(os.getenv("TELEGRAM_MAX_PENDING", 1000))
+    TELEGRAM_MAX_PENDING_PER_CHAT: int = int(os.getenv("TELEGRAM_MAX_PENDING_PER_CHAT", 20))
+    TELEGRAM_DRAIN_TIMEOUT: float = float(os.getenv("TELEGRAM_DRAIN_TIMEOUT", 10))
+    TELEGRAM_DEDUP_WINDOW: int = int(os.getenv("TELEGRAM_DEDUP_WINDOW", 65536))
+    
+    # WhatsApp Cloud API
+    WHATSAPP_ACCESS_TOKEN: str = os.getenv("WHATSAPP_ACCESS_TOKEN", "")
+    WHATSAPP_PHONE_NUMBER_ID: str = os.getenv("WHATSAPP_PHONE_NUMBER_ID", "")
+    WHATSAPP_VERIFY_TOKEN: str = os.getenv("WHATSAPP_VERIFY_TOKEN", "")
+    WHATSAPP_APP_SECRET: str = os.getenv("WHATSAPP_APP_SECRET", "")
+    WHATSAPP_API_URL: str = os.getenv("WHATSAPP_API_URL", "https://graph.facebook.com")
+    WHATSAPP_API_VERSION: str = os.getenv("WHATSAPP_API_VERSION", "v21.0")
+    WHATSAPP_TIMEOUT: float = float(os.getenv("WHATSAPP_TIMEOUT", 10))
+    WHATSAPP_MAX_CONNECTIONS: int = int(os.getenv("WHATSAPP_MAX_CONNECTIONS", 100))
+    WHATSAPP_MAX_KEEPALIVE: int = int(os.getenv("WHATSAPP_MAX_KEEPALIVE", 20))
+    WHATSAPP_DEDUP_SIZE: int = int(os.getenv("WHATSAPP_DEDUP_SIZE", 65536))
     
     # AI Configuration
     AI_PROVIDER: str = os.getenv("AI_PROVIDER", "openai")  # openai or gemini
@@ -25,7 +51,36 @@ class Settings(BaseSettings):
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
     GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-pro")
+    GEMINI_BACKEND: str = os.getenv("GEMINI_BACKEND", "http").lower()  # http or sdk
+    GEMINI_API_URL: str = os.getenv("GEMINI_API_URL", "https://generativelanguage.googleapis.com")
+    GEMINI_API_VERSION: str = os.getenv("GEMINI_API_VERSION", "v1beta")
+    GEMINI_TIMEOUT: float = float(os.getenv("GEMINI_TIMEOUT", 30))
+    GEMINI_CONNECT_TIMEOUT: float = float(os.getenv("GEMINI_CONNECT_TIMEOUT", 5))
+    GEMINI_MAX_CONNECTIONS: int = int(os.getenv("GEMINI_MAX_CONNECTIONS", 100))
+    GEMINI_MAX_KEEPALIVE: int = int(os.getenv("GEMINI_MAX_KEEPALIVE", 20))
+    GEMINI_EMBEDDING_MODEL: str = os.getenv("GEMINI_EMBEDDING_MODEL", "text-embedding-004")
     AI_TEMPERATURE: float = float(os.getenv("AI_TEMPERATURE", 0.7))
+    AI_STREAMING: bool = os.getenv("AI_STREAMING", "False").lower() == "true"
+    TELEGRAM_STREAM_EDIT_INTERVAL: float = float(os.getenv("TELEGRAM_STREAM_EDIT_INTERVAL", 1.0))
+    TELEGRAM_STREAM_MIN_CHARS: int = int(os.getenv("TELEGRAM_STREAM_MIN_CHARS", 20))
+    AI_CACHE_BACKEND: str = os.getenv("AI_CACHE_BACKEND", "memory")  # memory, sqlite, shared or none
+    AI_CACHE_TTL: float = float(os.getenv("AI_CACHE_TTL", 3600))
+    AI_CACHE_MAX_ENTRIES: int = int(os.getenv("AI_CACHE_MAX_ENTRIES", 5000))
+    AI_CACHE_PATH: str = os.getenv("AI_CACHE_PATH", "database/ai_cache.db")
+    OPENAI_RPM: int = int(os.getenv("OPENAI_RPM", 500))
+    OPENAI_TPM: int = int(os.getenv("OPENAI_TPM", 200000))
+    GEMINI_RPM: int = int(os.getenv("GEMINI_RPM", 60))
+    GEMINI_TPM: int = int(os.getenv("GEMINI_TPM", 1000000))
+    AI_MAX_RETRIES: int = int(os.getenv("AI_MAX_RETRIES", 3))
+    AI_RETRY_BASE_DELAY: float = float(os.getenv("AI_RETRY_BASE_DELAY", 0.5))
+    AI_RETRY_MAX_DELAY: float = float(os.getenv("AI_RETRY_MAX_DELAY", 8))
+    AI_QUEUE_TIMEOUT: float = float(os.getenv("AI_QUEUE_TIMEOUT", 30))
+    AI_HEDGING: bool = os.getenv("AI_HEDGING", "True").lower() == "true"
+    AI_HEDGE_PERCENTILE: float = float(os.getenv("AI_HEDGE_PERCENTILE", 95))
+    AI_HEDGE_MIN_DELAY: float = float(os.getenv("AI_HEDGE_MIN_DELAY", 1.0))
+    AI_HEDGE_BUDGET: float = float(os.getenv("AI_HEDGE_BUDGET", 0.1))
+    AI_FAILOVER_THRESHOLD: int = int(os.getenv("AI_FAILOVER_THRESHOLD", 3))
+    AI_FAILOVER_COOLDOWN: float = float(os.getenv("AI_FAILOVER_COOLDOWN", 30))
     
     # Business Settings
     BUSINESS_TIMEZONE: str = os.getenv("BUSINESS_TIMEZONE", "UTC")
@@ -38,11 +93,52 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///database/logs.db")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", 10))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    SQLITE_PROFILE: str = os.getenv("SQLITE_PROFILE", "wal")  # stock, safe, wal or fast
+    SQLITE_CHECKPOINT_INTERVAL: float = float(os.getenv("SQLITE_CHECKPOINT_INTERVAL", 300))
+    SQLITE_ANALYZE_INTERVAL: float = float(os.getenv("SQLITE_ANALYZE_INTERVAL", 3600))
+    LOG_BATCH_SIZE: int = int(os.getenv("LOG_BATCH_SIZE", 200))
+    LOG_FLUSH_INTERVAL: float = float(os.getenv("LOG_FLUSH_INTERVAL", 1.0))
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+    LOGS_COUNT_TTL: float = float(os.getenv("LOGS_COUNT_TTL", 60))
     
     # Server
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", 8000))
     DEBUG_MODE: bool = os.getenv("DEBUG_MODE", "False").lower() == "true"
+    WORKERS: int = int(os.getenv("WORKERS", 1))
+    
+    # State shared by worker processes (dedup, leases, booking/FAQ versions)
+    STATE_BACKEND: str = os.getenv("STATE_BACKEND", "memory").lower()  # memory, sqlite or redis
+    STATE_PATH: str = os.getenv("STATE_PATH", "database/state.db")
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    STATE_DEDUP_TTL: float = float(os.getenv("STATE_DEDUP_TTL", 86400))
+    TELEGRAM_POLL_LEASE: float = float(os.getenv("TELEGRAM_POLL_LEASE", 90))
+    
+    # Conversation memory
+    MEMORY_ENABLED: bool = os.getenv("MEMORY_ENABLED", "True").lower() == "true"
+    MEMORY_MAX_USERS: int = int(os.getenv("MEMORY_MAX_USERS", 10000))
+    MEMORY_MAX_TURNS: int = int(os.getenv("MEMORY_MAX_TURNS", 20))
+    MEMORY_TOKEN_BUDGET: int = int(os.getenv("MEMORY_TOKEN_BUDGET", 800))
+    MEMORY_SUMMARY_TOKENS: int = int(os.getenv("MEMORY_SUMMARY_TOKENS", 200))
+    
+    # Bookings
+    BOOKING_HORIZON_DAYS: int = int(os.getenv("BOOKING_HORIZON_DAYS", 7))
+    BOOKING_RESOURCES: str = os.getenv("BOOKING_RESOURCES", "default")  # comma-separated staff/rooms
+    BOOKING_LUNCH_HOUR: int = int(os.getenv("BOOKING_LUNCH_HOUR", 12))
+    
+    # FAQ matching
+    FAQ_SHORT_CIRCUIT: bool = os.getenv("FAQ_SHORT_CIRCUIT", "True").lower() == "true"
+    FAQ_MATCH_THRESHOLD: float = float(os.getenv("FAQ_MATCH_THRESHOLD", 0.5))
+    
+    # Intent routing (answer order, booking and hours questions without the AI)
+    INTENT_ROUTER: bool = os.getenv("INTENT_ROUTER", "True").lower() == "true"
+    INTENT_MODEL: str = os.getenv("INTENT_MODEL", "regex").lower()  # regex or tfidf
+    INTENT_MODEL_THRESHOLD: float = float(os.getenv("INTENT_MODEL_THRESHOLD", 0.6))
+    INTENT_MAX_WORDS: int = int(os.getenv("INTENT_MAX_WORDS", 20))
     
     # Features
     ENABLE_LEAD_CAPTURE: bool = True
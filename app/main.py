@@ -1,27 +1,61 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
+import asyncio
 import uvicorn
 import os
-from dotenv import load_dotenv
 
 from app.config import settings
-from app.bot.telegram import telegram_router
+from app.bots.telegram_bot import telegram_router
+from app.bots.telegram_client import telegram_client
+from app.bots.whatsapp_bot import whatsapp_router
+from app.bots.whatsapp_client import whatsapp_client
+from app.bots.dispatcher import chat_dispatcher
+from app.ai.gemini_client import gemini_client
+from app.bots.telegram_poller import telegram_poller
+from app.admin.log_writer import log_writer
+from app.ai.token_accounting import load_encoders
 from app.admin.logs import admin_router
+from app.services.registry import services
+from app.models.message import async_engine, init_db, sqlite_maintenance
 from app.services.faq_service import faq_router
 from app.services.order_service import order_router
 from app.services.booking_service import booking_router
 
-# Load environment variables
-load_dotenv()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema setup runs here rather than at import, so importing the app stays cheap
+    await asyncio.to_thread(init_db)
+    log_writer.start()
+    # Services load bookings and FAQs from the database; keep that off the loop
+    await asyncio.to_thread(services.startup)
+    # Token encoders may be downloaded on first use
+    await asyncio.to_thread(load_encoders, [settings.OPENAI_MODEL, settings.GEMINI_MODEL, None])
+    sqlite_maintenance.start()
+    chat_dispatcher.start()
+    if settings.TELEGRAM_MODE == "polling":
+        telegram_poller.start()
+    yield
+    # Stop taking updates, finish queued messages, then close pooled connections
+    # and drain pending log rows
+    await telegram_poller.stop()
+    await chat_dispatcher.stop(timeout=settings.TELEGRAM_DRAIN_TIMEOUT)
+    await telegram_client.aclose()
+    await whatsapp_client.aclose()
+    await gemini_client.aclose()
+    await asyncio.to_thread(log_writer.stop)
+    await sqlite_maintenance.stop()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="AI Business Messaging Bot",
-    description="AI-powered customer support bot for Telegram",
+    description="AI-powered customer support bot for Telegram and WhatsApp",
     version="1.0.0",
     docs_url="/admin/docs",
-    redoc_url="/admin/redoc"
+    redoc_url="/admin/redoc",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -35,6 +69,7 @@ app.add_middleware(
 
 # Include routers
 app.include_router(telegram_router, prefix="/webhook", tags=["Telegram Bot"])
+app.include_router(whatsapp_router, prefix="/webhook", tags=["WhatsApp Bot"])
 app.include_router(admin_router, prefix="/admin", tags=["Admin"])
 app.include_router(faq_router, prefix="/api", tags=["FAQ"])
 app.include_router(order_router, prefix="/api", tags=["Orders"])
@@ -69,6 +104,9 @@ async def root():
                     <div class="endpoint">
                         <strong>📱 Telegram Webhook:</strong> POST /webhook/telegram
                     </div>
+                    <div class="endpoint">
+                        <strong>💬 WhatsApp Webhook:</strong> GET/POST /webhook/whatsapp
+                    </div>
                     <div class="endpoint">
                         <strong>👨‍💼 Admin Dashboard:</strong> <a href="/admin/docs">/admin/docs</a>
                     </div>
@@ -121,9 +159,11 @@ async def privacy_policy():
     }
 
 if __name__ == "__main__":
+    # Worker processes share bookings, dedup and leases through STATE_BACKEND
     uvicorn.run(
         "app.main:app",
         host=settings.HOST,
         port=settings.PORT,
-        reload=settings.DEBUG_MODE
+        reload=settings.DEBUG_MODE,
+        workers=1 if settings.DEBUG_MODE else settings.WORKERS
     )
\ No newline at end of file
@@ -0,0 +1,44 @@
+from collections import deque
+from threading import Lock
+from typing import Dict, Optional
+
+
+class LatencyTracker:
+    """Rolling window of latency samples with percentile summaries"""
+
+    def __init__(self, window: int = 1000):
+        self._samples = deque(maxlen=window)
+        self._lock = Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms: float):
+        with self._lock:
+            self._samples.append(elapsed_ms)
+            self.count += 1
+            self.total_ms += elapsed_ms
+            if elapsed_ms > self.max_ms:
+                self.max_ms = elapsed_ms
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Return the given percentile (0-100) of the current window"""
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else None,
+            "p50_ms": self._rounded(self.percentile(50)),
+            "p95_ms": self._rounded(self.percentile(95)),
+            "max_ms": round(self.max_ms, 2) if self.count else None
+        }
+
+    @staticmethod
+    def _rounded(value: Optional[float]) -> Optional[float]:
+        return round(value, 2) if value is not None else None
@@ -1,9 +1,14 @@
+import os
+import time
 from enum import Enum
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, JSON, Boolean
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, JSON, Boolean, Index, text
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from app.config import settings
+from app.models.sqlite_profile import SQLiteMaintenance, apply_sqlite_profile
 
 Base = declarative_base()
 
@@ -14,6 +19,13 @@ class MessageType(str, Enum):
 
 class ConversationLog(Base):
     __tablename__ = "conversation_logs"
+    __table_args__ = (
+        # Keyset pagination on (timestamp, id), alone or behind each admin filter
+        Index("ix_conversation_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_conversation_logs_user_timestamp", "user_id", "timestamp", "id"),
+        Index("ix_conversation_logs_platform_timestamp", "platform", "timestamp", "id"),
+        Index("ix_conversation_logs_type_timestamp", "message_type", "timestamp", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     message_id = Column(String, unique=True, index=True)
@@ -21,7 +33,8 @@ class ConversationLog(Base):
     platform = Column(String)  # telegram, whatsapp
     message_type = Column(String)  # incoming, outgoing
     content = Column(Text)
-    metadata = Column(JSON)  # AI provider, model, tokens, etc.
+    # "metadata" is reserved on declarative classes, so map the column under another name
+    message_metadata = Column("metadata", JSON)  # AI provider, model, tokens, etc.
     timestamp = Column(DateTime, default=datetime.utcnow)
     
     def to_dict(self):
@@ -32,7 +45,7 @@ class ConversationLog(Base):
             "platform": self.platform,
             "message_type": self.message_type,
             "content": self.content[:200] + "..." if len(self.content) > 200 else self.content,
-            "metadata": self.metadata,
+            "metadata": self.message_metadata,
             "timestamp": self.timestamp.isoformat()
         }
 
@@ -60,7 +73,122 @@ class LeadCapture(Base):
             "contacted": self.contacted
         }
 
+class BookingRecord(Base):
+    __tablename__ = "bookings"
+    __table_args__ = (
+        Index("ix_bookings_resource_date", "resource", "date"),
+        # At most one confirmed booking per slot, enforced by the database
+        Index(
+            "uq_bookings_confirmed_slot", "slot_id", unique=True,
+            sqlite_where=text("status = 'confirmed'"),
+            postgresql_where=text("status = 'confirmed'")
+        ),
+    )
+    
+    booking_id = Column(String, primary_key=True)
+    slot_id = Column(String, index=True)
+    resource = Column(String)
+    date = Column(String)  # YYYY-MM-DD
+    time = Column(String)  # HH:MM
+    customer_name = Column(String)
+    customer_email = Column(String)
+    customer_phone = Column(String)
+    status = Column(String, default="confirmed")  # confirmed, cancelled
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            "booking_id": self.booking_id,
+            "slot_id": self.slot_id,
+            "resource": self.resource,
+            "date": self.date,
+            "time": self.time,
+            "customer_name": self.customer_name,
+            "customer_email": self.customer_email,
+            "customer_phone": self.customer_phone,
+            "status": self.status,
+            "created_at": self.created_at.isoformat()
+        }
+
+class MessageStatsRollup(Base):
+    """Pre-aggregated message counts per hour and per day"""
+    __tablename__ = "message_stats_rollups"
+    __table_args__ = (
+        Index(
+            "uq_message_stats_rollups_key",
+            "granularity", "bucket", "platform", "message_type", "ai_provider",
+            unique=True
+        ),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    granularity = Column(String, nullable=False)  # hour, day
+    bucket = Column(DateTime, nullable=False)  # start of the hour/day (UTC)
+    platform = Column(String, nullable=False, default="")
+    message_type = Column(String, nullable=False, default="")
+    ai_provider = Column(String, nullable=False, default="")
+    count = Column(Integer, nullable=False, default=0)
+
 # Database setup
+# Engines connect lazily; the schema is created by init_db() at startup
 engine = create_engine(settings.DATABASE_URL)
-Base.metadata.create_all(bind=engine)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+apply_sqlite_profile(engine, settings.SQLITE_PROFILE)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def init_db():
+    """Create missing tables and indexes (and the SQLite file's directory)"""
+    if engine.url.get_backend_name() == "sqlite" and engine.url.database not in (None, "", ":memory:"):
+        directory = os.path.dirname(engine.url.database)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    # Worker processes start together and may race to create the same table;
+    # the loser's next attempt finds it and moves on
+    for attempt in range(5):
+        try:
+            Base.metadata.create_all(bind=engine)
+            # create_all skips tables that already exist, so add indexes introduced later
+            for index in ConversationLog.__table__.indexes:
+                index.create(bind=engine, checkfirst=True)
+            return
+        except OperationalError:
+            if attempt == 4:
+                raise
+            time.sleep(0.1 * (attempt + 1))
+
+# Async access for request handlers, so slow queries never block the event loop
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql"
+}
+
+def async_database_url(url: str) -> str:
+    """Swap a sync database URL's driver for its asyncio counterpart"""
+    scheme, _, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}://{rest}"
+
+def _async_engine_options(url: str) -> dict:
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": True
+    }
+
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    **_async_engine_options(settings.DATABASE_URL)
+)
+apply_sqlite_profile(async_engine.sync_engine, settings.SQLITE_PROFILE)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+sqlite_maintenance = SQLiteMaintenance(
+    engine,
+    settings.SQLITE_PROFILE,
+    checkpoint_interval=settings.SQLITE_CHECKPOINT_INTERVAL,
+    analyze_interval=settings.SQLITE_ANALYZE_INTERVAL
+)
@@ -1,66 +1,134 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from typing import Dict, List, Optional
-from datetime import datetime, timedelta
-import json
+from datetime import datetime
+import threading
+import uuid
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.models.message import AsyncSessionLocal, SessionLocal, BookingRecord
+from app.services.registry import get_booking_service
+from app.services.slot_store import SlotStore
+from app.state import StateBackend, shared_state
 
 booking_router = APIRouter()
 
+# Bumped in the shared state on every booking change
+BOOKINGS_VERSION_KEY = "bookings:version"
+
 class BookingService:
-    def __init__(self):
-        self.available_slots = self._generate_slots()
+    """Bookings and slot availability, cached in memory over BookingRecord
+    
+    With several worker processes each keeps its own copy; every change
+    bumps a version in the shared state, and a worker that sees a version it
+    did not write reloads from the database before answering. Double
+    bookings are prevented by the database's unique index either way.
+    """
+    
+    def __init__(self, state: StateBackend = shared_state):
+        self.slots = SlotStore(
+            resources=[r.strip() for r in settings.BOOKING_RESOURCES.split(",") if r.strip()],
+            horizon_days=settings.BOOKING_HORIZON_DAYS,
+            hours=self._slot_hours()
+        )
         self.bookings = {}
+        self.state = state
+        self._version = None
+        # Reloads replace slots and bookings wholesale; bookings themselves rely
+        # on SlotStore.reserve being atomic and never hold a lock across I/O
+        self._lock = threading.RLock()
+        self._load_bookings()
     
-    def _generate_slots(self) -> List[Dict]:
-        """Generate mock available time slots"""
-        slots = []
-        base_date = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
-        
-        for day in range(7):  # Next 7 days
-            date = base_date + timedelta(days=day)
-            
-            for hour in range(9, 17):  # 9 AM to 5 PM
-                if hour == 12:  # Skip lunch hour
-                    continue
-                
-                slot_time = date.replace(hour=hour)
-                slots.append({
-                    "slot_id": f"SLOT-{len(slots)+1:04d}",
-                    "date": slot_time.strftime("%Y-%m-%d"),
-                    "time": slot_time.strftime("%H:%M"),
-                    "available": True,
-                    "duration": "60 minutes"
-                })
-        
-        return slots
+    async def _sync(self):
+        """Reload bookings if another worker changed them"""
+        if not self.state.shared:
+            return
+        version = await self.state.run(self.state.get, BOOKINGS_VERSION_KEY)
+        if version == self._version:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                records = (await db.execute(self._confirmed())).scalars().all()
+        except Exception as e:
+            print(f"Error loading bookings: {e}")
+            return
+        self._replace(records, version)
+    
+    def _replace(self, records: List[BookingRecord], version: Optional[str]):
+        """Swap the cached bookings for ``records`` and reserve their slots"""
+        with self._lock:
+            for booking in self.bookings.values():
+                if booking["status"] == "confirmed":
+                    self.slots.release(booking["slot_id"])
+            self.bookings = {}
+            for record in records:
+                self.bookings[record.booking_id] = record.to_dict()
+                self.slots.reserve(record.slot_id)
+            self._version = version
+    
+    async def _changed(self):
+        """Publish a booking change to the other workers"""
+        if not self.state.shared:
+            return
+        version = await self.state.run(self.state.incr, BOOKINGS_VERSION_KEY)
+        # Skip our own reload unless someone else changed bookings in between
+        if self._version == (str(version - 1) if version > 1 else None):
+            self._version = str(version)
+    
+    def _slot_hours(self) -> List[int]:
+        """Hourly slots within business hours, skipping lunch"""
+        start = int(settings.BUSINESS_HOURS_START.split(":")[0])
+        end = int(settings.BUSINESS_HOURS_END.split(":")[0])
+        return [hour for hour in range(start, end) if hour != settings.BOOKING_LUNCH_HOUR]
+    
+    def _confirmed(self):
+        """Query for confirmed bookings inside the horizon"""
+        return select(BookingRecord).where(
+            BookingRecord.status == "confirmed",
+            BookingRecord.date >= datetime.now().strftime("%Y-%m-%d")
+        )
     
-    def get_available_slots(self, date: Optional[str] = None) -> List[Dict]:
-        """Get available booking slots"""
+    def _load_bookings(self):
+        """Restore confirmed bookings from the database on startup"""
+        # Read first, so a change made while loading triggers a reload
+        version = self.state.get(BOOKINGS_VERSION_KEY) if self.state.shared else None
+        db = SessionLocal()
+        try:
+            self._replace(db.execute(self._confirmed()).scalars().all(), version)
+        except Exception as e:
+            print(f"Error loading bookings: {e}")
+        finally:
+            db.close()
+    
+    async def get_available_slots(
+        self,
+        date: Optional[str] = None,
+        resource: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> List[Dict]:
+        """Get available booking slots for one date or a date range"""
         if date:
-            return [slot for slot in self.available_slots 
-                   if slot["date"] == date and slot["available"]]
-        else:
-            return [slot for slot in self.available_slots if slot["available"]]
+            start_date = end_date = date
+        await self._sync()
+        return self.slots.available(start_date, end_date, resource)
     
-    def book_slot(self, slot_id: str, customer_info: Dict) -> Dict:
+    async def book_slot(self, slot_id: str, customer_info: Dict) -> Dict:
         """Book a time slot"""
         
-        # Find the slot
-        slot = next((s for s in self.available_slots if s["slot_id"] == slot_id), None)
-        
-        if not slot:
-            return {"success": False, "error": "Slot not found"}
-        
-        if not slot["available"]:
-            return {"success": False, "error": "Slot already booked"}
+        await self._sync()
+        # Reserving is atomic, so a concurrent request for the same slot fails here
+        error = self.slots.reserve(slot_id)
+        if error:
+            return {"success": False, "error": error}
         
-        # Mark as booked
-        slot["available"] = False
-        
-        # Create booking record
-        booking_id = f"BOOK-{len(self.bookings)+1:04d}"
-        self.bookings[booking_id] = {
-            "booking_id": booking_id,
+        slot = self.slots.get(slot_id)
+        booking = {
+            "booking_id": f"BOOK-{uuid.uuid4().hex[:10].upper()}",
             "slot_id": slot_id,
+            "resource": slot["resource"],
             "date": slot["date"],
             "time": slot["time"],
             "customer_name": customer_info.get("name", "Customer"),
@@ -70,13 +138,39 @@ class BookingService:
             "created_at": datetime.now().isoformat()
         }
         
+        # The unique index on confirmed slots rejects a booking made elsewhere first
+        error = await self._persist(booking)
+        if error:
+            self.slots.release(slot_id)
+            return {"success": False, "error": error}
+        
+        self.bookings[booking["booking_id"]] = booking
+        await self._changed()
+        
         return {
             "success": True,
-            "booking_id": booking_id,
-            "details": self.bookings[booking_id],
-            "confirmation_message": self._format_confirmation(self.bookings[booking_id])
+            "booking_id": booking["booking_id"],
+            "details": booking,
+            "confirmation_message": self._format_confirmation(booking)
         }
     
+    async def _persist(self, booking: Dict) -> Optional[str]:
+        async with AsyncSessionLocal() as db:
+            try:
+                db.add(BookingRecord(**{
+                    **booking,
+                    "created_at": datetime.fromisoformat(booking["created_at"])
+                }))
+                await db.commit()
+                return None
+            except IntegrityError:
+                await db.rollback()
+                return "Slot already booked"
+            except Exception as e:
+                await db.rollback()
+                print(f"Error saving booking: {e}")
+                return "Could not save booking"
+    
     def _format_confirmation(self, booking: Dict) -> str:
         """Format booking confirmation message"""
         return f"""
@@ -93,20 +187,33 @@ A confirmation email has been sent (mock).
 Please arrive 10 minutes early.
         """
     
-    def cancel_booking(self, booking_id: str) -> Dict:
+    async def cancel_booking(self, booking_id: str) -> Dict:
         """Cancel a booking"""
-        if booking_id not in self.bookings:
+        await self._sync()
+        booking = self.bookings.get(booking_id)
+        if booking is None or booking["status"] != "confirmed":
             return {"success": False, "error": "Booking not found"}
         
-        booking = self.bookings[booking_id]
+        # Claimed before the write, so a concurrent cancel cannot free the slot
+        # again after it has been rebooked
+        booking["status"] = "cancelled"
+        async with AsyncSessionLocal() as db:
+            try:
+                await db.execute(
+                    update(BookingRecord)
+                    .where(BookingRecord.booking_id == booking_id)
+                    .values(status="cancelled")
+                )
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                booking["status"] = "confirmed"
+                print(f"Error cancelling booking: {e}")
+                return {"success": False, "error": "Could not cancel booking"}
         
         # Free up the slot
-        slot = next((s for s in self.available_slots if s["slot_id"] == booking["slot_id"]), None)
-        if slot:
-            slot["available"] = True
-        
-        # Update booking status
-        booking["status"] = "cancelled"
+        self.slots.release(booking["slot_id"])
+        await self._changed()
         
         return {
             "success": True,
@@ -114,18 +221,28 @@ Please arrive 10 minutes early.
         }
 
 @booking_router.get("/booking/slots")
-async def get_slots(date: Optional[str] = None):
+async def get_slots(
+    date: Optional[str] = None,
+    resource: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    service: BookingService = Depends(get_booking_service)
+):
     """Get available booking slots"""
-    service = BookingService()
-    slots = service.get_available_slots(date)
-    return {"date": date, "available_slots": slots}
+    slots = await service.get_available_slots(date, resource, start_date, end_date)
+    return {"date": date, "resource": resource, "available_slots": slots}
 
 @booking_router.post("/booking/book")
-async def book_appointment(slot_id: str, name: str, email: str, phone: Optional[str] = ""):
+async def book_appointment(
+    slot_id: str,
+    name: str,
+    email: str,
+    phone: Optional[str] = "",
+    service: BookingService = Depends(get_booking_service)
+):
     """Book an appointment"""
-    service = BookingService()
     customer_info = {"name": name, "email": email, "phone": phone}
-    result = service.book_slot(slot_id, customer_info)
+    result = await service.book_slot(slot_id, customer_info)
     
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["error"])
@@ -133,10 +250,9 @@ async def book_appointment(slot_id: str, name: str, email: str, phone: Optional[
     return result
 
 @booking_router.post("/booking/cancel/{booking_id}")
-async def cancel_appointment(booking_id: str):
+async def cancel_appointment(booking_id: str, service: BookingService = Depends(get_booking_service)):
     """Cancel a booking"""
-    service = BookingService()
-    result = service.cancel_booking(booking_id)
+    result = await service.cancel_booking(booking_id)
     
     if not result["success"]:
         raise HTTPException(status_code=404, detail=result["error"])
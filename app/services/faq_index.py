@@ -0,0 +1,105 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from operator import itemgetter
+from typing import Dict, List, Tuple
+
+_TOKEN = re.compile(r"\w+")
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "at", "be", "can", "do", "does", "for", "how", "i",
+    "in", "is", "it", "me", "my", "of", "on", "or", "the", "to", "we", "what",
+    "when", "where", "which", "you", "your"
+})
+ANSWER_WEIGHT = 0.25
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class FAQIndex:
+    """Sparse TF-IDF index over FAQ questions and answers
+
+    Documents are stored as log-tf vectors, cosine-normalised at insert time,
+    in an inverted index (term -> {doc: weight}). IDF is applied to the query
+    side only (the SMART ``lnc.ltc`` scheme), so adding, updating or removing
+    one FAQ touches just that entry's postings instead of rebuilding the
+    matrix. Lookups only score documents sharing a term with the query.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._doc_terms: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def rebuild(self, faqs: Dict[str, str]):
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            for question, answer in faqs.items():
+                self._add(question, answer)
+
+    def upsert(self, question: str, answer: str):
+        with self._lock:
+            self._remove(question)
+            self._add(question, answer)
+
+    def remove(self, question: str):
+        with self._lock:
+            self._remove(question)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        """Return up to ``k`` (question, cosine score) pairs, best first"""
+
+        query_tf = Counter(tokenize(query))
+        if not query_tf:
+            return []
+
+        with self._lock:
+            total_docs = len(self._doc_terms)
+            query_vector = {}
+            for term, count in query_tf.items():
+                # Unknown terms still count towards the query norm (as if
+                # maximally rare), so off-topic words dilute the match
+                postings = self._postings.get(term)
+                idf = math.log(1 + total_docs / (len(postings) if postings else 1))
+                query_vector[term] = (1 + math.log(count)) * idf
+
+            norm = math.sqrt(sum(w * w for w in query_vector.values()))
+            if not norm:
+                return []
+
+            scores: Dict[str, float] = defaultdict(float)
+            for term, weight in query_vector.items():
+                for question, doc_weight in self._postings.get(term, {}).items():
+                    scores[question] += weight / norm * doc_weight
+
+        return heapq.nlargest(k, scores.items(), key=itemgetter(1))
+
+    def _add(self, question: str, answer: str):
+        weights: Dict[str, float] = defaultdict(float)
+        for term, count in Counter(tokenize(question)).items():
+            weights[term] += 1 + math.log(count)
+        for term, count in Counter(tokenize(answer)).items():
+            weights[term] += ANSWER_WEIGHT * (1 + math.log(count))
+
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        if not norm:
+            return
+
+        for term, weight in weights.items():
+            self._postings[term][question] = weight / norm
+        self._doc_terms[question] = list(weights)
+
+    def _remove(self, question: str):
+        for term in self._doc_terms.pop(question, []):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(question, None)
+                if not postings:
+                    del self._postings[term]
@@ -1,5 +1,9 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, List
+from fastapi import APIRouter, HTTPException, Depends
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.services.faq_index import FAQIndex
+from app.services.registry import get_faq_service
 
 faq_router = APIRouter()
 
@@ -17,30 +21,51 @@ class FAQService:
             "Are there any discounts?": "We offer 10% off for first-time customers.",
             "How do I contact support?": f"Email us at support@example.com or message here."
         }
+        self.index = FAQIndex()
+        self.index.rebuild(self.faqs)
     
     def get_faqs(self) -> Dict[str, str]:
         return self.faqs
     
-    def search_faqs(self, query: str) -> List[Dict[str, str]]:
-        """Search FAQs by keyword"""
-        query = query.lower()
+    def add_faq(self, question: str, answer: str):
+        """Add or update a FAQ and refresh its index entry"""
+        self.faqs[question] = answer
+        self.index.upsert(question, answer)
+    
+    def remove_faq(self, question: str) -> bool:
+        """Remove a FAQ and its index entry"""
+        if question not in self.faqs:
+            return False
+        del self.faqs[question]
+        self.index.remove(question)
+        return True
+    
+    def search_faqs(self, query: str, limit: int = 5) -> List[Dict[str, str]]:
+        """Search FAQs ranked by TF-IDF cosine similarity"""
         results = []
         
-        for question, answer in self.faqs.items():
-            if query in question.lower() or query in answer.lower():
-                results.append({"question": question, "answer": answer})
+        for question, score in self.index.search(query, k=limit):
+            answer = self.faqs.get(question)
+            if answer is not None:
+                results.append({"question": question, "answer": answer, "score": round(score, 4)})
         
         return results
+    
+    def match_faq(self, query: str) -> Optional[Dict[str, str]]:
+        """Return the best FAQ if it clears FAQ_MATCH_THRESHOLD, else None"""
+        results = self.search_faqs(query, limit=1)
+        
+        if results and results[0]["score"] >= settings.FAQ_MATCH_THRESHOLD:
+            return results[0]
+        return None
 
 @faq_router.get("/faqs")
-async def get_all_faqs():
+async def get_all_faqs(service: FAQService = Depends(get_faq_service)):
     """Get all FAQs"""
-    service = FAQService()
     return {"faqs": service.get_faqs()}
 
 @faq_router.get("/faqs/search")
-async def search_faqs(query: str):
+async def search_faqs(query: str, limit: int = 5, service: FAQService = Depends(get_faq_service)):
     """Search FAQs"""
-    service = FAQService()
-    results = service.search_faqs(query)
+    results = service.search_faqs(query, limit)
     return {"query": query, "results": results}
\ No newline at end of file
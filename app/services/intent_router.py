@@ -0,0 +1,284 @@
+import re
+import time
+from collections import Counter
+from datetime import date as date_type, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.metrics import LatencyTracker
+from app.services.registry import services
+
+
+def _words(*words: str) -> "re.Pattern":
+    """One alternation over whole words, longest first so phrases win"""
+    alternatives = "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternatives})\b", re.IGNORECASE)
+
+
+# Order ids like ORD-1002, "ord 1002" or "order #1002"
+ORDER_ID = re.compile(
+    r"\bORD[-\s#]?(\d{3,10})\b|\border\s*(?:number|no\.?|#)\s*:?\s*(\d{3,10})\b",
+    re.IGNORECASE
+)
+ORDER_REQUEST = re.compile(
+    r"\b(?:track|tracking|status|where(?:'s| is| are))\b.*\b(?:order|package|parcel)s?\b"
+    r"|\b(?:order|package|parcel)s?\b.*\bstatus\b",
+    re.IGNORECASE
+)
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_WHEN = r"(?:today|tonight|tomorrow|next\s+week|" + "|".join(WEEKDAYS) + r"|\d{1,2}(?::\d{2})?\s*(?:am|pm))\b"
+# Booking phrasing rather than single words: "book", "reserve", "schedule"
+# and "slot" on their own mostly mean something else
+BOOKING = re.compile(
+    r"\b(?:book|reserve|schedule)\s+(?:an?\s+|the\s+|my\s+)?(?:appointment|slot|time|visit|session)s?\b"
+    r"|\b(?:book|reserve)\s+(?:(?:me|us|in|for|on|at)\s+)*" + _WHEN +
+    r"|\bappointments?\b|\b(?:a|new)\s+(?:booking|reservation)\b|\bavailability\b"
+    r"|\b(?:free|open|available)\s+(?:slots?|times?)\b|\b(?:any|a)\s+slots?\s+(?:on|at|for|this|next|today|tomorrow)\b",
+    re.IGNORECASE
+)
+HOURS = re.compile(
+    r"\b(?:business|opening|office|working|open)\s+hours\b|\byour\s+hours\b|\bhours\s+of\s+operation\b"
+    r"|\bwhen\s+(?:are|do)\s+you\s+(?:open|close)\b|\bare\s+you\s+(?:open|closed)\b"
+    r"|\bwhat\s+time\s+(?:are|do)\s+you\s+(?:open|close)\b",
+    re.IGNORECASE
+)
+# Requests a lookup cannot settle: these still go to the AI
+OPEN_ENDED = _words(
+    "why", "refund", "cancel", "cancelled", "complaint", "complain", "problem", "wrong",
+    "broken", "damaged", "return", "change", "reschedule", "human", "agent", "manager", "but"
+)
+
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+_MONTH = r"(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?"
+MONTH_DAY = re.compile(rf"\b{_MONTH}\s+(\d{{1,2}})(?:st|nd|rd|th)?\b", re.IGNORECASE)
+DAY_MONTH = re.compile(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?{_MONTH}(?![a-z])", re.IGNORECASE)
+RELATIVE_DAY = re.compile(r"\b(today|tonight|tomorrow|" + "|".join(WEEKDAYS) + r")\b", re.IGNORECASE)
+TIME = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b|\b(\d{1,2}):(\d{2})\b", re.IGNORECASE)
+
+# Example messages for the optional TF-IDF stage (INTENT_MODEL=tfidf)
+INTENT_EXAMPLES = {
+    "booking": [
+        "can I come in on friday",
+        "do you have any openings next week",
+        "I would like to see someone tomorrow morning",
+        "when is the next free time",
+        "can I get a visit this afternoon"
+    ],
+    "hours": [
+        "when do you open",
+        "what time do you close today",
+        "are you open on weekends",
+        "until when are you working"
+    ],
+    "order": [
+        "has my purchase shipped yet",
+        "when will my package arrive",
+        "where is my parcel",
+        "I have not received my delivery"
+    ]
+}
+
+
+def parse_date(text: str, today: Optional[date_type] = None) -> Optional[str]:
+    """First date mentioned in ``text`` as an ISO date, or None
+
+    Understands ISO dates, "today"/"tomorrow", weekday names (the next such
+    day, today included) and "Oct 20" / "20th October" (this year, or next
+    year once that day has passed).
+    """
+
+    today = today or datetime.now().date()
+
+    match = ISO_DATE.search(text)
+    if match:
+        try:
+            return date_type(*map(int, match.groups())).isoformat()
+        except ValueError:
+            return None
+
+    match = RELATIVE_DAY.search(text)
+    if match:
+        word = match.group(1).lower()
+        if word in ("today", "tonight"):
+            return today.isoformat()
+        if word == "tomorrow":
+            return (today + timedelta(days=1)).isoformat()
+        days_ahead = (WEEKDAYS.index(word) - today.weekday()) % 7
+        return (today + timedelta(days=days_ahead)).isoformat()
+
+    match = MONTH_DAY.search(text)
+    if match:
+        month, day = MONTHS.index(match.group(1).lower()) + 1, int(match.group(2))
+    else:
+        match = DAY_MONTH.search(text)
+        if not match:
+            return None
+        day, month = int(match.group(1)), MONTHS.index(match.group(2).lower()) + 1
+    try:
+        found = date_type(today.year, month, day)
+        if found < today:
+            found = date_type(today.year + 1, month, day)
+    except ValueError:
+        return None
+    return found.isoformat()
+
+
+def parse_time(text: str) -> Optional[str]:
+    """First time of day mentioned ("10am", "3:30 pm", "14:00") as HH:MM"""
+
+    match = TIME.search(text)
+    if not match:
+        return None
+    if match.group(3):
+        hour, minute = int(match.group(1)), int(match.group(2) or 0)
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if match.group(3).lower() == "pm" else 0)
+    else:
+        hour, minute = int(match.group(4)), int(match.group(5))
+    if hour > 23 or minute > 59:
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+
+def strip_dates(text: str) -> str:
+    """``text`` without its dates and times, which say nothing about the intent"""
+    for pattern in (ISO_DATE, RELATIVE_DAY, MONTH_DAY, DAY_MONTH, TIME):
+        text = pattern.sub(" ", text)
+    return text
+
+
+def business_hours() -> str:
+    return f"Business Hours: {settings.BUSINESS_HOURS_START} to {settings.BUSINESS_HOURS_END} ({settings.BUSINESS_TIMEZONE})"
+
+
+class IntentRouter:
+    """Answers order, booking and opening-hours questions without the AI
+
+    Messages are classified with precompiled regexes (order ids, dates,
+    times and keyword alternations), and the matching service answers
+    directly. With INTENT_MODEL=tfidf, messages the regexes do not place are
+    also scored against a few example messages per intent with the FAQ
+    TF-IDF index. Long messages and ones that ask for something a lookup
+    cannot do (refunds, cancellations, complaints...) return None and go to
+    the AI as before.
+    """
+
+    def __init__(self, model: str = settings.INTENT_MODEL):
+        self.model = None
+        self._example_intents: Dict[str, str] = {}
+        if model == "tfidf":
+            from app.services.faq_index import FAQIndex
+            self.model = FAQIndex()
+            for intent, examples in INTENT_EXAMPLES.items():
+                for example in examples:
+                    self._example_intents[strip_dates(example)] = intent
+            self.model.rebuild({example: "" for example in self._example_intents})
+        # Classification time only, not the service lookups
+        self.latency = LatencyTracker()
+        self.checked = 0
+        self.routed: Counter = Counter()
+
+    def classify(self, text: str) -> Optional[Dict[str, Any]]:
+        """The intent of ``text`` and what it mentions, or None for open-ended messages"""
+
+        if len(text.split()) > settings.INTENT_MAX_WORDS or OPEN_ENDED.search(text):
+            return None
+
+        match = ORDER_ID.search(text)
+        if match:
+            return {"intent": "order_status", "order_id": f"ORD-{match.group(1) or match.group(2)}"}
+        if BOOKING.search(text):
+            return {"intent": "booking", "date": parse_date(text), "time": parse_time(text)}
+        if HOURS.search(text):
+            return {"intent": "hours"}
+        if ORDER_REQUEST.search(text):
+            return {"intent": "order"}
+
+        if self.model is not None:
+            results = self.model.search(strip_dates(text), k=1)
+            if results and results[0][1] >= settings.INTENT_MODEL_THRESHOLD:
+                intent = self._example_intents[results[0][0]]
+                if intent == "booking":
+                    return {"intent": intent, "date": parse_date(text), "time": parse_time(text), "model": True}
+                return {"intent": intent, "model": True}
+        return None
+
+    async def route(self, text: str) -> Optional[Dict[str, Any]]:
+        """Answer ``text`` from the services if its intent is clear
+
+        Returns {"intent", "text"}, or None when the AI should answer.
+        """
+
+        started = time.perf_counter()
+        self.checked += 1
+        intent = self.classify(text)
+        self.latency.record((time.perf_counter() - started) * 1000)
+        if intent is None:
+            return None
+
+        if intent["intent"] == "order_status":
+            # Anyone can type an order id, so only known orders are answered,
+            # and without the customer's details
+            order = services.order.find_order(intent["order_id"])
+            if order is None:
+                reply = f"Sorry, I couldn't find order {intent['order_id']}. Please check the number and try again."
+            else:
+                reply = services.order.format_order_status(order)
+        elif intent["intent"] == "order":
+            reply = "Please share your order number (for example ORD-1001), and I'll check the status for you."
+        elif intent["intent"] == "hours":
+            reply = business_hours()
+        else:
+            reply = await self._booking_reply(intent["date"], intent["time"])
+
+        self.routed[intent["intent"]] += 1
+        if intent.get("model"):
+            self.routed["by_model"] += 1
+        return {"intent": intent["intent"], "text": reply}
+
+    async def _booking_reply(self, day: Optional[str], requested: Optional[str]) -> str:
+        """Free slots on the requested day, or on the next day that has any"""
+
+        booking = services.booking
+        if day:
+            slots = await booking.get_available_slots(date=day)
+        else:
+            slots = await booking.get_available_slots(start_date=datetime.now().date().isoformat())
+            if slots:
+                day = slots[0]["date"]
+                slots = [slot for slot in slots if slot["date"] == day]
+
+        if not slots:
+            if day:
+                return f"Sorry, there are no free slots on {day}. Ask about another day and I'll check it for you."
+            return "Sorry, there are no free slots right now. Please check back later."
+
+        lines = [f"📅 Free slots on {day}:"]
+        resources: Dict[str, List[str]] = {}
+        for slot in slots:
+            resources.setdefault(slot["resource"], []).append(slot["time"])
+        for resource, times in resources.items():
+            prefix = f"{resource}: " if len(resources) > 1 else ""
+            lines.append(f"{prefix}{', '.join(times)}")
+
+        if requested:
+            if any(slot["time"] == requested for slot in slots):
+                lines.insert(0, f"✅ {requested} on {day} is available.")
+            else:
+                lines.insert(0, f"❌ {requested} on {day} is not available.")
+        lines.append("\nLet us know which time suits you.")
+        return "\n".join(lines)
+
+    def stats(self) -> Dict[str, Any]:
+        routed = sum(count for intent, count in self.routed.items() if intent != "by_model")
+        return {
+            "model": "tfidf" if self.model is not None else "regex",
+            "checked": self.checked,
+            "routed": dict(self.routed),
+            "route_rate": round(routed / self.checked, 3) if self.checked else None,
+            "classify_latency": self.latency.summary()
+        }
+
+intent_router = IntentRouter()
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from typing import Dict, Optional, List
 from datetime import datetime, timedelta
 import random
 
+from app.services.registry import get_order_service
+
 order_router = APIRouter()
 
 class OrderService:
@@ -64,6 +66,21 @@ class OrderService:
             "note": "This is a demo response. Connect to your real order system for live data."
         }
     
+    def find_order(self, order_id: str) -> Optional[Dict]:
+        """A known order by ID, or None (no demo data for unknown IDs)"""
+        return self.orders.get(order_id.upper().strip())
+    
+    def format_order_status(self, order_data: Dict) -> str:
+        """Delivery status only, for senders not known to own the order
+        
+        Leaves out the customer's name, the product and the total.
+        """
+        
+        lines = [f"📦 Order {order_data['order_id']}: {order_data['status'].upper()}"]
+        if order_data.get('estimated_delivery') and order_data['status'] != "delivered":
+            lines.append(f"📅 Est. Delivery: {order_data['estimated_delivery']}")
+        return "\n".join(lines)
+    
     def format_order_response(self, order_data: Dict) -> str:
         """Format order data for chat response"""
         
@@ -88,9 +105,8 @@ class OrderService:
         return response
 
 @order_router.get("/orders/{order_id}")
-async def get_order(order_id: str):
+async def get_order(order_id: str, service: OrderService = Depends(get_order_service)):
     """API endpoint to get order status"""
-    service = OrderService()
     order_data = service.get_order_status(order_id)
     
     if not order_data:
@@ -99,9 +115,8 @@ async def get_order(order_id: str):
     return order_data
 
 @order_router.post("/orders/lookup")
-async def lookup_order(order_id: str):
+async def lookup_order(order_id: str, service: OrderService = Depends(get_order_service)):
     """Lookup order and return formatted response"""
-    service = OrderService()
     order_data = service.get_order_status(order_id)
     return {
         "order_id": order_id,
@@ -0,0 +1,66 @@
+import threading
+
+
+class ServiceRegistry:
+    """Process-wide service instances shared by the API routes and the bots
+
+    Services are built once (on startup or first use) so state such as
+    bookings made through the API is visible to the Telegram bot and vice versa.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._faq = None
+        self._order = None
+        self._booking = None
+
+    @property
+    def faq(self):
+        if self._faq is None:
+            with self._lock:
+                if self._faq is None:
+                    from app.services.faq_service import FAQService
+                    self._faq = FAQService()
+        return self._faq
+
+    @property
+    def order(self):
+        if self._order is None:
+            with self._lock:
+                if self._order is None:
+                    from app.services.order_service import OrderService
+                    self._order = OrderService()
+        return self._order
+
+    @property
+    def booking(self):
+        if self._booking is None:
+            with self._lock:
+                if self._booking is None:
+                    from app.services.booking_service import BookingService
+                    self._booking = BookingService()
+        return self._booking
+
+    def startup(self):
+        """Build every service up front so the first request pays nothing"""
+        self.faq
+        self.order
+        self.booking
+
+    def reset(self):
+        with self._lock:
+            self._faq = None
+            self._order = None
+            self._booking = None
+
+services = ServiceRegistry()
+
+# FastAPI dependencies
+def get_faq_service():
+    return services.faq
+
+def get_order_service():
+    return services.order
+
+def get_booking_service():
+    return services.booking
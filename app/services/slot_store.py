@@ -0,0 +1,139 @@
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date as date_type, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_RESOURCE = "default"
+
+
+class SlotStore:
+    """Bookable slots indexed by slot_id and by (resource, date)
+
+    Each (resource, date) keeps its slot ids in time order plus an integer
+    bitmask of which are still free, so booking and cancelling are O(1) and
+    listing a day only touches that day. Dates are kept sorted for range
+    queries. The horizon rolls forward automatically as days pass.
+    """
+
+    def __init__(
+        self,
+        resources: Iterable[str],
+        horizon_days: int,
+        hours: Iterable[int],
+        duration_minutes: int = 60
+    ):
+        self.resources = list(resources) or [DEFAULT_RESOURCE]
+        self.horizon_days = horizon_days
+        self.hours = sorted(hours)
+        self.duration_minutes = duration_minutes
+        self._lock = threading.RLock()
+        # slot_id -> (resource, date, position within the day)
+        self._slots: Dict[str, Tuple[str, str, int]] = {}
+        # (resource, date) -> slot ids in time order
+        self._days: Dict[Tuple[str, str], List[str]] = {}
+        # (resource, date) -> bitmask, bit i set when slot i is free
+        self._free: Dict[Tuple[str, str], int] = {}
+        self._dates: List[str] = []
+        self._first_day: Optional[date_type] = None
+        self.roll_horizon()
+
+    @staticmethod
+    def make_slot_id(resource: str, day: str, hour: int) -> str:
+        compact = day.replace("-", "")
+        if resource == DEFAULT_RESOURCE:
+            return f"SLOT-{compact}-{hour:02d}00"
+        return f"SLOT-{resource.upper()}-{compact}-{hour:02d}00"
+
+    def roll_horizon(self, today: Optional[date_type] = None):
+        """Drop past days and generate slots up to ``horizon_days`` ahead"""
+        today = today or datetime.now().date()
+        with self._lock:
+            if self._first_day == today:
+                return
+            self._first_day = today
+            first = today.isoformat()
+
+            expired = self._dates[:bisect_left(self._dates, first)]
+            for day in expired:
+                for resource in self.resources:
+                    for slot_id in self._days.pop((resource, day), []):
+                        del self._slots[slot_id]
+                    self._free.pop((resource, day), None)
+            del self._dates[:len(expired)]
+
+            for offset in range(self.horizon_days):
+                day = (today + timedelta(days=offset)).isoformat()
+                if self._dates and day <= self._dates[-1]:
+                    continue
+                for resource in self.resources:
+                    ids = [self.make_slot_id(resource, day, hour) for hour in self.hours]
+                    for position, slot_id in enumerate(ids):
+                        self._slots[slot_id] = (resource, day, position)
+                    self._days[(resource, day)] = ids
+                    self._free[(resource, day)] = (1 << len(ids)) - 1
+                self._dates.append(day)
+
+    def get(self, slot_id: str) -> Optional[Dict]:
+        with self._lock:
+            location = self._slots.get(slot_id)
+            if location is None:
+                return None
+            return self._to_dict(slot_id, *location)
+
+    def reserve(self, slot_id: str) -> Optional[str]:
+        """Atomically mark a slot booked; returns an error message or None"""
+        # Past days must not stay bookable until someone next lists slots
+        self.roll_horizon()
+        with self._lock:
+            location = self._slots.get(slot_id)
+            if location is None:
+                return "Slot not found"
+            resource, day, position = location
+            bit = 1 << position
+            if not self._free[(resource, day)] & bit:
+                return "Slot already booked"
+            self._free[(resource, day)] &= ~bit
+            return None
+
+    def release(self, slot_id: str):
+        with self._lock:
+            location = self._slots.get(slot_id)
+            if location is not None:
+                resource, day, position = location
+                self._free[(resource, day)] |= 1 << position
+
+    def available(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        resource: Optional[str] = None
+    ) -> List[Dict]:
+        """Free slots between two ISO dates (inclusive), optionally for one resource"""
+        self.roll_horizon()
+        resources = [resource] if resource else self.resources
+        results = []
+
+        with self._lock:
+            lo = bisect_left(self._dates, start_date) if start_date else 0
+            hi = bisect_right(self._dates, end_date) if end_date else len(self._dates)
+            for day in self._dates[lo:hi]:
+                for name in resources:
+                    mask = self._free.get((name, day), 0)
+                    ids = self._days.get((name, day), [])
+                    while mask:
+                        position = (mask & -mask).bit_length() - 1
+                        results.append(self._to_dict(ids[position], name, day, position))
+                        mask &= mask - 1
+
+        return results
+
+    def _to_dict(self, slot_id: str, resource: str, day: str, position: int) -> Dict:
+        free = bool(self._free[(resource, day)] & (1 << position))
+        return {
+            "slot_id": slot_id,
+            "resource": resource,
+            "date": day,
+            "time": f"{self.hours[position]:02d}:00",
+            "available": free,
+            "duration": f"{self.duration_minutes} minutes"
+        }
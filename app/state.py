@@ -0,0 +1,338 @@
+import asyncio
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from app.config import settings
+
+# Identifies this worker process as the holder of a lease
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Expired rows are purged from SQLite after this many writes
+SQLITE_PURGE_EVERY = 1000
+
+T = TypeVar("T")
+
+
+class StateBackend:
+    """Small key/value store for state every worker process must agree on
+
+    Backs deduplication claims, leases (one poller across workers), version
+    counters that tell a worker its local copy of bookings is stale,
+    and optionally the AI response cache. ``shared`` is False for the
+    in-process backend, which lets callers skip the bookkeeping entirely
+    when only one process runs. Code on the event loop calls the shared
+    backends through ``run``, as they block on disk or network I/O.
+    """
+
+    shared = True
+
+    async def run(self, method: Callable[..., T], *args) -> T:
+        """Call one of this backend's methods from the event loop
+
+        Shared backends run it in a worker thread; the in-process backend
+        only touches memory and is called directly.
+        """
+        if not self.shared:
+            return method(*args)
+        return await asyncio.to_thread(method, *args)
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        """Set ``key`` only if it is absent (or expired); True if this call set it"""
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix: str):
+        raise NotImplementedError
+
+    def count_prefix(self, prefix: str) -> int:
+        raise NotImplementedError
+
+    def lease(self, key: str, owner: str, ttl: float) -> bool:
+        """Take or renew a lease for ``ttl`` seconds; False while another owner holds it"""
+        raise NotImplementedError
+
+    def release_lease(self, key: str, owner: str):
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__, "shared": self.shared, "worker": WORKER_ID}
+
+
+class MemoryStateBackend(StateBackend):
+    """Per-process state for single-worker deployments"""
+
+    shared = False
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[str, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str, now: float) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._entries[key]
+            return None
+        return value
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._live(key, time.time())
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl if ttl else None)
+
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        now = time.time()
+        with self._lock:
+            if self._live(key, now) is not None:
+                return False
+            self._entries[key] = (value, now + ttl if ttl else None)
+            return True
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._live(key, time.time()) or 0) + 1
+            self._entries[key] = (str(value), None)
+            return value
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def count_prefix(self, prefix: str) -> int:
+        now = time.time()
+        with self._lock:
+            return sum(1 for key in list(self._entries) if key.startswith(prefix) and self._live(key, now) is not None)
+
+    def lease(self, key: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            holder = self._live(key, now)
+            if holder is not None and holder != owner:
+                return False
+            self._entries[key] = (owner, now + ttl)
+            return True
+
+    def release_lease(self, key: str, owner: str):
+        with self._lock:
+            if self._live(key, time.time()) == owner:
+                del self._entries[key]
+
+
+class SQLiteStateBackend(StateBackend):
+    """State in a SQLite file shared by the worker processes of one host
+
+    Check-and-set operations run in ``BEGIN IMMEDIATE`` transactions, which
+    SQLite serializes across processes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._lock = threading.Lock()
+        self._writes = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS shared_state ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+
+    def _wrote(self):
+        self._writes += 1
+        if self._writes % SQLITE_PURGE_EVERY == 0:
+            self._conn.execute("DELETE FROM shared_state WHERE expires_at <= ?", (time.time(),))
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM shared_state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl if ttl else None)
+            )
+            self._wrote()
+
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM shared_state WHERE key = ? AND expires_at <= ?", (key, now))
+                added = self._conn.execute(
+                    "INSERT OR IGNORE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, now + ttl if ttl else None)
+                ).rowcount == 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._wrote()
+        return added
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "INSERT INTO shared_state (key, value) VALUES (?, '1') "
+                "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1 "
+                "RETURNING value",
+                (key,)
+            ).fetchone()
+        return int(row[0])
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM shared_state WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM shared_state WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+    def count_prefix(self, prefix: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM shared_state WHERE substr(key, 1, ?) = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (len(prefix), prefix, time.time())
+            ).fetchone()[0]
+
+    def lease(self, key: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT value FROM shared_state WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                acquired = row is None or row[0] == owner
+                if acquired:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, owner, now + ttl)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return acquired
+
+    def release_lease(self, key: str, owner: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM shared_state WHERE key = ? AND value = ?", (key, owner))
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "path": self.path}
+
+
+# Atomic "take or renew if free or already ours" and "delete if ours"
+_LEASE_SCRIPT = """
+local holder = redis.call('GET', KEYS[1])
+if holder and holder ~= ARGV[1] then return 0 end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+return 1
+"""
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+
+class RedisStateBackend(StateBackend):
+    """State in Redis (or any server speaking its protocol), for workers on several hosts
+
+    Needs the optional ``redis`` package. Keys are namespaced with
+    ``prefix`` so several deployments can share one server.
+    """
+
+    def __init__(self, url: str, prefix: str = "aibot:"):
+        import redis
+
+        self.url = url
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._lease = self._redis.register_script(_LEASE_SCRIPT)
+        self._release = self._redis.register_script(_RELEASE_SCRIPT)
+
+    def _ttl_ms(self, ttl: Optional[float]) -> Optional[int]:
+        return max(1, int(ttl * 1000)) if ttl else None
+
+    def get(self, key: str) -> Optional[str]:
+        return self._redis.get(self.prefix + key)
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        self._redis.set(self.prefix + key, value, px=self._ttl_ms(ttl))
+
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        return bool(self._redis.set(self.prefix + key, value, px=self._ttl_ms(ttl), nx=True))
+
+    def incr(self, key: str) -> int:
+        return self._redis.incr(self.prefix + key)
+
+    def delete(self, key: str):
+        self._redis.delete(self.prefix + key)
+
+    def delete_prefix(self, prefix: str):
+        keys = list(self._redis.scan_iter(match=f"{self.prefix}{prefix}*", count=1000))
+        for start in range(0, len(keys), 1000):
+            self._redis.delete(*keys[start:start + 1000])
+
+    def count_prefix(self, prefix: str) -> int:
+        return sum(1 for _ in self._redis.scan_iter(match=f"{self.prefix}{prefix}*", count=1000))
+
+    def lease(self, key: str, owner: str, ttl: float) -> bool:
+        return bool(self._lease(keys=[self.prefix + key], args=[owner, self._ttl_ms(ttl)]))
+
+    def release_lease(self, key: str, owner: str):
+        self._release(keys=[self.prefix + key], args=[owner])
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "url": self.url.split("@")[-1]}
+
+
+def create_state_backend(name: str = settings.STATE_BACKEND) -> StateBackend:
+    name = name.lower()
+    if name == "memory":
+        if settings.WORKERS > 1:
+            raise ValueError("STATE_BACKEND=memory is per process; use sqlite or redis with WORKERS > 1")
+        return MemoryStateBackend()
+    if name == "sqlite":
+        return SQLiteStateBackend(settings.STATE_PATH)
+    if name == "redis":
+        return RedisStateBackend(settings.REDIS_URL)
+    raise ValueError(f"Unsupported state backend: {name}")
+
+shared_state = create_state_backend()
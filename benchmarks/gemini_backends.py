@@ -0,0 +1,169 @@
+"""Gemini SDK vs pooled REST backend against a local mock Gemini API
+
+Starts a mock of the Gemini REST API (generateContent, streamGenerateContent
+over SSE and batchEmbedContents) on localhost with a fixed per-request
+latency, then sends the same concurrent load through:
+
+- sdk:  google-generativeai on its REST transport. Its async methods only
+        work over gRPC, so calls run in worker threads, which is what using
+        the SDK without gRPC amounts to.
+- http: GeminiHTTPProvider on the shared httpx connection pool, including
+        the scheduler, exactly as the app runs it.
+
+Reports throughput and latency percentiles per backend, time to first chunk
+for streaming, and batched embedding throughput.
+
+    python benchmarks/gemini_backends.py --requests 500 --concurrency 50 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+PORT = _free_port()
+os.environ["GEMINI_API_URL"] = f"http://127.0.0.1:{PORT}"
+os.environ["GEMINI_API_KEY"] = "bench-key"
+os.environ["GEMINI_BACKEND"] = "http"
+os.environ.setdefault("GEMINI_RPM", "1000000")
+os.environ.setdefault("GEMINI_TPM", "1000000000")
+
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import StreamingResponse  # noqa: E402
+
+from app.ai.gemini_client import gemini_client  # noqa: E402
+from app.ai.providers import GeminiHTTPProvider  # noqa: E402
+from app.ai.rate_limiter import AIScheduler  # noqa: E402
+from app.metrics import LatencyTracker  # noqa: E402
+
+USAGE = {"promptTokenCount": 120, "candidatesTokenCount": 12, "totalTokenCount": 132}
+
+
+def mock_api(latency: float, chunks: int) -> FastAPI:
+    api = FastAPI()
+
+    def chunk(text: str, usage: dict = None) -> dict:
+        body = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}]}
+        if usage:
+            body["usageMetadata"] = usage
+        return body
+
+    @api.post("/v1beta/models/{call}")
+    async def handle(call: str, request: Request):
+        payload = await request.json()
+        await asyncio.sleep(latency)
+        if call.endswith(":generateContent"):
+            response = chunk("Thanks for your question, here is the answer.", USAGE)
+            response["candidates"][0]["finishReason"] = "STOP"
+            return response
+        if call.endswith(":streamGenerateContent"):
+            async def events():
+                for n in range(chunks):
+                    yield f"data: {json.dumps(chunk(f'part {n} ', USAGE))}\r\n\r\n"
+                    await asyncio.sleep(latency / chunks)
+            return StreamingResponse(events(), media_type="text/event-stream")
+        if call.endswith(":batchEmbedContents"):
+            return {"embeddings": [{"values": [0.1] * 768} for _ in payload["requests"]]}
+        return {"error": {"code": 404, "message": f"unknown call {call}"}}
+
+    return api
+
+
+def serve(app: FastAPI) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+async def drive(name: str, call, requests: int, concurrency: int):
+    latency = LatencyTracker(window=requests)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(n: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await call(n)
+            latency.record((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(requests)))
+    elapsed = time.perf_counter() - started
+    print(f"{name:<12} {requests / elapsed:8.0f} req/s  {latency.summary()}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300, help="requests per backend")
+    parser.add_argument("--concurrency", type=int, default=50, help="requests in flight at once")
+    parser.add_argument("--latency", type=float, default=0.05, help="mock model latency (seconds)")
+    parser.add_argument("--chunks", type=int, default=5, help="chunks per streamed reply")
+    parser.add_argument("--embed-texts", type=int, default=1000, help="texts to embed")
+    args = parser.parse_args()
+
+    server = serve(mock_api(args.latency, args.chunks))
+    system_prompt = "You are a helpful customer support assistant."
+
+    import google.generativeai as genai
+    genai.configure(
+        api_key="bench-key",
+        transport="rest",
+        client_options={"api_endpoint": f"http://127.0.0.1:{PORT}"}
+    )
+    sdk_model = genai.GenerativeModel("gemini-pro", system_instruction=system_prompt)
+
+    async def sdk_call(n: int):
+        response = await asyncio.to_thread(sdk_model.generate_content, [f"question {n}"])
+        assert response.text
+
+    provider = GeminiHTTPProvider(AIScheduler({"gemini": (1_000_000, 1_000_000_000)}))
+
+    async def http_call(n: int):
+        response = await provider.generate(f"question {n}", system_prompt)
+        assert response["text"]
+
+    ttft = LatencyTracker(window=args.requests)
+
+    async def http_stream(n: int):
+        started = time.perf_counter()
+        result = {}
+        async for _ in provider.stream(f"question {n}", system_prompt, result=result):
+            if started:
+                ttft.record((time.perf_counter() - started) * 1000)
+                started = 0
+        assert result["tokens_used"]
+
+    print(f"{args.requests} requests at concurrency {args.concurrency}, mock latency {args.latency * 1000:.0f} ms")
+    await drive("sdk", sdk_call, args.requests, args.concurrency)
+    await drive("http", http_call, args.requests, args.concurrency)
+    await drive("http stream", http_stream, args.requests, args.concurrency)
+    print(f"{'':<12} time to first chunk: {ttft.summary()}")
+
+    texts = [f"FAQ entry number {n}" for n in range(args.embed_texts)]
+    started = time.perf_counter()
+    vectors = await provider.embed(texts)
+    elapsed = time.perf_counter() - started
+    print(f"embeddings   {len(vectors)} texts in {elapsed * 1000:.0f} ms ({len(vectors) / elapsed:.0f} texts/s, batched)")
+
+    print(f"http pool: {gemini_client.stats()['pool']}")
+    await gemini_client.aclose()
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+"""How many AI calls the intent router avoids, and what classifying costs
+
+Runs a labelled set of typical support messages (order status, bookings,
+opening hours and open-ended questions) through the intent router, with
+the regex classifier and with the optional TF-IDF stage, and reports
+classification time per message, the share routed away from the AI and
+any open-ended message routed by mistake. Then answers the same messages
+through the message pipeline with a stub channel and a stubbed AI call
+(fixed latency), with and without routing, and reports the AI calls made
+and the mean time to answer a message.
+
+    python benchmarks/intent_routing.py --rounds 2000 --ai-latency 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.mkdtemp(prefix="intent-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/logs.db")
+os.environ.setdefault("AI_CACHE_BACKEND", "none")
+
+from app.ai.openai_client import ai_client  # noqa: E402
+from app.bots import pipeline  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.metrics import LatencyTracker  # noqa: E402
+from app.models.message import async_engine, init_db  # noqa: E402
+from app.services.intent_router import IntentRouter  # noqa: E402
+
+# (message, intent the router should pick, or None when the AI should answer)
+MESSAGES = [
+    ("status of ORD-1002", "order_status"),
+    ("Where is my order ORD-1001?", "order_status"),
+    ("order #1003", "order_status"),
+    ("hi, can you check ord 1234 for me", "order_status"),
+    ("where is my order?", "order"),
+    ("I want to track my package", "order"),
+    ("when will my package arrive", "order"),
+    ("book tomorrow 10am", "booking"),
+    ("Can I book an appointment on friday at 3pm?", "booking"),
+    ("Do you have availability on Oct 20th?", "booking"),
+    ("any free slots next monday", "booking"),
+    ("can I come in on thursday", "booking"),
+    ("What are your business hours?", "hours"),
+    ("are you open today?", "hours"),
+    ("when do you open", "hours"),
+    ("I have been waiting for hours, where is my package?", "order"),
+    ("I want a refund for ORD-1001", None),
+    ("I'd like to cancel my booking", None),
+    ("Tell me about your products", None),
+    ("Is the premium widget waterproof?", None),
+    ("How do I reset my password?", None),
+    ("My widget arrived broken, what can I do?", None),
+    ("Do you ship internationally?", None),
+    ("What payment methods do you accept?", None),
+    ("I want to buy your book", None),
+    ("Can you reserve a Premium Widget", None),
+    ("What is the delivery schedule for my order?", None),
+    ("slot machine", None),
+    ("How many hours does shipping take?", None),
+    ("Can you recommend a widget for a small office with three people and a tight budget please?", None)
+]
+
+
+class StubChannel(pipeline.Channel):
+    platform = "bench"
+
+    async def send(self, chat_id, text):
+        return {"ok": True}
+
+
+def classify_run(name: str, router: IntentRouter, rounds: int):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text, _ in MESSAGES:
+            router.classify(text)
+    per_message = (time.perf_counter() - started) / (rounds * len(MESSAGES)) * 1e6
+
+    routed = wrong = missed = 0
+    for text, expected in MESSAGES:
+        intent = router.classify(text)
+        got = intent["intent"] if intent else None
+        routed += got is not None
+        if got is not None and expected is None:
+            wrong += 1
+        elif expected is not None and got != expected:
+            missed += 1
+    print(
+        f"{name:<7} {per_message:6.1f} us/message  routed {routed}/{len(MESSAGES)} "
+        f"({routed / len(MESSAGES):.0%})  open-ended routed: {wrong}  intents missed: {missed}"
+    )
+
+
+async def pipeline_run(name: str, routing: bool):
+    settings.INTENT_ROUTER = routing
+    pipeline.reply_sources.clear()
+    channel = StubChannel()
+    latency = LatencyTracker(window=len(MESSAGES))
+
+    async def answer(n: int, text: str):
+        started = time.perf_counter()
+        await pipeline.process_message(channel, n, f"user-{name}-{n}", "Bench", text, f"{name}-{n}")
+        latency.record((time.perf_counter() - started) * 1000)
+
+    # Different users, so messages are answered concurrently as the dispatcher would
+    await asyncio.gather(*(answer(n, text) for n, (text, _) in enumerate(MESSAGES)))
+    stats = pipeline.stats()
+    print(
+        f"{name:<7} AI calls {stats['ai_calls']}/{len(MESSAGES)}  avoided {stats['ai_calls_avoided']} "
+        f"({stats['ai_avoided_rate']:.0%})  time to answer: {latency.summary()}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=2000, help="passes over the messages when timing")
+    parser.add_argument("--ai-latency", type=float, default=0.5, help="stub AI latency (seconds)")
+    args = parser.parse_args()
+
+    print(f"classification, {len(MESSAGES)} messages:")
+    classify_run("regex", IntentRouter("regex"), args.rounds)
+    classify_run("tfidf", IntentRouter("tfidf"), args.rounds)
+
+    init_db()
+
+    async def generate_response(user_message, context=None, language="English", use_cache=True):
+        await asyncio.sleep(args.ai_latency)
+        return {"text": f"Re: {user_message}", "provider": "stub", "model": "stub", "tokens_used": 0}
+
+    ai_client.generate_response = generate_response
+    # FAQ matches are counted separately; leave them out to isolate the router
+    settings.FAQ_SHORT_CIRCUIT = False
+
+    async def run_pipeline():
+        await pipeline_run("off", False)
+        await pipeline_run("on", True)
+        await async_engine.dispose()
+
+    print(f"\npipeline, stub AI latency {args.ai_latency * 1000:.0f} ms:")
+    asyncio.run(run_pipeline())
+
+
+if __name__ == "__main__":
+    main()
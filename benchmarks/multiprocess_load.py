@@ -0,0 +1,223 @@
+"""Webhook throughput and correctness with 1, 2, 4... uvicorn worker processes
+
+Starts a mock Telegram Bot API and a mock OpenAI chat completions API (with
+a fixed per-request latency) in this process, then for each worker count
+launches the app with ``uvicorn --workers N`` on a shared SQLite state
+backend and database, and:
+
+- posts every webhook update twice, concurrently, and checks that each one
+  is answered exactly once (no reply lost, none duplicated across workers)
+- books the same slot from many concurrent requests and checks that exactly
+  one succeeds and that every worker then reports the slot as taken
+- reports updates answered per second, from first post to last reply
+
+Scaling needs as many free cores as workers; on a single core the extra
+processes only add overhead.
+
+    python benchmarks/multiprocess_load.py --workers 1 2 4 --updates 2000 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN = "bench-token"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Reply text -> number of times the bot sent it
+replies: Counter = Counter()
+
+
+def mock_apis(latency: float) -> FastAPI:
+    api = FastAPI()
+
+    @api.post(f"/bot{TOKEN}/{{method}}")
+    async def bot_api(method: str, request: Request):
+        if method == "sendMessage":
+            replies[(await request.json()).get("text")] += 1
+        return {"ok": True, "result": {"message_id": 1}}
+
+    @api.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        await asyncio.sleep(latency)
+        return {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"Re: {payload['messages'][-1]['content']}"},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 50, "completion_tokens": 10, "total_tokens": 60}
+        }
+
+    return api
+
+
+def serve(app: FastAPI, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def start_app(workers: int, port: int, mock_url: str, dispatcher_workers: int) -> subprocess.Popen:
+    tmp = tempfile.mkdtemp(prefix="multiprocess-bench-")
+    env = dict(os.environ)
+    env.update({
+        "WORKERS": str(workers),
+        "STATE_BACKEND": "sqlite",
+        "STATE_PATH": f"{tmp}/state.db",
+        "DATABASE_URL": f"sqlite:///{tmp}/logs.db",
+        "AI_CACHE_BACKEND": "shared",
+        "TELEGRAM_MODE": "webhook",
+        "TELEGRAM_BOT_TOKEN": TOKEN,
+        "TELEGRAM_API_URL": mock_url,
+        "TELEGRAM_HTTP2": "False",
+        "TELEGRAM_WORKERS": str(dispatcher_workers),
+        "TELEGRAM_MAX_PENDING": "100000",
+        "TELEGRAM_MAX_PENDING_PER_CHAT": "100000",
+        "OPENAI_API_KEY": "bench-key",
+        "OPENAI_BASE_URL": f"{mock_url}/v1",
+        "OPENAI_RPM": "10000000",
+        "OPENAI_TPM": "10000000000",
+        "FAQ_SHORT_CIRCUIT": "False"
+    })
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                # Let every worker finish its startup, not just the first one
+                time.sleep(1 + workers)
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("app did not start")
+
+
+def update(n: int) -> dict:
+    return {
+        "update_id": n,
+        "message": {
+            "message_id": n,
+            "chat": {"id": 1000 + n % 500},
+            "from": {"id": 1000 + n % 500, "first_name": "Bench"},
+            "text": f"Hello, question number {n}"
+        }
+    }
+
+
+async def run_updates(base_url: str, updates: int, concurrency: int) -> float:
+    """Post each update twice; returns seconds until every update was answered"""
+    replies.clear()
+    semaphore = asyncio.Semaphore(concurrency)
+    # No keep-alive, so deliveries spread over the workers like separate senders would
+    limits = httpx.Limits(max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def post(n: int):
+            async with semaphore:
+                response = await client.post("/webhook/telegram", json=update(n))
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(post(n) for n in range(updates) for _ in range(2)))
+        deadline = time.time() + 120
+        while sum(1 for n in range(updates) if replies[f"Re: Hello, question number {n}"]) < updates:
+            if time.time() > deadline:
+                break
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        # Duplicates would show up shortly after the originals
+        await asyncio.sleep(1)
+    return elapsed
+
+
+async def run_bookings(base_url: str, attempts: int):
+    limits = httpx.Limits(max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        slots = (await client.get("/api/booking/slots")).json()["available_slots"]
+        slot_id = slots[0]["slot_id"]
+        responses = await asyncio.gather(*(
+            client.post("/api/booking/book", params={"slot_id": slot_id, "name": f"Customer {n}", "email": "a@b.c"})
+            for n in range(attempts)
+        ))
+        booked = sum(1 for response in responses if response.status_code == 200)
+        # Ask repeatedly so that every worker gets to answer
+        stale = 0
+        for _ in range(attempts):
+            available = (await client.get("/api/booking/slots")).json()["available_slots"]
+            stale += any(slot["slot_id"] == slot_id for slot in available)
+    return booked, stale
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="worker process counts")
+    parser.add_argument("--updates", type=int, default=1000, help="webhook updates per run")
+    parser.add_argument("--concurrency", type=int, default=200, help="deliveries in flight at once")
+    parser.add_argument("--latency", type=float, default=0.05, help="mock AI latency (seconds)")
+    parser.add_argument("--dispatcher-workers", type=int, default=64, help="TELEGRAM_WORKERS per process")
+    parser.add_argument("--bookings", type=int, default=50, help="concurrent attempts on one slot")
+    args = parser.parse_args()
+
+    mock_port = _free_port()
+    mock = serve(mock_apis(args.latency), mock_port)
+    print(f"{os.cpu_count()} CPUs, {args.updates} updates posted twice each, mock AI latency {args.latency * 1000:.0f} ms")
+
+    failed = False
+    for workers in args.workers:
+        port = _free_port()
+        process = start_app(workers, port, f"http://127.0.0.1:{mock_port}", args.dispatcher_workers)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            elapsed = asyncio.run(run_updates(base_url, args.updates, args.concurrency))
+            counts = [replies[f"Re: Hello, question number {n}"] for n in range(args.updates)]
+            lost = sum(1 for count in counts if count == 0)
+            duplicated = sum(1 for count in counts if count > 1)
+            booked, stale = asyncio.run(run_bookings(base_url, args.bookings))
+        finally:
+            process.terminate()
+            process.wait(30)
+
+        print(
+            f"workers={workers}  {args.updates / elapsed:7.0f} updates/s  "
+            f"lost={lost} duplicated={duplicated}  "
+            f"bookings: {booked}/{args.bookings} succeeded, stale slot lists={stale}"
+        )
+        failed = failed or lost or duplicated or booked != 1 or stale
+
+    mock.should_exit = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""getUpdates long-polling throughput against a local fake Bot API
+
+Starts a minimal Bot API (getUpdates / deleteWebhook / sendMessage) on
+localhost with a backlog of pending updates, points the bot at it via
+TELEGRAM_API_URL and runs the app's lifespan in polling mode with a stubbed
+AI reply. Reports how long it takes until every update has been answered.
+
+    python benchmarks/polling_throughput.py --updates 2000 --chats 200 --limit 100
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+PORT = _free_port()
+_tmp = tempfile.mkdtemp(prefix="polling-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/logs.db")
+os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{PORT}"
+os.environ["TELEGRAM_BOT_TOKEN"] = "424242:bench"
+os.environ["TELEGRAM_MODE"] = "polling"
+os.environ.setdefault("TELEGRAM_HTTP2", "False")
+os.environ.setdefault("FAQ_SHORT_CIRCUIT", "False")
+
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+
+from app.ai.openai_client import ai_client  # noqa: E402
+from app.bots.telegram_poller import telegram_poller  # noqa: E402
+from app.main import app, lifespan  # noqa: E402
+
+
+class FakeBotAPI:
+    """Serves a fixed backlog of updates and counts the replies sent"""
+
+    def __init__(self, updates: int, chats: int):
+        self.updates = [
+            {
+                "update_id": 1000 + n,
+                "message": {
+                    "message_id": n,
+                    "chat": {"id": n % chats},
+                    "from": {"id": n % chats, "first_name": "Bench"},
+                    "text": f"Hello, question number {n}"
+                }
+            }
+            for n in range(updates)
+        ]
+        self.sent = 0
+        self.polls = 0
+        self.done = threading.Event()
+        self.app = FastAPI()
+        self.app.post("/bot{token}/{method}")(self.handle)
+
+    async def handle(self, token: str, method: str, request: Request):
+        payload = await request.json()
+        if method == "getUpdates":
+            self.polls += 1
+            offset = payload.get("offset") or 0
+            batch = [u for u in self.updates if u["update_id"] >= offset][:payload.get("limit", 100)]
+            if not batch:
+                # Nothing pending: hold the long poll briefly like the real API
+                await asyncio.sleep(min(payload.get("timeout", 0), 0.2))
+            return {"ok": True, "result": batch}
+        if method == "sendMessage":
+            self.sent += 1
+            if self.sent >= len(self.updates):
+                self.done.set()
+            return {"ok": True, "result": {"message_id": self.sent}}
+        return {"ok": True, "result": True}
+
+
+def serve(api: FakeBotAPI) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=1000, help="pending updates to deliver")
+    parser.add_argument("--chats", type=int, default=100, help="distinct chats they come from")
+    parser.add_argument("--limit", type=int, default=100, help="getUpdates batch size")
+    parser.add_argument("--ai-delay", type=float, default=0.0, help="stubbed AI latency (seconds)")
+    args = parser.parse_args()
+
+    async def generate_response(user_message, context=None, language="English", use_cache=True):
+        await asyncio.sleep(args.ai_delay)
+        return {"text": "Thanks, noted.", "provider": "stub", "model": "stub", "tokens_used": 0}
+
+    ai_client.generate_response = generate_response
+    telegram_poller.limit = args.limit
+
+    api = FakeBotAPI(args.updates, args.chats)
+    server = serve(api)
+
+    started = time.perf_counter()
+    async with lifespan(app):
+        await asyncio.to_thread(api.done.wait, 120)
+        elapsed = time.perf_counter() - started
+        stats = telegram_poller.stats()
+    server.should_exit = True
+
+    print(f"{api.sent}/{args.updates} updates answered in {elapsed:.2f}s ({api.sent / elapsed:.0f}/s)")
+    print(f"getUpdates calls: {api.polls}, batch ingest latency: {stats['batch_latency']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+"""Conversation-log write throughput for each SQLITE_PROFILE
+
+For every profile a fresh database file is created and rows are inserted
+the way the app writes them: one commit per row (lead capture, bookings)
+and bulk batches (the log writer). Each mode runs alone and then again
+while a reader thread keeps issuing admin-style queries, which is where
+rollback journaling and WAL differ most.
+
+    python benchmarks/sqlite_write_throughput.py --rows 5000 --batch 200
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.mkdtemp(prefix="sqlite-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/app.db")
+
+from sqlalchemy import create_engine, func, select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.models.message import Base, ConversationLog, MessageType  # noqa: E402
+from app.models.sqlite_profile import PROFILES, apply_sqlite_profile  # noqa: E402
+
+
+def make_row(n: int) -> dict:
+    return {
+        "message_id": f"bench-{n}",
+        "user_id": str(n % 500),
+        "platform": "telegram",
+        "message_type": MessageType.INCOMING,
+        "content": f"benchmark message number {n} " * 4,
+        "message_metadata": {"chat_id": n % 500},
+        "timestamp": datetime.utcnow()
+    }
+
+
+def write_rows(Session, start: int, rows: int, batch: int) -> float:
+    """Insert ``rows`` rows in commits of ``batch`` rows; returns rows/second"""
+    db = Session()
+    started = time.perf_counter()
+    try:
+        for offset in range(0, rows, batch):
+            db.bulk_insert_mappings(
+                ConversationLog,
+                [make_row(start + n) for n in range(offset, min(offset + batch, rows))]
+            )
+            db.commit()
+    finally:
+        db.close()
+    return rows / (time.perf_counter() - started)
+
+
+def read_loop(Session, stop: threading.Event, counter: list):
+    while not stop.is_set():
+        db = Session()
+        try:
+            db.execute(select(func.count(ConversationLog.id))).scalar()
+            db.execute(
+                select(ConversationLog).order_by(ConversationLog.timestamp.desc()).limit(100)
+            ).all()
+            counter[0] += 1
+        except Exception:
+            counter[1] += 1
+        finally:
+            db.close()
+
+
+def bench_profile(profile: str, rows: int, batch: int):
+    path = os.path.join(_tmp, f"{profile}.db")
+    engine = create_engine(f"sqlite:///{path}")
+    apply_sqlite_profile(engine, profile)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    results = {}
+    next_id = 0
+    for mode, size in (("per-row", 1), ("batched", batch)):
+        results[mode] = write_rows(Session, next_id, rows, size)
+        next_id += rows
+
+        stop = threading.Event()
+        reads = [0, 0]
+        reader = threading.Thread(target=read_loop, args=(Session, stop, reads))
+        reader.start()
+        started = time.perf_counter()
+        results[f"{mode} + reader"] = write_rows(Session, next_id, rows, size)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        reader.join()
+        next_id += rows
+        results[f"{mode} reads/s"] = reads[0] / elapsed
+        results[f"{mode} read errors"] = reads[1]
+
+    engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000, help="rows written per mode")
+    parser.add_argument("--batch", type=int, default=200, help="rows per commit in batched mode")
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="comma separated profiles")
+    args = parser.parse_args()
+
+    columns = [
+        "per-row", "per-row + reader", "per-row reads/s",
+        "batched", "batched + reader", "batched reads/s"
+    ]
+    print(f"rows/s unless noted, databases in {_tmp}")
+    print(f"{'profile':<8}" + "".join(f"{name:>18}" for name in columns) + f"{'read errors':>13}")
+    for profile in args.profiles.split(","):
+        results = bench_profile(profile.strip(), args.rows, args.batch)
+        errors = results["per-row read errors"] + results["batched read errors"]
+        print(f"{profile:<8}" + "".join(f"{results[name]:>18.0f}" for name in columns) + f"{errors:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Cold-start cost of the app: import time per module and time to ready
+
+Runs ``import app.main`` in fresh interpreters under ``python -X importtime``
+(against a throwaway SQLite database) and reports the median wall time,
+the app's own modules and the heaviest third-party packages by cumulative
+import time. Then times import plus the lifespan startup (schema creation,
+services, background workers) until the app would accept requests.
+
+    python benchmarks/startup_time.py --runs 5 --top 15
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+READY = """
+import asyncio, time
+started = time.perf_counter()
+from app.main import app, lifespan
+imported = time.perf_counter()
+
+async def main():
+    async with lifespan(app):
+        ready = time.perf_counter()
+    print(f"{(imported - started) * 1000:.1f} {(ready - started) * 1000:.1f}")
+
+asyncio.run(main())
+"""
+
+
+def run(code: str, env: dict, importtime: bool = False) -> subprocess.CompletedProcess:
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    return subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+
+def parse(stderr: str) -> dict:
+    """Cumulative microseconds per module, plus its nesting depth"""
+    modules = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(2)), len(match.group(3)) // 2)
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=15, help="third-party packages to list")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="startup-bench-")
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{tmp}/logs.db")
+    env.setdefault("TELEGRAM_MODE", "webhook")
+
+    totals = []
+    cumulative = defaultdict(list)
+    for _ in range(args.runs):
+        modules = parse(run("import app.main", env, importtime=True).stderr)
+        totals.append(modules["app.main"][0])
+        for name, (micros, depth) in modules.items():
+            cumulative[name].append(micros)
+
+    def median_ms(name: str) -> float:
+        return statistics.median(cumulative[name]) / 1000
+
+    print(f"import app.main: median {statistics.median(totals) / 1000:.0f} ms over {args.runs} runs")
+
+    print("\napp modules (cumulative, includes what each one imports first):")
+    for name in sorted((n for n in cumulative if n.startswith("app.")), key=median_ms, reverse=True):
+        print(f"  {median_ms(name):8.1f} ms  {name}")
+
+    # Top-level third-party packages only; their submodules are included in them
+    packages = [
+        name for name in cumulative
+        if "." not in name and name != "app" and name not in sys.stdlib_module_names
+    ]
+    print(f"\nheaviest third-party packages:")
+    for name in sorted(packages, key=median_ms, reverse=True)[:args.top]:
+        print(f"  {median_ms(name):8.1f} ms  {name}")
+
+    ready = []
+    for _ in range(args.runs):
+        imported, started = map(float, run(READY, env).stdout.split()[-2:])
+        ready.append((imported, started))
+    print(
+        f"\nimport + lifespan startup: median {statistics.median(r[1] for r in ready):.0f} ms "
+        f"(import {statistics.median(r[0] for r in ready):.0f} ms)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Telegram webhook latency with and without concurrent admin queries
+
+Seeds a throwaway SQLite database with conversation logs, then drives the
+app in-process (httpx ASGI transport) with a mocked Bot API and a stubbed AI
+reply, so only our own request handling is measured. Each run posts webhook
+updates one after another and reports p50/p95/max of the time until the
+update is acknowledged and until its reply reaches the (mock) Bot API, first
+on an idle app and then while other clients hammer /admin/logs and
+/admin/stats?exact=true.
+
+    python benchmarks/webhook_latency.py --rows 200000 --requests 300
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.mkdtemp(prefix="webhook-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/logs.db")
+os.environ.setdefault("AI_CACHE_BACKEND", "memory")
+os.environ.setdefault("FAQ_SHORT_CIRCUIT", "False")
+
+import httpx  # noqa: E402
+
+from app.ai.openai_client import ai_client  # noqa: E402
+from app.bots.telegram_client import telegram_client  # noqa: E402
+from app.main import app, lifespan  # noqa: E402
+from app.metrics import LatencyTracker  # noqa: E402
+from app.models.message import ConversationLog, MessageType, SessionLocal, init_db  # noqa: E402
+
+
+def seed(rows: int):
+    init_db()
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        batch = []
+        for i in range(rows):
+            batch.append({
+                "message_id": f"seed-{i}",
+                "user_id": str(i % 500),
+                "platform": "telegram",
+                "message_type": MessageType.INCOMING if i % 2 else MessageType.OUTGOING,
+                "content": f"seed message {i}",
+                "message_metadata": {"ai_provider": "openai"},
+                "timestamp": now - timedelta(seconds=i * 5)
+            })
+            if len(batch) == 10000:
+                db.bulk_insert_mappings(ConversationLog, batch)
+                batch = []
+        db.bulk_insert_mappings(ConversationLog, batch)
+        db.commit()
+    finally:
+        db.close()
+
+
+# Reply text -> future resolved when the bot sends it
+_replies: dict = {}
+
+
+def install_stubs(ai_delay: float):
+    def bot_api(request: httpx.Request) -> httpx.Response:
+        waiter = _replies.pop(json.loads(request.content).get("text"), None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(time.perf_counter())
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": 1}})
+
+    telegram_client._client = httpx.AsyncClient(
+        base_url="https://bot.invalid/", transport=httpx.MockTransport(bot_api)
+    )
+
+    async def generate_response(user_message, context=None, language="English", use_cache=True):
+        await asyncio.sleep(ai_delay)
+        return {"text": f"Re: {user_message}", "provider": "stub", "model": "stub", "tokens_used": 0}
+
+    ai_client.generate_response = generate_response
+
+
+def update(n: int) -> dict:
+    return {
+        "update_id": n,
+        "message": {
+            "message_id": n,
+            "chat": {"id": 1000 + n % 50},
+            "from": {"id": 1000 + n % 50, "first_name": "Bench"},
+            "text": f"Hello, question number {n}"
+        }
+    }
+
+
+async def run_webhooks(client: httpx.AsyncClient, count: int, start: int):
+    """Returns (acknowledged, replied) latency trackers"""
+    acked = LatencyTracker(window=count)
+    replied = LatencyTracker(window=count)
+    for n in range(start, start + count):
+        message = update(n)
+        waiter = asyncio.get_running_loop().create_future()
+        _replies[f"Re: {message['message']['text']}"] = waiter
+        started = time.perf_counter()
+        response = await client.post("/webhook/telegram", json=message)
+        response.raise_for_status()
+        acked.record((time.perf_counter() - started) * 1000)
+        replied.record((await asyncio.wait_for(waiter, 30) - started) * 1000)
+    return acked, replied
+
+
+async def admin_load(client: httpx.AsyncClient, stop: asyncio.Event, counter: list):
+    paths = ["/admin/logs?limit=200&include_total=true", "/admin/stats?days=30&exact=true"]
+    i = 0
+    while not stop.is_set():
+        await client.get(paths[i % len(paths)])
+        counter[0] += 1
+        i += 1
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="conversation logs to seed")
+    parser.add_argument("--requests", type=int, default=200, help="webhook posts per run")
+    parser.add_argument("--admin-clients", type=int, default=4, help="concurrent admin pollers")
+    parser.add_argument("--ai-delay", type=float, default=0.0, help="stubbed AI latency (seconds)")
+    args = parser.parse_args()
+
+    print(f"Seeding {args.rows} log rows in {_tmp} ...")
+    seed(args.rows)
+    install_stubs(args.ai_delay)
+
+    transport = httpx.ASGITransport(app=app)
+    async with lifespan(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await run_webhooks(client, 20, start=1)  # warm up
+
+            idle = await run_webhooks(client, args.requests, start=1000)
+
+            stop = asyncio.Event()
+            served = [0]
+            pollers = [
+                asyncio.create_task(admin_load(client, stop, served))
+                for _ in range(args.admin_clients)
+            ]
+            started = time.perf_counter()
+            loaded = await run_webhooks(client, args.requests, start=100000)
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await asyncio.gather(*pollers)
+
+    print(f"{'':<32}{'p50':>10}{'p95':>10}{'max':>10}   (ms)")
+    for label, trackers in (("idle", idle), (f"{args.admin_clients} admin clients", loaded)):
+        for kind, tracker in zip(("ack", "reply"), trackers):
+            summary = tracker.summary()
+            print(
+                f"{label + ', ' + kind:<32}"
+                f"{summary['p50_ms']:>10.2f}{summary['p95_ms']:>10.2f}{summary['max_ms']:>10.2f}"
+            )
+    print(f"admin requests served during loaded run: {served[0]} ({served[0] / elapsed:.1f}/s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
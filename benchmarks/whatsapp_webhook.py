@@ -0,0 +1,166 @@
+"""WhatsApp webhook throughput against a local fake Graph API
+
+Starts a minimal Graph API (``POST /{version}/{phone_number_id}/messages``)
+on localhost, points the bot at it via WHATSAPP_API_URL and drives the app
+in-process (httpx ASGI transport) with signed multi-entry webhook
+deliveries and a stubbed AI reply. Every delivery is posted twice, as Meta
+does when an acknowledgement is lost, so each message must be answered
+exactly once. Reports acknowledgement latency and how long it takes until
+every message has been answered.
+
+    python benchmarks/whatsapp_webhook.py --messages 2000 --per-delivery 5 --chats 200
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+PORT = _free_port()
+APP_SECRET = "bench-secret"
+_tmp = tempfile.mkdtemp(prefix="whatsapp-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/logs.db")
+os.environ["WHATSAPP_API_URL"] = f"http://127.0.0.1:{PORT}"
+os.environ["WHATSAPP_ACCESS_TOKEN"] = "bench-token"
+os.environ["WHATSAPP_PHONE_NUMBER_ID"] = "100"
+os.environ["WHATSAPP_APP_SECRET"] = APP_SECRET
+os.environ.setdefault("FAQ_SHORT_CIRCUIT", "False")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+
+from app.ai.openai_client import ai_client  # noqa: E402
+from app.bots.whatsapp_bot import webhook_stats  # noqa: E402
+from app.main import app, lifespan  # noqa: E402
+from app.metrics import LatencyTracker  # noqa: E402
+
+
+class FakeGraphAPI:
+    """Accepts sent messages and counts them per recipient"""
+
+    def __init__(self, expected: int):
+        self.expected = expected
+        self.sent = 0
+        self.recipients: dict = {}
+        self.done = threading.Event()
+        self.app = FastAPI()
+        self.app.post("/{version}/{phone_number_id}/messages")(self.handle)
+
+    async def handle(self, version: str, phone_number_id: str, request: Request):
+        payload = await request.json()
+        self.recipients[payload["to"]] = self.recipients.get(payload["to"], 0) + 1
+        self.sent += 1
+        if self.sent >= self.expected:
+            self.done.set()
+        return {"messaging_product": "whatsapp", "messages": [{"id": f"wamid.out{self.sent}"}]}
+
+
+def serve(api: FakeGraphAPI) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def deliveries(messages: int, per_delivery: int, chats: int):
+    """Webhook bodies, each spreading its messages over two entries plus a status"""
+    for start in range(0, messages, per_delivery):
+        entries = []
+        for n in range(start, min(start + per_delivery, messages)):
+            wa_id = f"4915{n % chats:06d}"
+            entries.append({
+                "id": f"waba-{n % 2}",
+                "changes": [{
+                    "field": "messages",
+                    "value": {
+                        "messaging_product": "whatsapp",
+                        "metadata": {"display_phone_number": "15550000", "phone_number_id": "100"},
+                        "contacts": [{"wa_id": wa_id, "profile": {"name": "Bench"}}],
+                        "messages": [{
+                            "from": wa_id,
+                            "id": f"wamid.in{n}",
+                            "timestamp": str(int(time.time())),
+                            "type": "text",
+                            "text": {"body": f"Hello, question number {n}"}
+                        }],
+                        "statuses": [{"id": f"wamid.out{n}", "status": "delivered", "recipient_id": wa_id}]
+                    }
+                }]
+            })
+        yield json.dumps({"object": "whatsapp_business_account", "entry": entries}).encode()
+
+
+def sign(body: bytes) -> str:
+    return "sha256=" + hmac.new(APP_SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1000, help="incoming messages to deliver")
+    parser.add_argument("--per-delivery", type=int, default=5, help="messages batched into one webhook")
+    parser.add_argument("--chats", type=int, default=100, help="distinct senders")
+    parser.add_argument("--concurrency", type=int, default=20, help="webhooks in flight at once")
+    parser.add_argument("--ai-delay", type=float, default=0.0, help="stubbed AI latency (seconds)")
+    args = parser.parse_args()
+
+    async def generate_response(user_message, context=None, language="English", use_cache=True):
+        await asyncio.sleep(args.ai_delay)
+        return {"text": "Thanks, noted.", "provider": "stub", "model": "stub", "tokens_used": 0}
+
+    ai_client.generate_response = generate_response
+
+    api = FakeGraphAPI(args.messages)
+    server = serve(api)
+    ack = LatencyTracker(window=args.messages * 2)
+    statuses: dict = {}
+    bodies = list(deliveries(args.messages, args.per_delivery, args.chats))
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def post(client: httpx.AsyncClient, body: bytes):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post(
+                "/webhook/whatsapp",
+                content=body,
+                headers={"Content-Type": "application/json", "X-Hub-Signature-256": sign(body)}
+            )
+            ack.record((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with lifespan(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            # Each delivery twice: the redelivery must be recognised as a duplicate
+            await asyncio.gather(*(post(client, body) for body in bodies + bodies))
+            await asyncio.to_thread(api.done.wait, 120)
+            elapsed = time.perf_counter() - started
+            # Give late duplicate replies, if any, a moment to show up
+            await asyncio.sleep(0.5)
+    server.should_exit = True
+
+    print(f"{api.sent}/{args.messages} messages answered in {elapsed:.2f}s ({api.sent / elapsed:.0f}/s)")
+    print(f"webhook responses: {statuses}, acknowledgement latency: {ack.summary()}")
+    print(f"webhook stats: {dict(webhook_stats)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,11 @@
+import os
+import tempfile
+
+# Before any app module reads the settings
+_tmp = tempfile.mkdtemp(prefix="aibot-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/logs.db")
+os.environ.setdefault("AI_CACHE_BACKEND", "none")
+
+from app.models.message import init_db  # noqa: E402
+
+init_db()
@@ -0,0 +1,49 @@
+import asyncio
+
+from app.bots.dedup import UpdateDeduplicator, update_message_id
+from app.models.message import AsyncSessionLocal, ConversationLog, async_engine
+
+
+async def log_updates(bot, update_ids):
+    async with AsyncSessionLocal() as db:
+        for update_id in update_ids:
+            db.add(ConversationLog(
+                message_id=update_message_id(bot, update_id),
+                user_id="1",
+                platform="telegram",
+                message_type="incoming",
+                content="hello"
+            ))
+        await db.commit()
+
+
+async def check(dedup, bot, update_ids):
+    return [await dedup.is_duplicate(bot, update_id, update_message_id(bot, update_id)) for update_id in update_ids]
+
+
+def test_redeliveries_after_a_restart_are_duplicates():
+    async def run():
+        try:
+            await log_updates("restart", [100, 101, 102, 103])
+            # A fresh deduplicator, as after a restart, sees the logged updates again
+            dedup = UpdateDeduplicator(window=64)
+            assert await check(dedup, "restart", [100, 101, 103, 102]) == [True, True, True, True]
+            assert await check(dedup, "restart", [104, 104, 105]) == [False, True, False]
+            # Only the ids up to the last logged one were looked up
+            assert dedup.db_lookups == 4
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_new_bot_updates_are_not_looked_up():
+    async def run():
+        try:
+            dedup = UpdateDeduplicator(window=64)
+            assert await check(dedup, "new", [5, 6, 5, 7]) == [False, False, True, False]
+            assert dedup.db_lookups == 0
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,50 @@
+import pytest
+
+from app.services.intent_router import IntentRouter
+
+router = IntentRouter("regex")
+
+
+def intent_of(text):
+    intent = router.classify(text)
+    return intent["intent"] if intent else None
+
+
+@pytest.mark.parametrize("text", [
+    "book tomorrow 10am",
+    "Can I book an appointment on friday at 3pm?",
+    "I'd like to make an appointment",
+    "Do you have availability on Oct 20th?",
+    "any free slots next monday",
+    "can I schedule a visit for thursday",
+])
+def test_booking_requests(text):
+    assert intent_of(text) == "booking"
+
+
+@pytest.mark.parametrize("text", [
+    "What are your business hours?",
+    "what are your hours",
+    "are you open today?",
+    "when do you open",
+])
+def test_hours_requests(text):
+    assert intent_of(text) == "hours"
+
+
+@pytest.mark.parametrize("text", [
+    "I want to buy your book",
+    "Can you reserve a Premium Widget",
+    "What is the delivery schedule for my order?",
+    "slot machine",
+])
+def test_booking_words_in_other_senses_are_not_bookings(text):
+    assert intent_of(text) != "booking"
+
+
+@pytest.mark.parametrize("text", [
+    "I have been waiting for hours, where is my package?",
+    "How many hours does shipping take?",
+])
+def test_hours_in_other_senses_are_not_opening_hours(text):
+    assert intent_of(text) != "hours"
@@ -0,0 +1,28 @@
+import asyncio
+
+from app.admin.log_writer import LogWriter
+
+
+def test_full_queue_holds_producers_back(monkeypatch):
+    writer = LogWriter(max_queue=2)
+    # No writer thread: the queue only drains when the test says so
+    monkeypatch.setattr(writer, "start", lambda: None)
+
+    async def run():
+        await writer.put({"n": 1})
+        await writer.put({"n": 2})
+        assert not writer.has_room()
+
+        waiting = asyncio.create_task(writer.put({"n": 3}))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+
+        writer._queue.get_nowait()
+        await asyncio.wait_for(waiting, 1)
+        assert writer.has_room() is False
+
+    asyncio.run(run())
+    assert writer.enqueued == 3
+    assert writer.waited == 1
+    assert writer.refused == 2
+    assert writer.dropped == 0
@@ -0,0 +1,51 @@
+import asyncio
+
+from app.bots import telegram_poller
+from app.bots.telegram_poller import TelegramPoller
+
+
+def update(update_id, chat_id, text):
+    return {"update_id": update_id, "message": {"chat": {"id": chat_id}, "text": text}}
+
+
+def test_batch_reaches_the_dispatcher_in_order_per_chat(monkeypatch):
+    submitted = []
+
+    async def ingest(update):
+        # The first update waits on a slow dedup lookup
+        if update["message"]["text"] == "first":
+            await asyncio.sleep(0.05)
+        submitted.append(update["message"]["text"])
+        return "ok"
+
+    monkeypatch.setattr(telegram_poller, "ingest_telegram_update", ingest)
+    poller = TelegramPoller()
+    asyncio.run(poller.process_batch([
+        update(3, 1, "third"), update(1, 1, "first"), update(2, 1, "second"), update(4, 2, "other chat")
+    ]))
+    assert [text for text in submitted if text != "other chat"] == ["first", "second", "third"]
+    # Other chats do not wait behind it
+    assert submitted[0] == "other chat"
+    assert poller.offset == 5
+
+
+def test_later_updates_of_a_refused_chat_wait_for_redelivery(monkeypatch):
+    submitted = []
+
+    async def ingest(update):
+        if update["message"]["text"] == "refused":
+            return "busy"
+        submitted.append(update["message"]["text"])
+        return "ok"
+
+    async def no_pause(seconds):
+        pass
+
+    monkeypatch.setattr(telegram_poller, "ingest_telegram_update", ingest)
+    monkeypatch.setattr(telegram_poller.asyncio, "sleep", no_pause)
+    poller = TelegramPoller()
+    asyncio.run(poller.process_batch([
+        update(1, 1, "accepted"), update(2, 1, "refused"), update(3, 1, "after"), update(4, 2, "other chat")
+    ]))
+    assert sorted(submitted) == ["accepted", "other chat"]
+    assert poller.offset == 2